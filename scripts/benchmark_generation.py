@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Compare le débit de génération (tokens/s) du chatbot local
+avec et sans décodage assisté par un modèle brouillon.
+Usage :
+    python scripts/benchmark_generation.py [modele_principal] [modele_brouillon] [repetitions]
+"""
+
+import sys
+import time
+
+from valetia.config.settings import DRAFT_MODEL
+from valetia.modules.chatbot.conversation import ConversationManager
+
+QUESTIONS = [
+    "Quelle est la procédure pour contester une décision d'assemblée générale de copropriété ?",
+    "Mon employeur peut-il me licencier pendant un arrêt maladie ?",
+    "Comment se calcule la réserve héréditaire lorsqu'il y a trois enfants ?",
+]
+
+
+def measure(manager, prompts, assisted, repetitions):
+    """Retourne (tokens générés, durée en secondes) pour une configuration."""
+    total_tokens = 0
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for prompt in prompts:
+            text = manager._generate(prompt, assisted=assisted)
+            total_tokens += len(manager.tokenizer.encode(text, add_special_tokens=False))
+    return total_tokens, time.perf_counter() - start
+
+
+def main():
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "facebook/blenderbot-400M-distill"
+    draft_model_name = sys.argv[2] if len(sys.argv) > 2 else DRAFT_MODEL
+    repetitions = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    manager = ConversationManager(
+        model_name=model_name,
+        assisted_generation=True,
+        draft_model_name=draft_model_name
+    )
+    if manager.assistant_model is None:
+        print(f"Erreur : le modèle brouillon {draft_model_name} n'est pas compatible avec {manager.model_name}.")
+        sys.exit(1)
+
+    prompts = [manager._build_prompt(question, []) for question in QUESTIONS]
+
+    # Préchauffage pour exclure les allocations initiales des mesures
+    manager._generate(prompts[0], assisted=False)
+    manager._generate(prompts[0], assisted=True)
+
+    print(f"Modèle principal : {manager.model_name} | brouillon : {draft_model_name} | {manager.device}")
+    for label, assisted in (("generate standard", False), ("décodage assisté", True)):
+        tokens, duration = measure(manager, prompts, assisted, repetitions)
+        print(f"{label:>18} : {tokens} tokens en {duration:.2f}s ({tokens / duration:.1f} tokens/s)")
+
+
+if __name__ == "__main__":
+    main()
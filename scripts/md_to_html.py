@@ -3,35 +3,41 @@
 Convertisseur Markdown (.md) vers HTML sécurisé (.html)
 Utilise markdown2 + bleach (nettoyage HTML)
 Usage :
-    python scripts/md_to_html.py fichier.md
+    python scripts/md_to_html.py fichier.md [autre.md ...]
+Plusieurs fichiers sont convertis en parallèle (pool de processus).
 """
 
 import sys
 import os
-from valetia.utils.markdown_sanitizer import markdown_to_safe_html
+from valetia.utils.markdown_sanitizer import markdown_to_safe_html_many
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage : python scripts/md_to_html.py fichier.md")
+        print("Usage : python scripts/md_to_html.py fichier.md [autre.md ...]")
         sys.exit(1)
 
-    input_path = sys.argv[1]
+    input_paths = sys.argv[1:]
 
-    if not os.path.exists(input_path):
-        print(f"Erreur : le fichier {input_path} n'existe pas.")
+    missing = [path for path in input_paths if not os.path.exists(path)]
+    if missing:
+        for input_path in missing:
+            print(f"Erreur : le fichier {input_path} n'existe pas.")
         sys.exit(1)
 
-    with open(input_path, "r", encoding="utf-8") as f:
-        markdown_text = f.read()
+    markdown_texts = []
+    for input_path in input_paths:
+        with open(input_path, "r", encoding="utf-8") as f:
+            markdown_texts.append(f.read())
 
-    html = markdown_to_safe_html(markdown_text)
+    html_documents = markdown_to_safe_html_many(markdown_texts)
 
-    output_path = input_path.rsplit(".", 1)[0] + ".html"
+    for input_path, html in zip(input_paths, html_documents):
+        output_path = input_path.rsplit(".", 1)[0] + ".html"
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(html)
 
-    print(f"✅ Fichier HTML généré : {output_path}")
+        print(f"✅ Fichier HTML généré : {output_path}")
 
 if __name__ == "__main__":
     main()
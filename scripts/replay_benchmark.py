@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Rejoue les questions des feedbacks enregistrés sur le gestionnaire hybride,
+avec un client local à la place de l'API distante (exécutable hors ligne).
+Usage :
+    python scripts/replay_benchmark.py [--limit N] [--workers N] [--remote-latency S] [--json]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from valetia.modules.chatbot.hybrid_manager import HybridConversationManager
+from valetia.modules.learning.feedback import feedback_manager
+from valetia.modules.learning.replay import (
+    ReplayHarness,
+    StubRemoteClient,
+    format_report,
+    load_replay_cases
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de rejeu hors ligne des feedbacks")
+    parser.add_argument("--limit", type=int, default=1000, help="Nombre maximal de feedbacks rejoués")
+    parser.add_argument("--workers", type=int, default=4, help="Questions rejouées en parallèle")
+    parser.add_argument("--remote-latency", type=float, default=0.0, help="Latence simulée de l'API distante (s)")
+    parser.add_argument("--retrieval", action="store_true", help="Activer la recherche sémantique")
+    parser.add_argument("--json", action="store_true", help="Afficher le rapport au format JSON")
+    args = parser.parse_args()
+
+    cases = load_replay_cases(feedback_manager, limit=args.limit)
+    if not cases:
+        print("Erreur : aucun feedback enregistré à rejouer.")
+        sys.exit(1)
+
+    stub = StubRemoteClient(latency=args.remote_latency)
+
+    # Répertoires temporaires: le rejeu ne modifie pas les données d'apprentissage réelles
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = HybridConversationManager(
+            remote_client=stub,
+            learning_dir=f"{tmp_dir}/learning",
+            conversations_dir=f"{tmp_dir}/conversations",
+            use_retrieval=args.retrieval
+        )
+        report = ReplayHarness(manager, remote_client=stub, workers=args.workers).run(cases)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 from valetia.logger import loguru_logger, get_logger
 
-# Logger structlog
+# Logger par module
 structured_logger = get_logger(__name__)
-structured_logger.info("Message via structlog")
+structured_logger.info("Message via get_logger")
 structured_logger.info("Message structuré", user="test_user", action="login")
 
 # Logger loguru
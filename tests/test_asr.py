@@ -0,0 +1,130 @@
+"""
+Test de la reconnaissance vocale: conversion audio, détection d'activité et transcription par blocs
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.modules.speech.asr import EnergyVAD, SpeechRecognizer, to_float32
+
+SAMPLE_RATE = 1000
+CHUNK = 100  # 0,1 s par bloc
+
+
+class FakeWhisperModel:
+    """Modèle simulé: transcrit un énoncé par son nombre d'échantillons."""
+
+    def __init__(self, segments=None):
+        self.segments = segments
+        self.calls = []
+
+    def transcribe(self, audio, language=None, beam_size=None, **kwargs):
+        self.calls.append({"audio": audio, **kwargs})
+        if self.segments is not None:
+            return iter(self.segments), None
+        return iter([SimpleNamespace(text=f" {len(audio)} ", start=0.0, end=len(audio) / SAMPLE_RATE)]), None
+
+
+def make_recognizer(model):
+    recognizer = SpeechRecognizer(model_name="whisper-small", sample_rate=SAMPLE_RATE)
+    recognizer._model = model
+    return recognizer
+
+
+def speech(n=1):
+    return [np.full(CHUNK, 0.5, dtype=np.float32) for _ in range(n)]
+
+
+def silence(n=1):
+    return [np.zeros(CHUNK, dtype=np.float32) for _ in range(n)]
+
+
+def test_to_float32_scales_pcm16():
+    """Le PCM 16 bits (octets ou tableau) est ramené dans [-1, 1]; le float32 est conservé."""
+    pcm = np.array([0, 16384, -32768], dtype=np.int16)
+
+    assert to_float32(pcm.tobytes()).tolist() == [0.0, 0.5, -1.0]
+    assert to_float32(pcm).tolist() == [0.0, 0.5, -1.0]
+    samples = np.array([0.25], dtype=np.float32)
+    assert to_float32(samples) is samples
+
+
+def test_energy_vad_detects_speech_frames():
+    """Un bloc est parlé si assez de trames dépassent le seuil d'énergie."""
+    vad = EnergyVAD(sample_rate=SAMPLE_RATE, frame_ms=10, threshold=0.01, min_speech_ratio=0.5)
+    half = np.concatenate([np.full(50, 0.5), np.zeros(50)]).astype(np.float32)
+
+    assert vad.speech_ratio(np.zeros(100, dtype=np.float32)) == 0.0
+    assert vad.speech_ratio(half) == 0.5
+    assert vad.is_speech(half)
+    assert not vad.is_speech(np.full(100, 0.001, dtype=np.float32))
+    assert vad.speech_ratio(np.zeros(5, dtype=np.float32)) == 0.0
+
+
+def test_model_name_accepts_configuration_prefix():
+    assert SpeechRecognizer(model_name="whisper-small").model_name == "small"
+    assert SpeechRecognizer(model_name="medium").model_name == "medium"
+
+
+def test_transcribe_chunks_emits_partials_and_utterances():
+    """Partielle pendant la parole, énoncé validé après le silence, transcription finale en fin de flux."""
+    model = FakeWhisperModel()
+    recognizer = make_recognizer(model)
+    chunks = silence(3) + speech(12) + silence(6) + speech(5)
+
+    events = list(recognizer.transcribe_chunks(chunks, min_silence=0.6, partial_interval=1.0))
+
+    assert events == [
+        {"text": "1000", "utterance_end": False, "final": False},
+        {"text": "1800", "utterance_end": True, "final": False},
+        {"text": "1800 500", "utterance_end": True, "final": True},
+    ]
+    # Le silence initial n'est pas transcrit; l'énoncé suivant reçoit le texte précédent
+    assert [len(call["audio"]) for call in model.calls] == [1000, 1800, 500]
+    assert model.calls[2]["initial_prompt"] == "1800"
+
+
+def test_long_utterance_is_committed_at_maximum_length():
+    """Un énoncé sans pause est validé au-delà de la durée maximale."""
+    recognizer = make_recognizer(FakeWhisperModel())
+
+    events = list(recognizer.transcribe_chunks(speech(5), partial_interval=10, max_utterance=0.3))
+
+    assert events == [
+        {"text": "300", "utterance_end": True, "final": False},
+        {"text": "300 200", "utterance_end": True, "final": True},
+    ]
+
+
+def test_pcm_bytes_and_silence_only_stream():
+    """Les blocs PCM 16 bits sont acceptés; un flux silencieux donne une transcription vide."""
+    recognizer = make_recognizer(FakeWhisperModel())
+    pcm = (np.full(CHUNK, 0.5) * 32767).astype(np.int16).tobytes()
+
+    assert list(recognizer.transcribe_chunks(silence(4)))[-1] == {"text": "", "utterance_end": True, "final": True}
+    assert list(recognizer.transcribe_chunks([pcm] * 2))[-1]["text"] == "200"
+
+
+def test_transcribe_stream_accumulates_segments():
+    """Chaque segment produit une transcription partielle cumulée; les segments vides sont ignorés."""
+    segments = [
+        SimpleNamespace(text=" Bonjour.", start=0.0, end=1.0),
+        SimpleNamespace(text=" ", start=1.0, end=1.5),
+        SimpleNamespace(text=" Ma question.", start=1.5, end=3.0),
+    ]
+    recognizer = make_recognizer(FakeWhisperModel(segments))
+
+    events = list(recognizer.transcribe_stream("question.wav"))
+
+    assert [(event["text"], event["final"]) for event in events] == [
+        ("Bonjour.", False),
+        ("Bonjour. Ma question.", False),
+        ("Bonjour. Ma question.", True),
+    ]
+    assert events[-1]["end"] == 3.0
+    assert make_recognizer(FakeWhisperModel(segments)).transcribe("question.wav") == "Bonjour. Ma question."
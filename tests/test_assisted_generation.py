@@ -0,0 +1,145 @@
+"""
+Test du décodage assisté par un modèle brouillon
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class StubInputs:
+    def __init__(self):
+        self.input_ids = [[1, 2, 3]]
+        self.attention_mask = [[1, 1, 1]]
+
+    def to(self, device):
+        return self
+
+
+class StubTokenizer:
+    """Tokenizer minimal: vocabulaire fixé, décodage constant."""
+
+    eos_token_id = 0
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+
+    def get_vocab(self):
+        return self.vocab
+
+    def __call__(self, prompt, return_tensors=None, truncation=False, max_length=None):
+        return StubInputs()
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return ["Réponse générée"]
+
+
+class StubModel:
+    """Modèle minimal enregistrant les paramètres de generate."""
+
+    def __init__(self, name="principal"):
+        self.name = name
+        self.generate_kwargs = None
+
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+    def generate(self, input_ids, **kwargs):
+        self.generate_kwargs = kwargs
+        return [[4, 5]]
+
+
+@pytest.fixture
+def conversation(tmp_path, monkeypatch):
+    """Module de conversation, importé hors du dépôt (le gestionnaire de feedback crée data/feedbacks)."""
+    monkeypatch.chdir(tmp_path)
+    from valetia.modules.chatbot import conversation
+    return conversation
+
+
+def make_manager(conversation, monkeypatch, model_type, draft_vocab):
+    """Gestionnaire sans chargement de modèles; le brouillon est fourni par des chargeurs simulés."""
+    loaded = []
+
+    def load_draft(name):
+        loaded.append(name)
+        return StubModel(name)
+
+    monkeypatch.setattr(conversation.AutoTokenizer, "from_pretrained", lambda name: StubTokenizer(draft_vocab))
+    monkeypatch.setattr(conversation.AutoModelForSeq2SeqLM, "from_pretrained", load_draft)
+    monkeypatch.setattr(conversation.AutoModelForCausalLM, "from_pretrained", load_draft)
+
+    manager = conversation.ConversationManager.__new__(conversation.ConversationManager)
+    manager.model_name = "principal"
+    manager.model_type = model_type
+    manager.device = "cpu"
+    manager.max_new_tokens = 16
+    manager.tokenizer = StubTokenizer({"a": 0, "b": 1})
+    manager.model = StubModel()
+    manager.prompt_builder = type("Builder", (), {"max_length": 128})()
+    manager.assistant_model = None
+    manager.assistant_tokenizer = None
+    return manager, loaded
+
+
+def test_incompatible_seq2seq_draft_falls_back_to_plain_decoding(conversation, monkeypatch):
+    """Un brouillon qui ne partage pas le vocabulaire d'un modèle seq2seq n'est pas chargé."""
+    manager, loaded = make_manager(conversation, monkeypatch, "seq2seq", draft_vocab={"autre": 0})
+
+    manager._load_assistant_model("brouillon")
+
+    assert manager.assistant_model is None
+    assert loaded == []
+    assert manager._generate("Question ?") == "Réponse générée"
+    assert "assistant_model" not in manager.model.generate_kwargs
+
+
+def test_compatible_draft_is_passed_to_generate(conversation, monkeypatch):
+    """Un brouillon de même vocabulaire est transmis à generate, sans tokenizers supplémentaires."""
+    manager, loaded = make_manager(conversation, monkeypatch, "seq2seq", draft_vocab={"a": 0, "b": 1})
+
+    manager._load_assistant_model("brouillon")
+
+    assert loaded == ["brouillon"]
+    assert manager._generate("Question ?") == "Réponse générée"
+    kwargs = manager.model.generate_kwargs
+    assert kwargs["assistant_model"] is manager.assistant_model
+    assert "assistant_tokenizer" not in kwargs
+
+    manager._generate("Question ?", assisted=False)
+    assert "assistant_model" not in manager.model.generate_kwargs
+
+
+def test_causal_draft_with_other_vocabulary_uses_both_tokenizers(conversation, monkeypatch):
+    """Un brouillon causal de vocabulaire différent passe par le décodage assisté universel."""
+    manager, _ = make_manager(conversation, monkeypatch, "causal_lm", draft_vocab={"autre": 0})
+
+    manager._load_assistant_model("brouillon")
+    _, kwargs = manager._generation_inputs("Question ?")
+
+    assert kwargs["assistant_model"] is manager.assistant_model
+    assert kwargs["tokenizer"] is manager.tokenizer
+    assert kwargs["assistant_tokenizer"] is manager.assistant_tokenizer
+
+
+def test_draft_loading_error_and_same_model_are_ignored(conversation, monkeypatch):
+    """Un brouillon introuvable ou identique au modèle principal laisse le décodage classique."""
+    manager, loaded = make_manager(conversation, monkeypatch, "causal_lm", draft_vocab={"a": 0, "b": 1})
+
+    manager._load_assistant_model("principal")
+    assert loaded == []
+
+    def fail(name):
+        raise OSError("modèle introuvable")
+
+    monkeypatch.setattr(conversation.AutoModelForCausalLM, "from_pretrained", fail)
+    manager._load_assistant_model("brouillon")
+
+    assert manager.assistant_model is None
+    assert "assistant_model" not in manager._generation_inputs("Question ?")[1]
@@ -0,0 +1,101 @@
+"""
+Test de la recherche hors ligne des vulnérabilités (avis OSV)
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.deps import advisories
+from valetia.deps.advisories import Advisory, AdvisoryDatabase, cvss3_base_score, scan_vulnerabilities
+
+
+def make_record(vuln_id, name, ranges=(), versions=(), severity=None):
+    record = {
+        "id": vuln_id,
+        "summary": f"Avis {vuln_id}",
+        "affected": [{
+            "package": {"ecosystem": "PyPI", "name": name},
+            "ranges": [{"type": "ECOSYSTEM", "events": list(events)} for events in ranges],
+            "versions": list(versions),
+        }],
+    }
+    if severity:
+        record["severity"] = [{"type": "CVSS_V3", "score": severity}]
+    return record
+
+
+@pytest.mark.parametrize("vector, score", [
+    ("CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H", 9.8),
+    ("CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:C/C:H/I:H/A:H", 10.0),
+    ("CVSS:3.1/AV:N/AC:L/PR:N/UI:R/S:C/C:L/I:L/A:N", 6.1),
+    ("CVSS:3.1/AV:L/AC:L/PR:L/UI:N/S:U/C:H/I:H/A:H", 7.8),
+    ("CVSS:3.0/AV:N/AC:H/PR:N/UI:N/S:U/C:H/I:N/A:N", 5.9),
+    ("CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:N/I:N/A:N", 0.0),
+])
+def test_cvss3_base_score_matches_reference_vectors(vector, score):
+    """Le score de base correspond à celui du calculateur de référence."""
+    assert cvss3_base_score(vector) == score
+
+
+def test_cvss3_base_score_rejects_invalid_vectors():
+    """Un vecteur incomplet ou inconnu n'a pas de score."""
+    assert cvss3_base_score("CVSS:3.1/AV:N/AC:L") is None
+    assert cvss3_base_score("CVSS:3.1/AV:X/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H") is None
+
+
+def test_advisory_ranges():
+    """Les intervalles OSV (introduced, fixed, last_affected) sont respectés."""
+    record = make_record("GHSA-1", "jinja2", ranges=[
+        [{"introduced": "0"}, {"fixed": "2.11.3"}],
+        [{"introduced": "3.0.0"}, {"last_affected": "3.0.2"}],
+        [{"introduced": "3.1.0"}, {"fixed": "3.1.3"}, {"introduced": "3.1.5"}],
+    ])
+    advisory = Advisory(record, record["affected"][0])
+
+    assert advisory.affects("2.10")
+    assert not advisory.affects("2.11.3")
+    assert advisory.affects("3.0.2")
+    assert not advisory.affects("3.0.3")
+    assert advisory.affects("3.1.2")
+    assert not advisory.affects("3.1.4")
+    assert advisory.affects("3.1.5")
+    assert not advisory.affects("version-inconnue")
+    assert advisory.fixed_versions == ["2.11.3", "3.1.3"]
+
+
+def test_advisory_explicit_versions():
+    """Une version listée explicitement est affectée, même hors intervalle."""
+    record = make_record("PYSEC-1", "pillow", versions=["9.0.0"])
+    advisory = Advisory(record, record["affected"][0])
+
+    assert advisory.affects("9.0.0")
+    assert not advisory.affects("9.0.1")
+
+
+def test_scan_reevaluates_only_changed_packages(tmp_path, monkeypatch):
+    """L'analyse suivante ne réévalue que les packages dont la version a changé."""
+    monkeypatch.setattr(advisories, "VULNERABILITY_SCAN_FILE", tmp_path / "vulnerability_scan.json")
+    with open(tmp_path / "osv.json", "w") as f:
+        json.dump([
+            make_record("GHSA-req", "Requests", ranges=[[{"introduced": "0"}, {"fixed": "2.32.0"}]],
+                        severity="CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H"),
+            make_record("GHSA-low", "numpy", ranges=[[{"introduced": "0"}, {"fixed": "2.0.0"}]],
+                        severity="CVSS:3.1/AV:L/AC:H/PR:H/UI:R/S:U/C:L/I:N/A:N"),
+        ], f)
+    database = AdvisoryDatabase(tmp_path / "osv.json")
+
+    first = scan_vulnerabilities({"requests": "2.31.0", "numpy": "1.26.0"}, min_severity="medium", database=database)
+    assert [(v["vulnerability_id"], v["severity"]) for v in first] == [("GHSA-req", "critical")]
+
+    evaluated = []
+    match = database.match
+    monkeypatch.setattr(database, "match", lambda name, *args: evaluated.append(name) or match(name, *args))
+
+    second = scan_vulnerabilities({"requests": "2.32.0", "numpy": "1.26.0"}, min_severity="medium", database=database)
+    assert evaluated == ["requests"]
+    assert second == []
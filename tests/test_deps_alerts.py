@@ -0,0 +1,88 @@
+"""
+Test du journal des alertes de dépendances
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.deps import alerts
+from valetia.deps.alerts import get_alerts_summary, log_alert
+
+VULNERABILITY = [{"package_name": "requests", "vulnerability_id": "GHSA-1", "severity": "high"}]
+
+
+@pytest.fixture
+def alerts_dir(tmp_path, monkeypatch):
+    """Redirige le journal et l'index des alertes vers un répertoire temporaire."""
+    monkeypatch.setattr(alerts, "ALERTS_LOG_FILE", tmp_path / "alerts_log.jsonl")
+    monkeypatch.setattr(alerts, "ALERTS_INDEX_FILE", tmp_path / "alerts_index.json")
+    monkeypatch.setattr(alerts, "LEGACY_ALERTS_LOG_FILE", tmp_path / "alerts_log.json")
+    return tmp_path
+
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_repeated_alerts_are_counted_not_rewritten(alerts_dir):
+    """Une alerte identique à la précédente du même type n'augmente que son compteur."""
+    assert log_alert("vulnerabilities", VULNERABILITY)
+    assert not log_alert("vulnerabilities", VULNERABILITY)
+    assert log_alert("updates", [{"name": "numpy"}])
+    assert log_alert("vulnerabilities", VULNERABILITY + [{"package_name": "jinja2"}])
+
+    assert [alert["type"] for alert in read_log(alerts_dir / "alerts_log.jsonl")] == [
+        "vulnerabilities", "updates", "vulnerabilities"
+    ]
+    with open(alerts_dir / "alerts_index.json") as f:
+        index = json.load(f)
+    assert index["total"] == 3
+    assert index["counts"] == {"updates": 1, "vulnerabilities": 2}
+    assert index["duplicates"] == 1
+    assert index["recent"][-1]["repeats"] == 1
+    assert "répétée 1 fois" in get_alerts_summary()
+
+
+def test_log_is_rotated_by_size(alerts_dir, monkeypatch):
+    """Le journal tourne au-delà de sa taille maximale, en gardant un nombre limité de copies."""
+    monkeypatch.setattr(alerts, "ALERTS_LOG_MAX_BYTES", 200)
+    monkeypatch.setattr(alerts, "ALERTS_LOG_BACKUPS", 2)
+
+    for i in range(10):
+        log_alert("updates", [{"name": f"package-{i}", "description": "x" * 100}])
+
+    log_file = alerts_dir / "alerts_log.jsonl"
+    assert len(read_log(log_file)) == 1
+    assert (alerts_dir / "alerts_log.jsonl.1").exists()
+    assert (alerts_dir / "alerts_log.jsonl.2").exists()
+    assert not (alerts_dir / "alerts_log.jsonl.3").exists()
+    assert read_log(log_file)[0]["details"][0]["name"] == "package-9"
+
+
+def test_legacy_log_is_migrated_once(alerts_dir):
+    """L'ancien journal (tableau JSON) est importé au premier usage puis archivé."""
+    legacy = [
+        {"timestamp": "2024-01-02T10:00:00", "type": "updates", "details": [{"name": "numpy"}]},
+        {"timestamp": "2024-01-01T10:00:00", "type": "vulnerabilities", "details": VULNERABILITY},
+    ]
+    with open(alerts_dir / "alerts_log.json", "w") as f:
+        json.dump(legacy, f)
+
+    summary = get_alerts_summary()
+
+    assert "2024-01-02 10:00:00 - Mises à jour: 1" in summary
+    assert not (alerts_dir / "alerts_log.json").exists()
+    assert (alerts_dir / "alerts_log.json.migrated").exists()
+    assert [alert["timestamp"] for alert in read_log(alerts_dir / "alerts_log.jsonl")] == [
+        "2024-01-01T10:00:00", "2024-01-02T10:00:00"
+    ]
+
+    # Déjà migré: l'alerte identique à la dernière importée est une répétition
+    assert not log_alert("updates", [{"name": "numpy"}])
+    assert len(read_log(alerts_dir / "alerts_log.jsonl")) == 2
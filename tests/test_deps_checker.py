@@ -0,0 +1,136 @@
+"""
+Test de la vérification des mises à jour des dépendances
+"""
+import functools
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.deps import checker
+
+
+@pytest.fixture
+def deps_dir(tmp_path, monkeypatch):
+    """Redirige les fichiers de l'analyse des dépendances vers un répertoire temporaire."""
+    monkeypatch.setattr(checker, "DEPS_FILE", tmp_path / "dependencies.json")
+    monkeypatch.setattr(checker, "UPDATES_CACHE_FILE", tmp_path / "updates_cache.json")
+    monkeypatch.setattr(checker, "UPDATES_SCAN_FILE", tmp_path / "updates_scan.json")
+    monkeypatch.setattr(checker, "load_offline_index",
+                        functools.partial(checker.load_offline_index, tmp_path / "package_index.json"))
+    return tmp_path
+
+
+class FakeIndex:
+    """Index de packages en mémoire, qui compte les requêtes."""
+
+    def __init__(self, versions):
+        self.versions = versions
+        self.requests = []
+
+    def __call__(self, package_name, index_url=None, timeout=None):
+        self.requests.append(package_name)
+        return self.versions.get(package_name)
+
+
+def test_updates_are_fetched_then_served_from_cache(deps_dir, monkeypatch):
+    """Les dernières versions sont mises en cache, y compris pour les packages inconnus de l'index."""
+    index = FakeIndex({"requests": "2.32.0", "numpy": "1.26.0"})
+    monkeypatch.setattr(checker, "fetch_latest_version", index)
+    packages = {"requests": "2.31.0", "numpy": "1.26.0", "paquet-interne": "0.1"}
+
+    updates = checker.check_for_updates(packages, offline=False)
+    assert updates == [{"name": "requests", "current_version": "2.31.0", "latest_version": "2.32.0"}]
+    assert sorted(index.requests) == ["numpy", "paquet-interne", "requests"]
+
+    index.requests.clear()
+    assert checker.check_for_updates(packages, offline=False) == updates
+    assert index.requests == []
+
+
+def test_expired_cache_entries_are_refetched(deps_dir, monkeypatch):
+    """Une entrée du cache plus ancienne que la durée de validité est revérifiée."""
+    with open(deps_dir / "updates_cache.json", "w") as f:
+        json.dump({"packages": {
+            "requests": {"latest_version": "2.31.0", "checked_at": time.time() - 2 * 3600},
+            "numpy": {"latest_version": "1.26.0", "checked_at": time.time()},
+        }}, f)
+    index = FakeIndex({"requests": "2.32.0", "numpy": "2.0.0"})
+    monkeypatch.setattr(checker, "fetch_latest_version", index)
+
+    updates = checker.check_for_updates({"requests": "2.31.0", "numpy": "1.26.0"}, ttl_hours=1, offline=False)
+
+    assert index.requests == ["requests"]
+    assert [update["name"] for update in updates] == ["requests"]
+
+
+def test_network_errors_are_not_cached(deps_dir, monkeypatch):
+    """Un package dont la vérification a échoué est réinterrogé à l'analyse suivante."""
+    def failing(package_name, index_url=None, timeout=None):
+        raise ConnectionError("index injoignable")
+
+    monkeypatch.setattr(checker, "fetch_latest_version", failing)
+    assert checker.check_for_updates({"requests": "2.31.0"}, offline=False) == []
+
+    index = FakeIndex({"requests": "2.32.0"})
+    monkeypatch.setattr(checker, "fetch_latest_version", index)
+    assert checker.check_for_updates({"requests": "2.31.0"}, offline=False)[0]["latest_version"] == "2.32.0"
+    assert index.requests == ["requests"]
+
+
+def test_offline_index_is_used_without_network(deps_dir, monkeypatch):
+    """En mode hors ligne, seules les métadonnées locales sont utilisées."""
+    with open(deps_dir / "package_index.json", "w") as f:
+        json.dump({"packages": {
+            "Requests": "2.32.0",
+            "numpy": {"versions": ["1.26.0", "2.0.0", "2.1.0rc1"]},
+        }}, f)
+    index = FakeIndex({})
+    monkeypatch.setattr(checker, "fetch_latest_version", index)
+
+    updates = checker.check_for_updates({"requests": "2.31.0", "numpy": "1.26.0", "torch": "2.0"}, offline=True)
+
+    assert index.requests == []
+    assert {update["name"]: update["latest_version"] for update in updates} == {"numpy": "2.0.0", "requests": "2.32.0"}
+
+
+def test_diff_dependencies_reports_added_removed_and_changed():
+    """Les différences entre deux inventaires sont classées par nature."""
+    previous = {"requests": "2.31.0", "numpy": "1.26.0", "six": "1.16.0"}
+    current = {"requests": "2.32.0", "numpy": "1.26.0", "torch": "2.1.0"}
+
+    changes = checker.diff_dependencies(current, previous)
+
+    assert changes["added"] == {"torch": "2.1.0"}
+    assert changes["removed"] == {"six": "1.16.0"}
+    assert changes["changed"] == {"requests": {"old": "2.31.0", "new": "2.32.0"}}
+    assert changes["unchanged"] == 1
+
+
+def test_incremental_update_check_only_checks_changes(deps_dir, monkeypatch):
+    """Seuls les packages ajoutés ou modifiés sont vérifiés; les autres résultats sont repris."""
+    checked = []
+
+    def check_for_updates(packages):
+        checked.append(dict(packages))
+        return [{"name": name, "current_version": version, "latest_version": "99"}
+                for name, version in sorted(packages.items())]
+
+    monkeypatch.setattr(checker, "check_for_updates", check_for_updates)
+
+    first = {"requests": "2.31.0", "numpy": "1.26.0", "six": "1.16.0"}
+    checker.check_for_updates_incremental(first, checker.diff_dependencies(first, {}))
+    assert checked == [first]
+
+    second = {"requests": "2.32.0", "numpy": "1.26.0", "torch": "2.1.0"}
+    updates = checker.check_for_updates_incremental(second, checker.diff_dependencies(second, first))
+
+    assert checked[1] == {"requests": "2.32.0", "torch": "2.1.0"}
+    assert [(update["name"], update["current_version"]) for update in updates] == [
+        ("numpy", "1.26.0"), ("requests", "2.32.0"), ("torch", "2.1.0")
+    ]
@@ -0,0 +1,75 @@
+"""
+Test du planificateur des analyses de dépendances
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.deps import alerts, scheduler
+from valetia.deps.scheduler import DependencyScanScheduler
+
+
+@pytest.fixture
+def scan_files(tmp_path, monkeypatch):
+    """Redirige l'état et le verrou de l'analyse, et remplace l'analyse elle-même."""
+    monkeypatch.setattr(scheduler, "SCAN_STATUS_FILE", tmp_path / "scan_status.json")
+    monkeypatch.setattr(scheduler, "SCAN_LOCK_FILE", tmp_path / "scan.lock")
+    monkeypatch.setattr(alerts, "load_alerts_config", lambda: {"enabled": True, "last_check": None})
+    scans = []
+
+    def check_and_alert(force=False, progress=None):
+        progress("updates")
+        scans.append(force)
+        return True
+
+    monkeypatch.setattr(alerts, "check_and_alert", check_and_alert)
+    return scans
+
+
+def test_run_scan_records_status_and_releases_lock(scan_files):
+    """L'analyse enregistre son état et libère le verrou à la fin."""
+    assert DependencyScanScheduler().run_scan(force=True) is True
+
+    status = scheduler.get_scan_status()
+    assert scan_files == [True]
+    assert status["state"] == "idle"
+    assert status["step"] == "done"
+    assert status["finished_at"] is not None
+    assert not scheduler.SCAN_LOCK_FILE.exists()
+
+
+def test_scan_is_skipped_while_another_process_holds_the_lock(scan_files):
+    """Une analyse déjà en cours dans un autre processus n'est pas relancée."""
+    scheduler.SCAN_LOCK_FILE.write_text("12345")
+
+    assert DependencyScanScheduler().run_scan() is None
+    assert scan_files == []
+
+
+def test_stale_lock_is_removed(scan_files):
+    """Un verrou abandonné (processus arrêté) n'empêche pas les analyses suivantes."""
+    scheduler.SCAN_LOCK_FILE.write_text("12345")
+    old = time.time() - scheduler.STALE_LOCK_SECONDS - 1
+    os.utime(scheduler.SCAN_LOCK_FILE, (old, old))
+
+    assert DependencyScanScheduler().run_scan() is True
+
+
+def test_run_now_starts_a_background_scan(scan_files):
+    """run_now déclenche une analyse en arrière-plan sans attendre l'échéance."""
+    scan_scheduler = DependencyScanScheduler(startup_delay=0)
+    scan_scheduler.run_now()
+    try:
+        deadline = time.monotonic() + 5
+        while not scan_files and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert scan_files
+    finally:
+        scan_scheduler.stop()
+    assert not scan_scheduler.is_running()
@@ -0,0 +1,96 @@
+"""
+Test de l'analyse de documents en tâches de fond
+"""
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.core import document_jobs
+from valetia.core.document_jobs import DocumentJobManager, QueueFullError
+
+
+def make_upload(tmp_path, name, text="Le syndic convoque l'assemblée générale."):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_results_are_available_and_uploads_removed(tmp_path):
+    """Le résultat est disponible à la fin de l'analyse et le fichier envoyé est supprimé."""
+    def analyze(file_path, name):
+        return {"document_name": name, "word_count": len(Path(file_path).read_text(encoding="utf-8").split())}
+
+    manager = DocumentJobManager(analyze=analyze, executor=ThreadPoolExecutor(2))
+    upload = make_upload(tmp_path, "upload.txt")
+
+    job = manager.submit(str(upload), "convocation.txt")
+    final = asyncio.run(manager.wait(job["job_id"], timeout=5))
+
+    assert final["status"] == "done"
+    assert final["result"] == {"document_name": "convocation.txt", "word_count": 5}
+    assert not upload.exists()
+    assert manager.pending() == 0
+
+
+def test_errors_are_reported(tmp_path):
+    """Une analyse en échec est signalée dans l'état de la tâche."""
+    def analyze(file_path, name):
+        raise ValueError("Document sans contenu")
+
+    manager = DocumentJobManager(analyze=analyze, executor=ThreadPoolExecutor(1))
+
+    job = manager.submit(str(make_upload(tmp_path, "vide.txt", "")), "vide.txt")
+    final = asyncio.run(manager.wait(job["job_id"], timeout=5))
+
+    assert final["status"] == "error"
+    assert final["error"] == "Document sans contenu"
+
+
+def test_pending_jobs_are_bounded(tmp_path):
+    """Au-delà du nombre maximal de tâches en attente, les envois sont refusés."""
+    release = threading.Event()
+
+    def analyze(file_path, name):
+        release.wait(5)
+        return {}
+
+    manager = DocumentJobManager(max_pending=2, analyze=analyze, executor=ThreadPoolExecutor(2))
+    jobs = [manager.submit(str(make_upload(tmp_path, f"{i}.txt")), f"{i}.txt") for i in range(2)]
+
+    with pytest.raises(QueueFullError):
+        manager.submit(str(make_upload(tmp_path, "2.txt")), "2.txt")
+
+    release.set()
+    for job in jobs:
+        assert asyncio.run(manager.wait(job["job_id"], timeout=5))["status"] == "done"
+    manager.submit(str(make_upload(tmp_path, "3.txt")), "3.txt")
+
+
+def test_pool_is_created_once_under_concurrent_starts(monkeypatch):
+    """Le démarrage et un premier dépôt simultanés ne créent qu'un seul pool."""
+    created = []
+
+    class SlowPool(ThreadPoolExecutor):
+        def __init__(self, max_workers=None, initializer=None):
+            created.append(self)
+            threading.Event().wait(0.05)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr(document_jobs, "ProcessPoolExecutor", SlowPool)
+    manager = DocumentJobManager(analyze=lambda file_path, name: {})
+
+    threads = [threading.Thread(target=manager._get_executor) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    manager.shutdown()
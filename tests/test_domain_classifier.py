@@ -0,0 +1,45 @@
+"""
+Test du classifieur de domaines juridiques
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.modules.chatbot.domain_classifier import LegalDomainClassifier, detect_domain
+
+
+def test_detects_domains_with_accents_and_plurals():
+    """Les termes sont reconnus quels que soient la casse, les accents et le pluriel."""
+    assert detect_domain("Comment contester une décision de l'AG ?") == "copropriété"
+    assert detect_domain("Mon ASSEMBLEE GENERALE a voté des travaux") == "copropriété"
+    assert detect_domain("Les salariés peuvent-ils saisir les prud’hommes ?") == "prud'hommes"
+    assert detect_domain("Comment répartir un héritage entre héritiers ?") == "succession"
+
+
+def test_short_keywords_do_not_match_inside_words():
+    """Les mots courts ne correspondent pas à l'intérieur d'autres mots."""
+    assert detect_domain("Quel est l'âge légal pour voter ?") == "général"
+    assert detect_domain("J'habite dans un lotissement") == "général"
+
+
+def test_scores_and_legal_terms():
+    """Les scores sont classés et les termes juridiques généraux comptés à part."""
+    result = LegalDomainClassifier().classify(
+        "Selon l'article L.1235-3 du code du travail, mon licenciement peut-il être contesté au tribunal ?"
+    )
+
+    assert result["domain"] == "prud'hommes"
+    assert result["scores"][0] == ("prud'hommes", 2.5)
+    assert result["legal_terms"] == 3
+
+
+def test_long_documents_are_not_cached():
+    """Les questions sont mises en cache, pas les documents entiers."""
+    classifier = LegalDomainClassifier()
+    document = "Le syndic convoque l'assemblée générale. " * 100
+
+    assert classifier.detect(document) == "copropriété"
+    assert classifier.detect("Le syndic convoque l'assemblée générale.") == "copropriété"
+    assert classifier._classify_cached.cache_info().currsize == 1
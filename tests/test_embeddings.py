@@ -0,0 +1,84 @@
+"""
+Test du service d'embeddings: cache, déduplication et interface ChromaDB
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.core.embeddings import EmbeddingService
+
+
+class FakeEncoder:
+    """Modèle simulé: un vecteur dérivé de la longueur de chaque texte."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, show_progress_bar=False):
+        self.encoded.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def make_service(cache_size=4096):
+    service = EmbeddingService(model_name="test", cache_size=cache_size)
+    service._model = FakeEncoder()
+    return service
+
+
+def test_cached_texts_are_not_encoded_again():
+    """Les textes déjà encodés sont servis depuis le cache."""
+    service = make_service()
+
+    first = service.embed(["un", "deux"])
+    second = service.embed(["deux", "trois"])
+
+    assert service._model.encoded == [["un", "deux"], ["trois"]]
+    assert second[0] == first[1]
+    assert (service.cache_hits, service.cache_misses) == (1, 3)
+
+
+def test_identical_texts_in_a_batch_are_encoded_once():
+    """Un texte répété dans un lot n'est encodé qu'une fois; l'ordre des résultats est conservé."""
+    service = make_service()
+
+    embeddings = service.embed(["a", "bb", "a", "a"])
+
+    assert service._model.encoded == [["a", "bb"]]
+    assert embeddings == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [1.0, 1.0]]
+    assert (service.cache_hits, service.cache_misses) == (0, 2)
+
+
+def test_cache_is_bounded_lru():
+    """Au-delà de cache_size, l'embedding le moins récemment utilisé est évincé."""
+    service = make_service(cache_size=2)
+
+    service.embed(["a"])
+    service.embed(["b"])
+    service.embed(["a"])  # "a" devient le plus récent
+    service.embed(["c"])  # évince "b"
+    service.embed(["a", "b"])
+
+    assert service._model.encoded == [["a"], ["b"], ["c"], ["b"]]
+    assert len(service._cache) == 2
+
+
+def test_chroma_embedding_function_contract():
+    """Le service s'utilise comme fonction d'embedding ChromaDB."""
+    service = make_service()
+
+    assert service(["texte"]) == [[5.0, 1.0]]
+    assert EmbeddingService.name() == "valetia_embedding_service"
+    assert service.get_config() == {"model_name": "test", "batch_size": 32}
+
+
+def test_embed_async_runs_in_service_thread():
+    """Le calcul asynchrone retourne les mêmes embeddings que le calcul direct."""
+    service = make_service()
+    try:
+        assert service.embed_async(["abc"]).result(timeout=5) == [[3.0, 1.0]]
+        assert service.embed(["abc"]) == [[3.0, 1.0]]
+        assert service._model.encoded == [["abc"]]
+    finally:
+        service.shutdown()
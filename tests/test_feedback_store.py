@@ -0,0 +1,85 @@
+"""
+Test du stockage indexé des feedbacks
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.modules.learning.feedback_store import FeedbackStore
+
+
+def make_feedback(conversation_id, timestamp, is_helpful=True):
+    return {
+        "feedback_id": f"{conversation_id}_{timestamp}",
+        "conversation_id": conversation_id,
+        "timestamp": timestamp,
+        "user_input": "Question",
+        "assistant_response": "Réponse",
+        "is_helpful": is_helpful,
+        "feedback_text": None,
+    }
+
+
+def test_query_filters_by_conversation_newest_first(tmp_path):
+    """Les feedbacks sont filtrés par conversation et triés du plus récent au plus ancien."""
+    store = FeedbackStore(tmp_path / "feedbacks.sqlite3")
+    for timestamp in (10, 30, 20):
+        store.insert(make_feedback("conv_a", timestamp))
+    store.insert(make_feedback("conv_b", 40))
+
+    feedbacks = store.query(conversation_id="conv_a", limit=2)
+
+    assert [f["timestamp"] for f in feedbacks] == [30, 20]
+    assert all(f["conversation_id"] == "conv_a" for f in feedbacks)
+    assert store.query(limit=1)[0]["conversation_id"] == "conv_b"
+
+
+def test_json_files_are_migrated_once(tmp_path):
+    """Les anciens fichiers JSON sont importés puis archivés."""
+    feedback = make_feedback("conv_a", 10, is_helpful=False)
+    feedback["metadata"] = {"domain": "succession"}
+    with open(tmp_path / f"{feedback['feedback_id']}.json", "w", encoding="utf-8") as f:
+        json.dump(feedback, f)
+
+    store = FeedbackStore(tmp_path / "feedbacks.sqlite3")
+
+    assert store.migrate_json_files(tmp_path) == 1
+    assert store.migrate_json_files(tmp_path) == 0
+    assert not list(tmp_path.glob("*.json"))
+    assert store.query() == [feedback]
+
+
+def test_stats_are_maintained_on_write(tmp_path):
+    """Les agrégats par portée sont mis à jour à chaque feedback."""
+    store = FeedbackStore(tmp_path / "feedbacks.sqlite3")
+    store.insert(make_feedback("conv_a", 86400))
+    store.insert(make_feedback("conv_a", 86400 + 60, is_helpful=False))
+    feedback = make_feedback("conv_b", 2 * 86400)
+    feedback["metadata"] = {"domain": "copropriété"}
+    store.insert(feedback)
+    store.insert(feedback)  # doublon ignoré
+
+    assert store.get_stats() == {"total_count": 3, "helpful_count": 2}
+    assert store.get_stats("conversation", "conv_a") == {"total_count": 2, "helpful_count": 1}
+    assert store.get_stats("domain", "copropriété") == {"total_count": 1, "helpful_count": 1}
+    assert [row["key"] for row in store.get_rollup("day")] == ["1970-01-03", "1970-01-02"]
+
+
+def test_manager_stats_refuse_combined_filters(tmp_path, monkeypatch):
+    """Les statistiques du gestionnaire acceptent un filtre, pas une combinaison de filtres."""
+    # L'import crée le gestionnaire partagé dans data/feedbacks, relatif au répertoire courant
+    monkeypatch.chdir(tmp_path)
+    from valetia.modules.learning.feedback import FeedbackManager
+
+    manager = FeedbackManager(tmp_path)
+    manager.save_feedback("conv_a", "Question", "Réponse", True, metadata={"domain": "succession"})
+
+    assert manager.get_stats(conversation_id="conv_a")["total_count"] == 1
+    assert manager.get_stats(domain="succession")["total_count"] == 1
+    with pytest.raises(ValueError):
+        manager.get_stats(conversation_id="conv_a", domain="succession")
@@ -0,0 +1,33 @@
+"""
+Test de la réponse en flux du gestionnaire hybride
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def test_interrupted_stream_still_saves_exchange(tmp_path, monkeypatch):
+    """Une réponse transmise d'un bloc est enregistrée même si le client arrête la lecture."""
+    # L'import crée le gestionnaire de feedback partagé dans data/feedbacks, relatif au répertoire courant
+    monkeypatch.chdir(tmp_path)
+    from valetia.modules.chatbot.hybrid_manager import HybridConversationManager
+
+    manager = HybridConversationManager(
+        remote_client=None,
+        learning_dir=tmp_path / "learning",
+        conversations_dir=tmp_path / "conversations",
+        use_retrieval=False,
+    )
+    saved = []
+    monkeypatch.setattr(manager, "_choose_source", lambda user_input, context: ("basic", None))
+    monkeypatch.setattr(manager, "_respond", lambda source, example, user_input, context: "Réponse de base.")
+    monkeypatch.setattr(manager, "_save_conversation",
+                        lambda conversation_id, user_input, response, context: saved.append(response))
+
+    stream = manager.stream_response("Question ?", "conv_1")
+    assert next(stream) == "Réponse de base."
+    stream.close()
+
+    assert saved == ["Réponse de base."]
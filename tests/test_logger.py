@@ -0,0 +1,43 @@
+"""
+Test de la configuration centralisée des logs
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.utils import logger as logger_module
+from valetia.utils.logger import LEVELS, get_logger, module_level, parse_module_levels, set_module_level, setup_logging
+
+
+def test_setup_is_idempotent():
+    """Les handlers ne sont installés qu'une fois, quel que soit le nombre de loggers."""
+    get_logger("valetia.a")
+    get_logger("valetia.b")
+
+    assert setup_logging() is False
+
+
+def test_module_levels_use_longest_prefix():
+    """Le niveau d'un module est celui du préfixe configuré le plus long."""
+    saved = dict(logger_module._module_levels)
+    try:
+        set_module_level("valetia.deps", "WARNING")
+        set_module_level("valetia.deps.checker", "DEBUG")
+
+        assert module_level("valetia.deps.alerts") == LEVELS["WARNING"]
+        assert module_level("valetia.deps.checker") == LEVELS["DEBUG"]
+        assert module_level("valetia.deps_extra") == logger_module._default_level
+    finally:
+        logger_module._module_levels.clear()
+        logger_module._module_levels.update(saved)
+        logger_module._level_cache.clear()
+
+
+def test_parse_module_levels():
+    """La variable VALETIA_LOG_LEVELS est lue en couples module=niveau."""
+    assert parse_module_levels("valetia.deps=warning, valetia.core=DEBUG,,x") == {
+        "valetia.deps": "WARNING",
+        "valetia.core": "DEBUG",
+    }
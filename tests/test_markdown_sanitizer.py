@@ -0,0 +1,193 @@
+"""
+Test de la conversion Markdown → HTML sécurisé
+"""
+import asyncio
+import re
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.utils import markdown_sanitizer
+from valetia.utils.markdown_sanitizer import (
+    MarkdownSanitizer,
+    iter_safe_html,
+    markdown_to_safe_html,
+    split_markdown_blocks,
+)
+
+DOCUMENTS = {
+    "listes": "# Titre\n\n- un\n- deux\n\n- trois\n\n  suite du point trois\n\n1. a\n2. b\n\n3. c\n\nConclusion",
+    "code": "Exemple :\n\n```python\nx = 1\n\ny = 2\n```\n\nFin",
+    "références": "Voir [la loi][1] et la note[^1].\n\nAutre paragraphe.\n\n[1]: https://example.org\n[^1]: Note.",
+    "html": "<div>\n\ntexte\n\n</div>\n\nParagraphe",
+}
+
+
+def test_html_is_sanitized():
+    """Le HTML dangereux est retiré, le Markdown est converti."""
+    html = MarkdownSanitizer().convert("**Article 42**\n\n<script>alert(1)</script>")
+
+    assert "<strong>Article 42</strong>" in html
+    assert "<script>" not in html
+
+
+def test_cache_is_bounded_lru():
+    """Les documents récents sont servis depuis le cache, le moins récemment utilisé est évincé."""
+    sanitizer = MarkdownSanitizer(cache_size=2)
+    rendered = []
+    render = sanitizer.render
+    sanitizer.render = lambda text: rendered.append(text) or render(text)
+
+    sanitizer.convert("a")
+    sanitizer.convert("b")
+    sanitizer.convert("a")
+    sanitizer.convert("c")  # évince "b"
+    sanitizer.convert("a")
+    sanitizer.convert("b")
+
+    assert rendered == ["a", "b", "c", "b"]
+    assert (sanitizer.hits, sanitizer.misses) == (2, 4)
+
+
+def test_tools_are_created_once_per_thread():
+    """Le convertisseur et le nettoyeur sont réutilisés dans un thread et distincts entre threads."""
+    sanitizer = MarkdownSanitizer()
+    main_tools = sanitizer._tools()
+    assert sanitizer._tools() is main_tools
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(sanitizer._tools()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main_tools
+    assert other[0][0] is not main_tools[0]
+
+
+def test_convert_many_keeps_order_and_renders_duplicates_once():
+    """Les résultats sont dans l'ordre des textes, un texte répété n'est converti qu'une fois."""
+    sanitizer = MarkdownSanitizer()
+    sanitizer.convert("déjà en cache")
+    rendered = []
+    render = sanitizer.render
+    sanitizer.render = lambda text: rendered.append(text) or render(text)
+
+    texts = ["# Un", "déjà en cache", "# Deux", "# Un"]
+    results = sanitizer.convert_many(texts, max_workers=1)
+
+    assert results == [MarkdownSanitizer().render(text) for text in texts]
+    assert rendered == ["# Un", "# Deux"]
+
+
+def test_convert_many_in_process_pool_keeps_order():
+    """Un lot converti dans le pool de processus garde l'ordre des textes."""
+    sanitizer = MarkdownSanitizer()
+    texts = [f"Paragraphe **{i}**" for i in range(markdown_sanitizer.MIN_BATCH_FOR_POOL * 2)] + ["Paragraphe **0**"]
+
+    results = sanitizer.convert_many(texts, max_workers=2)
+
+    assert results == [MarkdownSanitizer().render(text) for text in texts]
+    assert sanitizer.convert(texts[3]) == results[3]
+    assert sanitizer.hits >= 1
+
+
+def test_split_keeps_lists_and_fenced_code_together():
+    """Les coupures ne séparent ni une liste, ni un bloc de code délimité."""
+    blocks = split_markdown_blocks(DOCUMENTS["code"], target_chars=1)
+    assert blocks == ["Exemple :", "```python\nx = 1\n\ny = 2\n```", "Fin"]
+
+    blocks = split_markdown_blocks(DOCUMENTS["listes"], target_chars=1)
+    assert blocks[0] == "# Titre"
+    assert blocks[1].startswith("- un\n- deux\n\n- trois\n\n  suite du point trois")
+    assert blocks[1].endswith("1. a\n2. b\n\n3. c")
+    assert blocks[2] == "Conclusion"
+
+
+def test_split_keeps_documents_with_references_or_html_whole():
+    """Un document avec des définitions de liens ou du HTML brut n'est pas découpé."""
+    assert split_markdown_blocks(DOCUMENTS["références"], target_chars=1) == [DOCUMENTS["références"]]
+    assert split_markdown_blocks(DOCUMENTS["html"], target_chars=1) == [DOCUMENTS["html"]]
+
+
+def test_short_blocks_are_grouped():
+    """Les blocs courts sont regroupés jusqu'à la taille visée."""
+    text = "\n\n".join(f"Paragraphe {i}" for i in range(10))
+    assert split_markdown_blocks(text) == [text]
+
+
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_blockwise_rendering_matches_whole_document(name):
+    """Le rendu bloc par bloc équivaut au rendu du document entier (à l'espacement près)."""
+    def normalize(html):
+        return re.sub(r"\s+", " ", html).strip()
+
+    text = DOCUMENTS[name]
+    assert normalize("".join(iter_safe_html(text, target_chars=1))) == normalize(markdown_to_safe_html(text))
+
+
+def post_render(body, headers=None, chunk_size=7):
+    """Appelle la route POST /render_markdown et retourne (statut, en-têtes, corps)."""
+    from starlette.requests import Request
+    from valetia.api.routes.render_markdown_route import render_markdown_stream
+
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def call():
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/render_markdown",
+            "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        }
+        response = await render_markdown_stream(Request(scope, receive))
+        if hasattr(response, "body_iterator"):
+            content = "".join([chunk async for chunk in response.body_iterator])
+        else:
+            content = response.body.decode()
+        return response.status_code, response.headers, content
+
+    return asyncio.run(call())
+
+
+def test_render_route_streams_html_with_etag():
+    """La route renvoie le HTML nettoyé avec un ETag, puis 304 si le client l'a déjà."""
+    text = DOCUMENTS["listes"].encode("utf-8")
+
+    status, headers, content = post_render(text)
+    assert status == 200
+    assert "<li>un</li>" in content
+    etag = headers["etag"]
+
+    assert post_render(text)[1]["etag"] == etag
+    assert post_render(b"Autre document")[1]["etag"] != etag
+
+    status, headers, content = post_render(text, {"If-None-Match": f"W/{etag}"})
+    assert status == 304
+    assert content == ""
+
+
+def test_render_route_rejects_large_documents(monkeypatch):
+    """Un document trop volumineux est refusé, que sa taille soit annoncée ou non."""
+    from fastapi import HTTPException
+    from valetia.api.routes import render_markdown_route
+
+    monkeypatch.setattr(render_markdown_route, "MARKDOWN_MAX_BYTES", 20)
+
+    with pytest.raises(HTTPException) as error:
+        post_render(b"x" * 21, {"Content-Length": "21"})
+    assert error.value.status_code == 413
+
+    with pytest.raises(HTTPException) as error:
+        post_render(b"x" * 21)
+    assert error.value.status_code == 413
+
+    assert post_render(b"x" * 20)[0] == 200
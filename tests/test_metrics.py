@@ -0,0 +1,61 @@
+"""
+Test du registre de métriques et de l'export Prometheus
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.utils.metrics import MetricsRegistry
+
+
+def test_histogram_and_counter_export():
+    """Les observations sont exportées au format texte de Prometheus."""
+    registry = MetricsRegistry(mode="full")
+    latency = registry.histogram("valetia_test_seconds", "Durée de test", labels=("backend",), buckets=(0.1, 1.0))
+    errors = registry.counter("valetia_test_errors", "Erreurs de test")
+
+    latency.observe(0.05, backend="local")
+    latency.observe(0.5, backend="local")
+    latency.observe(5.0, backend="local")
+    errors.inc()
+
+    text = registry.render_prometheus()
+    assert '# TYPE valetia_test_seconds histogram' in text
+    assert 'valetia_test_seconds_bucket{backend="local",le="0.1"} 1' in text
+    assert 'valetia_test_seconds_bucket{backend="local",le="1.0"} 2' in text
+    assert 'valetia_test_seconds_bucket{backend="local",le="+Inf"} 3' in text
+    assert 'valetia_test_seconds_count{backend="local"} 3' in text
+    assert '# HELP valetia_test_errors_total Erreurs de test' in text
+    assert '# TYPE valetia_test_errors_total counter' in text
+    assert 'valetia_test_errors_total 1' in text
+
+
+def test_timer_decorator_and_shared_declaration():
+    """Deux déclarations du même nom partagent la même métrique."""
+    registry = MetricsRegistry(mode="full")
+    histogram = registry.histogram("valetia_calls_seconds", labels=("manager",))
+
+    @registry.histogram("valetia_calls_seconds", labels=("manager",)).timed(manager="local")
+    def answer():
+        return "ok"
+
+    assert answer() == "ok"
+    assert histogram.count(manager="local") == 1
+
+
+def test_light_and_off_modes():
+    """Le mode léger ne garde que compteur et somme; le mode off n'enregistre rien."""
+    registry = MetricsRegistry(mode="light")
+    histogram = registry.histogram("valetia_light_seconds")
+    with histogram.time():
+        pass
+    text = registry.render_prometheus()
+    assert "# TYPE valetia_light_seconds summary" in text
+    assert "valetia_light_seconds_count 1" in text
+    assert "_bucket" not in text
+
+    registry.set_mode("off")
+    histogram.observe(1.0)
+    assert histogram.count() == 1
@@ -0,0 +1,97 @@
+"""
+Test du constructeur de prompts à budget de tokens
+"""
+import sys
+import threading
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.modules.chatbot.prompt_builder import PromptBuilder
+
+
+class WhitespaceTokenizer:
+    """Tokenizer minimal: un token par mot."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, add_special_tokens=False):
+        self.calls += 1
+        return text.split()
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+def make_history(turns, words=30):
+    return [
+        {
+            "user": f"Question {i}. " + "mot " * words,
+            "assistant": f"Réponse {i}. " + "mot " * words,
+        }
+        for i in range(turns)
+    ]
+
+
+def test_prompt_fits_budget_and_keeps_recent_turns():
+    """Le prompt tient dans la fenêtre et conserve les échanges récents."""
+    tokenizer = WhitespaceTokenizer()
+    builder = PromptBuilder(tokenizer, max_length=200, answer_tokens=50, safety_margin=0)
+
+    prompt = builder.build("Comment contester une AG ?", history=make_history(10))
+
+    assert len(prompt.split()) <= builder.input_budget
+    assert "Réponse 9." in prompt
+    assert "Question 0." not in prompt
+    assert prompt.endswith("Assistant:")
+
+
+def test_context_is_truncated_and_template_dropped_when_too_large():
+    """Le contexte est tronqué et un template trop long est abandonné."""
+    tokenizer = WhitespaceTokenizer()
+    builder = PromptBuilder(tokenizer, max_length=60, answer_tokens=20, safety_margin=0)
+
+    def template(body):
+        return "consigne " * 100 + body
+
+    prompt = builder.build("Quel délai ?", context="Contexte: " + "détail " * 200, template=template)
+
+    assert "consigne" not in prompt
+    assert "Quel délai ?" in prompt
+    assert len(prompt.split()) <= builder.input_budget
+
+
+def test_segment_tokenisation_is_cached():
+    """Les segments déjà tokenisés ne sont pas recalculés."""
+    tokenizer = WhitespaceTokenizer()
+    builder = PromptBuilder(tokenizer, max_length=500, answer_tokens=50)
+    history = make_history(3, words=5)
+
+    builder.build("Première question", history=history)
+    calls = tokenizer.calls
+    builder.build("Première question", history=history)
+
+    assert tokenizer.calls == calls
+
+
+def test_token_cache_is_shared_between_threads():
+    """Le cache de tokens reste borné et cohérent quand plusieurs threads l'utilisent."""
+    builder = PromptBuilder(WhitespaceTokenizer(), max_length=500, cache_size=16)
+    texts = [f"segment numéro {i}" for i in range(64)]
+    wrong = []
+
+    def encode_all():
+        for text in texts * 20:
+            if builder.encode(text) != text.split():
+                wrong.append(text)
+
+    threads = [threading.Thread(target=encode_all) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert wrong == []
+    assert len(builder._token_cache) == 16
@@ -0,0 +1,75 @@
+"""
+Test du registre de templates de prompts
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from valetia.modules.chatbot.prompt_builder import PromptBuilder
+from valetia.modules.chatbot.prompt_templates import PromptRegistry
+
+
+class WhitespaceTokenizer:
+    """Tokenizer minimal: un token par mot, avec journal des textes tokenisés."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text, add_special_tokens=False):
+        self.encoded.append(text)
+        return text.split()
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+def test_render_matches_format_and_versions_are_tracked():
+    """Le rendu est identique à str.format et chaque nouveau texte crée une version."""
+    registry = PromptRegistry()
+    text = "Consigne juridique.\n\nQuestion : {question}\n\nRéponse :"
+    template = registry.register("juridique", text)
+
+    assert template("Qui paie ?") == text.format(question="Qui paie ?")
+    assert registry.register("juridique", text) is template
+
+    updated = registry.register("juridique", text + " ")
+    assert updated.version == 2
+    assert registry.get("juridique") is updated
+    assert registry.get("juridique", version=1) is template
+    assert template.key != updated.key
+
+    with pytest.raises(ValueError):
+        registry.register("juridique", "Autre {question}", version=1)
+
+
+def test_static_parts_are_tokenised_once_per_tokenizer():
+    """Les parties fixes sont tokenisées une seule fois par tokenizer."""
+    registry = PromptRegistry()
+    template = registry.register("juridique", "un deux trois {question} quatre cinq")
+    tokenizer = WhitespaceTokenizer()
+
+    assert template.static_token_count(tokenizer) == 5
+    calls = len(tokenizer.encoded)
+    assert template.static_token_count(tokenizer) == 5
+    assert len(tokenizer.encoded) == calls
+    assert registry.token_counts(tokenizer) == {template.key: 5}
+
+
+def test_prompt_builder_does_not_retokenise_compiled_template():
+    """Le constructeur de prompts ne retokenise pas le texte fixe d'un template compilé."""
+    registry = PromptRegistry()
+    template = registry.register("juridique", "consigne " * 20 + "{question} fin")
+    tokenizer = WhitespaceTokenizer()
+    builder = PromptBuilder(tokenizer, max_length=200, answer_tokens=50, safety_margin=0)
+
+    builder.build("Première question", template=template)
+    tokenizer.encoded.clear()
+    prompt = builder.build("Seconde question", template=template)
+
+    assert prompt.startswith("Utilisateur: " + "consigne " * 20 + "Seconde question fin")
+    assert not any("consigne" in text for text in tokenizer.encoded)
+    assert len(prompt.split()) <= builder.input_budget
@@ -0,0 +1,110 @@
+"""
+Test de la génération des rapports PDF en tâches de fond
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.core.report_jobs import QueueFullError, ReportJobManager
+
+
+class FakeRenderer:
+    """Rendu simulé: écrit le Markdown dans le fichier, après un signal optionnel."""
+
+    def __init__(self, release=None, fail=False):
+        self.calls = 0
+        self.release = release
+        self.fail = fail
+
+    def __call__(self, markdown_text, output_path):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("rendu impossible")
+        Path(output_path).write_text(f"%PDF {markdown_text}")
+
+
+def make_manager(tmp_path, renderer, **kwargs):
+    return ReportJobManager(cache_dir=tmp_path, renderer=renderer, executor=ThreadPoolExecutor(2), **kwargs)
+
+
+def test_identical_reports_are_rendered_once(tmp_path):
+    """Un rapport identique est servi depuis le cache; un rendu en cours est partagé."""
+    release = threading.Event()
+    renderer = FakeRenderer(release)
+    manager = make_manager(tmp_path, renderer)
+
+    first = manager.submit("# Rapport")
+    second = manager.submit("# Rapport")
+    assert first["status"] == "running"
+    assert second["job_id"] == first["job_id"]
+
+    release.set()
+    assert manager.wait(first["job_id"], timeout=5)["status"] == "done"
+    assert manager.result_path(first["job_id"]).read_text() == "%PDF # Rapport"
+
+    third = manager.submit("# Rapport")
+    assert third["status"] == "done" and third["cached"]
+    assert renderer.calls == 1
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_failed_render_leaves_no_temporary_file(tmp_path):
+    """Un rendu en échec est signalé et son fichier temporaire supprimé."""
+    manager = make_manager(tmp_path, FakeRenderer(fail=True))
+
+    job = manager.wait(manager.submit("# Rapport")["job_id"], timeout=5)
+
+    assert job["status"] == "error"
+    assert "rendu impossible" in job["error"]
+    assert manager.result_path(job["job_id"]) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_is_bounded(tmp_path):
+    """Les rapports les moins récemment utilisés sont purgés au-delà de la taille maximale."""
+    manager = make_manager(tmp_path, FakeRenderer(), max_bytes=30, keep_recent=0)
+
+    for text in ("premier rapport", "deuxième rapport", "troisième rapport"):
+        manager.wait(manager.submit(text)["job_id"], timeout=5)
+
+    assert len(list(tmp_path.glob("*.pdf"))) == 1
+
+
+def test_recently_finished_reports_are_not_purged(tmp_path):
+    """Le PDF d'une tâche tout juste terminée reste téléchargeable, même au-delà de la taille maximale."""
+    manager = make_manager(tmp_path, FakeRenderer(), max_bytes=30)
+
+    jobs = [manager.wait(manager.submit(text)["job_id"], timeout=5)
+            for text in ("premier rapport", "deuxième rapport", "troisième rapport")]
+
+    assert all(manager.result_path(job["job_id"]) is not None for job in jobs)
+
+    manager.keep_recent = 0
+    manager.cleanup()
+    assert len(list(tmp_path.glob("*.pdf"))) == 1
+
+
+def test_submit_is_refused_when_too_many_renders_are_pending(tmp_path):
+    """Au-delà de max_pending rendus en cours, une nouvelle demande est refusée; le cache reste servi."""
+    release = threading.Event()
+    manager = make_manager(tmp_path, FakeRenderer(release), max_pending=1)
+
+    first = manager.submit("# Premier")
+    try:
+        assert manager.submit("# Premier")["job_id"] == first["job_id"]
+        with pytest.raises(QueueFullError):
+            manager.submit("# Second")
+    finally:
+        release.set()
+
+    assert manager.wait(first["job_id"], timeout=5)["status"] == "done"
+    assert manager.submit("# Premier")["cached"]
+    assert manager.wait(manager.submit("# Second")["job_id"], timeout=5)["status"] == "done"
@@ -0,0 +1,166 @@
+"""
+Test de la recherche sémantique dans les échanges et les documents
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.modules.chatbot.retrieval import KnowledgeRetriever
+
+
+class FakeEmbedder:
+    """Embeddings simulés: un vecteur constant par texte."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input):
+        return self.embed(input)
+
+    def embed(self, texts):
+        self.calls += 1
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FakeCollection:
+    """Collection minimale: renvoie des résultats fixés et enregistre les filtres reçus."""
+
+    def __init__(self, results=(), release=None):
+        self.results = list(results)
+        self.release = release
+        self.queries = []
+        self.upserts = []
+
+    def count(self):
+        return len(self.results)
+
+    def query(self, query_embeddings, n_results, where, include):
+        self.queries.append(where)
+        if self.release is not None:
+            self.release.wait(5)
+        results = self.results[:n_results]
+        return {
+            "documents": [[text for text, _, _ in results]],
+            "metadatas": [[metadata for _, metadata, _ in results]],
+            "distances": [[distance for _, _, distance in results]],
+        }
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.upserts.append({"ids": ids, "documents": documents, "metadatas": metadatas})
+
+
+class FakeClient:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def get_or_create_collection(self, name, embedding_function=None):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+def make_retriever(conversations=None, documents=None, **kwargs):
+    client = FakeClient(conversations=conversations or FakeCollection(), documents=documents or FakeCollection())
+    return KnowledgeRetriever(client=client, embedder=FakeEmbedder(), **kwargs)
+
+
+def wait_until_idle(retriever):
+    deadline = time.monotonic() + 5
+    while retriever._running and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_search_filters_on_helpful_and_domain():
+    """Seuls les échanges utiles sont cherchés; le domaine filtre les deux collections, sauf "général"."""
+    retriever = make_retriever(FakeCollection([("échange", {}, 0.0)]), FakeCollection([("extrait", {}, 0.0)]))
+
+    retriever.search("Question", domain="copropriété")
+    retriever.search("Question", domain="général")
+
+    assert retriever.conversations.queries == [
+        {"$and": [{"helpful": True}, {"domain": "copropriété"}]},
+        {"helpful": True},
+    ]
+    assert retriever.documents.queries == [{"domain": "copropriété"}, None]
+
+
+def test_distances_become_scores_above_minimum():
+    """Les distances sont converties en scores; les résultats sous le score minimal sont écartés."""
+    conversations = FakeCollection([
+        ("proche", {"user_input": "Q", "assistant_response": "R"}, 0.2),
+        ("lointain", {}, 1.6),
+    ])
+    documents = FakeCollection([("extrait", {"document_name": "bail.pdf"}, 0.6)])
+    retriever = make_retriever(conversations, documents, min_score=0.5)
+
+    hits = retriever.search("Question", k=5)
+
+    assert [(hit["source"], hit["text"]) for hit in hits] == [("conversation", "proche"), ("document", "extrait")]
+    assert [round(hit["score"], 2) for hit in hits] == [0.9, 0.7]
+
+
+def test_format_hits():
+    """Les échanges sont présentés en question/réponse, les extraits avec le nom du document."""
+    retriever = make_retriever()
+    hits = [
+        {"source": "conversation", "text": "", "score": 0.9,
+         "metadata": {"user_input": "Délai ?", "assistant_response": "Deux mois."}},
+        {"source": "document", "text": "x" * 20, "score": 0.7, "metadata": {"document_name": "bail.pdf"}},
+    ]
+
+    assert retriever.format_hits([]) == ""
+    assert retriever.format_hits(hits, max_chars=10).split("\n") == [
+        "Références pertinentes:",
+        "- [Échange validé] Q: Délai ?",
+        "- [Document bail.pdf] " + "x" * 10,
+    ]
+
+
+def test_chunk_text_keeps_paragraphs_and_overlaps():
+    """Les paragraphes sont regroupés jusqu'à la taille d'un extrait, avec recouvrement."""
+    retriever = make_retriever(chunk_size=30, chunk_overlap=5)
+
+    chunks = retriever.chunk_text("a" * 10 + "\n\n" + "b" * 10 + "\n\n" + "c" * 10)
+    assert chunks == ["a" * 10 + "\n" + "b" * 10, "b" * 5 + "\n" + "c" * 10]
+
+    assert retriever.chunk_text("x" * 70) == ["x" * 30, "x" * 30, "x" * 20]
+    assert retriever.chunk_text("\n\n") == []
+
+
+def test_slow_query_is_abandoned_and_queued_query_cancelled():
+    """Une requête au-delà du budget est ignorée; celle qui n'a pas démarré est retirée du pool."""
+    release = threading.Event()
+    conversations = FakeCollection([("lent", {}, 0.0)], release=release)
+    documents = FakeCollection([("extrait", {}, 0.0)])
+    retriever = make_retriever(conversations, documents, max_workers=1)
+
+    try:
+        assert retriever.search("Question", timeout=0.1) == []
+    finally:
+        release.set()
+    wait_until_idle(retriever)
+
+    assert documents.queries == []
+
+
+def test_search_is_shed_while_pool_is_saturated():
+    """Tant que des requêtes abandonnées occupent le pool, les nouvelles recherches sont ignorées."""
+    release = threading.Event()
+    conversations = FakeCollection([("lent", {}, 0.0)], release=release)
+    documents = FakeCollection([("extrait", {}, 0.0)])
+    retriever = make_retriever(conversations, documents)
+
+    try:
+        assert [hit["text"] for hit in retriever.search("Question", timeout=0.1)] == ["extrait"]
+        retriever.search("Question", timeout=0.1)
+        calls = retriever.embedder.calls
+        assert retriever.search("Question", timeout=0.1) == []
+        assert retriever.embedder.calls == calls
+    finally:
+        release.set()
+    wait_until_idle(retriever)
+
+    assert retriever._running == 0
+    assert len(retriever.search("Question", timeout=1)) == 2
@@ -0,0 +1,76 @@
+"""
+Test des traces par requête et du profileur par échantillonnage
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.utils.tracing import Tracer
+
+
+def test_nested_spans_are_exported_as_one_otlp_trace(tmp_path):
+    """Les spans enfants partagent la trace du span racine et sont exportés ensemble."""
+    tracer = Tracer(enabled=True, export_path=tmp_path / "traces.jsonl", profile_slowest=0)
+
+    @tracer.traced("chatbot.save_conversation")
+    def save():
+        pass
+
+    @tracer.traced("chatbot.get_response", manager="local")
+    def get_response():
+        with tracer.span("chatbot.generate", backend="local"):
+            pass
+        save()
+
+    get_response()
+    get_response()
+
+    lines = (tmp_path / "traces.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["chatbot.get_response"]
+    assert "parentSpanId" not in root
+    assert {span["traceId"] for span in spans} == {root["traceId"]}
+    assert by_name["chatbot.generate"]["parentSpanId"] == root["spanId"]
+    assert by_name["chatbot.save_conversation"]["parentSpanId"] == root["spanId"]
+    assert {"key": "manager", "value": {"stringValue": "local"}} in root["attributes"]
+
+
+def test_errors_are_recorded_in_span_status(tmp_path):
+    """Une exception marque le span en erreur sans être interceptée."""
+    tracer = Tracer(enabled=True, export_path=tmp_path / "traces.jsonl", profile_slowest=0)
+
+    try:
+        with tracer.span("document.analyze"):
+            raise ValueError("document vide")
+    except ValueError:
+        pass
+
+    span = json.loads((tmp_path / "traces.jsonl").read_text(encoding="utf-8"))["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["status"] == {"code": 2, "message": "ValueError: document vide"}
+
+
+def test_profiler_keeps_slowest_requests(tmp_path):
+    """Seuls les profils des N requêtes les plus lentes sont conservés."""
+    tracer = Tracer(enabled=False, profile_slowest=0)
+    tracer.configure(profile_slowest=2, profiles_dir=tmp_path)
+    tracer.profiler.interval = 0.001
+
+    def slow_step(duration):
+        time.sleep(duration)
+
+    for duration in (0.03, 0.06, 0.02, 0.09):
+        with tracer.span("chatbot.get_response"):
+            slow_step(duration)
+
+    index = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))
+    assert len(index) == 2
+    assert all(entry["duration"] >= 0.055 for entry in index)
+    assert sorted(path.name for path in tmp_path.glob("*.folded")) == sorted(entry["file"] for entry in index)
+    folded = (tmp_path / index[0]["file"]).read_text(encoding="utf-8")
+    assert "slow_step" in folded
@@ -0,0 +1,86 @@
+"""
+Test de la synthèse vocale phrase par phrase et du cache audio
+"""
+import os
+import sys
+import time
+import wave
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.modules.speech.tts import AudioCache, SpeechSynthesizer, split_sentences
+
+
+class FakeBackend:
+    """Moteur de synthèse minimal: une trame de silence par caractère."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, wav_path):
+        self.calls.append(text)
+        with wave.open(wav_path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(16000)
+            wav_file.writeframes(b"\x00\x00" * len(text))
+
+
+def test_split_sentences_merges_short_and_cuts_long_fragments():
+    """Les fragments courts sont regroupés et les phrases longues coupées."""
+    text = "Oui. Le syndic doit convoquer l'assemblée générale. " + "mot, " * 100 + "fin."
+
+    fragments = split_sentences(text, max_chars=120)
+
+    assert fragments[0] == "Oui. Le syndic doit convoquer l'assemblée générale."
+    assert all(len(fragment) <= 120 for fragment in fragments)
+    assert " ".join(fragments).split() == text.split()
+
+
+def test_repeated_sentences_are_served_from_cache(tmp_path):
+    """Une phrase déjà synthétisée n'est pas resynthétisée."""
+    backend = FakeBackend()
+    synthesizer = SpeechSynthesizer(voice="test", cache=AudioCache(tmp_path), backend=backend)
+    disclaimer = "Il est recommandé de consulter un professionnel du droit."
+
+    first = list(synthesizer.stream(f"Le délai est de deux mois. {disclaimer}"))
+    second = list(synthesizer.stream(f"Le délai est de cinq ans. {disclaimer}"))
+
+    assert [result["cached"] for result in first] == [False, False]
+    assert [result["cached"] for result in second] == [False, True]
+    assert backend.calls.count(disclaimer) == 1
+
+    output = synthesizer.synthesize(f"Le délai est de cinq ans. {disclaimer}", tmp_path / "reponse.wav")
+    with wave.open(output, "rb") as wav_file:
+        assert wav_file.getnframes() == len("Le délai est de cinq ans.") + len(disclaimer)
+
+
+def test_cleanup_removes_expired_then_least_recently_used(tmp_path):
+    """La purge supprime les fichiers expirés puis les moins récemment utilisés."""
+    cache = AudioCache(tmp_path, max_bytes=250, max_age=3600)
+    now = time.time()
+    for name, age in (("expire", 7200), ("ancien", 600), ("recent", 60), ("nouveau", 0)):
+        path = cache.path_for(name)
+        path.write_bytes(b"\x00" * 100)
+        os.utime(path, (now - age, now - age))
+
+    assert cache.cleanup() == 2
+    assert sorted(path.stem for path in tmp_path.glob("*.wav")) == ["nouveau", "recent"]
+
+
+def test_combined_responses_are_stored_in_the_cache(tmp_path):
+    """Les réponses assemblées sont rangées (et réutilisées) dans le cache audio."""
+    backend = FakeBackend()
+    cache = AudioCache(tmp_path)
+    synthesizer = SpeechSynthesizer(voice="test", cache=cache, backend=backend)
+    parts = [result["audio_path"] for result in synthesizer.stream("Le délai est de deux mois. Il court dès la notification.")]
+
+    output = synthesizer.combine(parts)
+
+    assert Path(output).parent == tmp_path
+    assert synthesizer.combine(parts) == output
+    assert cache.hits == 1
+    with wave.open(output, "rb") as wav_file:
+        assert wav_file.getnframes() == sum(len(call) for call in backend.calls)
@@ -0,0 +1,79 @@
+"""
+Test du pipeline vocal (reconnaissance, réponse et synthèse en flux)
+"""
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.modules.speech.pipeline import IncrementalSentenceSplitter, VoicePipeline
+
+
+class FakeRecognizer:
+    """Reconnaissance simulée: deux segments puis la transcription finale."""
+
+    def transcribe_stream(self, audio_path):
+        yield {"text": "Qui convoque", "final": False}
+        yield {"text": "Qui convoque l'assemblée générale ?", "final": False}
+        yield {"text": "Qui convoque l'assemblée générale ?", "final": True}
+
+
+class FakeSynthesizer:
+    """Synthèse simulée: durée fixe par phrase."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def synthesize_sentence(self, sentence):
+        time.sleep(self.delay)
+        return {"sentence": sentence, "audio_path": f"{len(sentence)}.wav", "cached": False, "latency": self.delay}
+
+
+class FakeSpeechProcessor:
+    def __init__(self, delay):
+        self.recognizer = FakeRecognizer()
+        self.synthesizer = FakeSynthesizer(delay)
+
+
+class StreamingManager:
+    """Gestionnaire simulé produisant une phrase par intervalle."""
+
+    def __init__(self, sentences, delay):
+        self.sentences = sentences
+        self.delay = delay
+
+    def stream_response(self, user_input, conversation_id, context=None):
+        for sentence in self.sentences:
+            time.sleep(self.delay)
+            yield sentence + " "
+
+
+def test_splitter_emits_complete_sentences_only():
+    """Seules les phrases terminées sont émises avant la fin du flux."""
+    splitter = IncrementalSentenceSplitter(min_chars=10)
+
+    assert splitter.feed("Le syndic convoque") == []
+    assert splitter.feed(" l'assemblée. Elle se ti") == ["Le syndic convoque l'assemblée."]
+    assert splitter.feed("ent chaque année") == []
+    assert splitter.flush() == ["Elle se tient chaque année"]
+
+
+def test_answer_and_synthesis_overlap():
+    """La synthèse commence avant la fin de la réponse et l'aller-retour reste sous la somme des étapes."""
+    sentences = [f"Phrase numéro {i} de la réponse juridique." for i in range(4)]
+    pipeline = VoicePipeline(FakeSpeechProcessor(delay=0.05), StreamingManager(sentences, delay=0.05))
+
+    events = list(pipeline.run(audio_path="question.wav", conversation_id="test"))
+
+    types = [event["type"] for event in events]
+    assert types[:3] == ["partial", "partial", "transcript"]
+    assert types.count("audio") == 4
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["response"] == " ".join(sentences)
+
+    latency = done["latency"]
+    assert latency["tts_first_audio"] < latency["answer"]
+    assert latency["total"] < latency["answer"] + latency["tts_busy"]
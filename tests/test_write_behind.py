@@ -0,0 +1,129 @@
+"""
+Test de la file d'écriture différée
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au chemin Python pour permettre les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from valetia.core.write_behind import WriteBehindQueue
+
+
+class FakeCollection:
+    """Collection minimale enregistrant les appels à add."""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def add(self, ids, documents, metadatas, embeddings=None):
+        time.sleep(self.delay)
+        self.calls.append(list(ids))
+
+
+def test_items_are_written_in_batches():
+    """Les éléments sont regroupés par lots de taille maximale."""
+    collection = FakeCollection()
+    writer = WriteBehindQueue(collection, max_batch=4, flush_interval=10)
+
+    for i in range(10):
+        writer.add(f"id_{i}", f"doc {i}", {"i": i})
+    writer.flush()
+
+    assert [len(call) for call in collection.calls] == [4, 4, 2]
+    assert writer.written == 10
+    writer.close()
+
+
+def test_partial_batch_is_written_after_interval():
+    """Un lot incomplet est écrit une fois le délai écoulé."""
+    collection = FakeCollection()
+    writer = WriteBehindQueue(collection, max_batch=100, flush_interval=0.05)
+
+    writer.add("id_0", "doc", {})
+    time.sleep(0.3)
+
+    assert collection.calls == [["id_0"]]
+    writer.close()
+
+
+def test_full_queue_applies_back_pressure():
+    """Une file pleine refuse les ajouts après le délai d'attente."""
+    collection = FakeCollection(delay=0.5)
+    writer = WriteBehindQueue(collection, max_batch=1, flush_interval=10, max_pending=1, put_timeout=0.05)
+
+    accepted = [writer.add(f"id_{i}", "doc", {}) for i in range(5)]
+
+    assert not all(accepted)
+    assert writer.dropped == accepted.count(False)
+    writer.close()
+    assert writer.written == accepted.count(True)
+
+
+def test_pending_items_are_readable_and_updatable():
+    """Les éléments pas encore écrits sont consultables et modifiables."""
+    collection = FakeCollection()
+    collection.metadatas = []
+    collection.add = lambda ids, documents, metadatas, embeddings=None: collection.metadatas.extend(metadatas)
+    writer = WriteBehindQueue(collection, max_batch=100, flush_interval=10)
+
+    writer.add("id_0", "doc", {"conversation_id": "c1", "helpful": False})
+    writer.add("id_1", "doc", {"conversation_id": "c2", "helpful": False})
+
+    assert writer.find_pending(conversation_id="c1") == [{"conversation_id": "c1", "helpful": False}]
+    assert writer.update_pending({"helpful": True}, conversation_id="c1") == 1
+
+    writer.flush()
+    assert writer.find_pending() == []
+    assert {"conversation_id": "c1", "helpful": True} in collection.metadatas
+    writer.close()
+
+
+def test_items_stay_pending_until_written():
+    """Un élément en cours d'écriture reste consultable; une modification faite entre-temps est reportée."""
+    release = threading.Event()
+    started = threading.Event()
+    collection = FakeCollection()
+    collection.updates = []
+
+    def add(ids, documents, metadatas, embeddings=None):
+        started.set()
+        release.wait(5)
+        collection.calls.append(list(ids))
+
+    collection.add = add
+    collection.update = lambda ids, metadatas: collection.updates.append((list(ids), metadatas))
+    writer = WriteBehindQueue(collection, max_batch=1, flush_interval=10)
+
+    writer.add("id_0", "doc", {"conversation_id": "c1", "helpful": False})
+    assert started.wait(5)
+    assert writer.find_pending(conversation_id="c1") == [{"conversation_id": "c1", "helpful": False}]
+    assert writer.update_pending({"helpful": True}, conversation_id="c1") == 1
+
+    release.set()
+    writer.flush()
+    assert collection.calls == [["id_0"]]
+    assert writer.find_pending() == []
+    assert collection.updates == [(["id_0"], [{"conversation_id": "c1", "helpful": True}])]
+    writer.close()
+
+
+def test_failed_batch_is_no_longer_pending():
+    """Un lot en échec est abandonné: ses éléments ne sont plus lus comme en attente."""
+    collection = FakeCollection()
+
+    def add(ids, documents, metadatas, embeddings=None):
+        raise RuntimeError("base indisponible")
+
+    collection.add = add
+    writer = WriteBehindQueue(collection, max_batch=1, flush_interval=10)
+
+    writer.add("id_0", "doc", {"conversation_id": "c1"})
+    writer.flush()
+
+    assert writer.failed == 1
+    assert writer.find_pending() == []
+    writer.close()
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
-from valetia.api.routes import render_markdown_route, rapport_route
+from valetia.api.routes import document_route, metrics_route, render_markdown_route, rapport_route
 
 app = FastAPI()
 
 app.include_router(render_markdown_route.router)
 app.include_router(rapport_route.router)
+app.include_router(metrics_route.router)
+app.include_router(document_route.router)
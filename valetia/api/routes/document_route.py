@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from valetia.config.settings import DOCUMENT_MAX_BYTES, DOCUMENT_UPLOAD_DIR
+from valetia.core.document_jobs import QueueFullError, get_document_jobs
+
+router = APIRouter()
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Intervalle des messages de maintien de connexion du flux d'événements
+STREAM_HEARTBEAT_SECONDS = 15
+
+def _job_response(job):
+    job_id = job["job_id"]
+    return dict(job, status_url=f"/documents/jobs/{job_id}", stream_url=f"/documents/jobs/{job_id}/stream")
+
+@router.post("/documents", status_code=202, summary="Envoie un document et dépose son analyse")
+async def deposer_document(file: UploadFile = File(...)):
+    name = Path(file.filename or "document.txt").name
+    os.makedirs(DOCUMENT_UPLOAD_DIR, exist_ok=True)
+    # L'extension d'origine détermine le chargeur du document
+    fd, upload_path = tempfile.mkstemp(dir=DOCUMENT_UPLOAD_DIR, suffix=Path(name).suffix.lower())
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > DOCUMENT_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Document trop volumineux (maximum {DOCUMENT_MAX_BYTES} octets)")
+                f.write(chunk)
+        job = get_document_jobs().submit(upload_path, name)
+    except QueueFullError as e:
+        os.unlink(upload_path)
+        raise HTTPException(status_code=503, detail=f"Service d'analyse saturé: {e}", headers={"Retry-After": "30"})
+    except BaseException:
+        os.unlink(upload_path)
+        raise
+    return _job_response(job)
+
+@router.get("/documents/jobs/{job_id}", summary="État et résultat d'une analyse de document")
+async def etat_analyse(job_id: str, wait: float = 0):
+    jobs = get_document_jobs()
+    job = await jobs.wait(job_id, timeout=min(wait, 30)) if wait > 0 else jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche inconnue ou expirée")
+    return _job_response(job)
+
+@router.get("/documents/jobs/{job_id}/stream", summary="Suivi d'une analyse de document en flux (Server-Sent Events)")
+async def suivre_analyse(job_id: str):
+    jobs = get_document_jobs()
+    job = jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche inconnue ou expirée")
+
+    async def events():
+        current = job
+        yield f"event: status\ndata: {json.dumps({'job_id': job_id, 'status': current['status']})}\n\n"
+        while current is not None and current["status"] == "running":
+            current = await jobs.wait(job_id, timeout=STREAM_HEARTBEAT_SECONDS)
+            if current is not None and current["status"] == "running":
+                yield ": maintien\n\n"
+        if current is None:
+            yield f"event: error\ndata: {json.dumps({'job_id': job_id, 'error': 'Tâche expirée'})}\n\n"
+        else:
+            yield f"event: {'result' if current['status'] == 'done' else 'error'}\ndata: {json.dumps(current, ensure_ascii=False, default=str)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.on_event("startup")
+async def demarrer_analyses():
+    # Démarrage du pool (et chargement des modèles spaCy) sans bloquer le démarrage du serveur
+    await asyncio.get_running_loop().run_in_executor(None, get_document_jobs().start)
@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from valetia.utils.metrics import metrics
+
+router = APIRouter()
+
+@router.get("/metrics", summary="Métriques de latence au format Prometheus", response_class=PlainTextResponse)
+def exporter_metriques():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
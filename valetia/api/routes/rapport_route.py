@@ -1,29 +1,53 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, HTTPException
 from fastapi.responses import FileResponse
-from valetia.utils.markdown_sanitizer import markdown_to_safe_html
-from tempfile import NamedTemporaryFile
-import weasyprint
+from valetia.core.report_jobs import QueueFullError, get_report_jobs
 
 router = APIRouter()
 
+# Attente maximale de la route synchrone avant de renvoyer la tâche à interroger
+SYNC_RENDER_TIMEOUT = 60
+
+def _job_response(job):
+    return dict(job, status_url=f"/rapport/jobs/{job['job_id']}", download_url=f"/rapport/jobs/{job['job_id']}/pdf")
+
+def _submit(jobs, markdown):
+    try:
+        return jobs.submit(markdown)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Service de rapports saturé: {e}", headers={"Retry-After": "30"})
+
+@router.post("/rapport/jobs", status_code=202, summary="Dépose une demande de rapport PDF à partir de contenu Markdown")
+def deposer_rapport(markdown: str = Body(..., embed=True)):
+    return _job_response(_submit(get_report_jobs(), markdown))
+
+@router.get("/rapport/jobs/{job_id}", summary="État d'une demande de rapport PDF")
+def etat_rapport(job_id: str):
+    job = get_report_jobs().status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche inconnue ou expirée")
+    return _job_response(job)
+
+@router.get("/rapport/jobs/{job_id}/pdf", summary="Télécharge le rapport PDF d'une demande terminée")
+def telecharger_rapport(job_id: str):
+    jobs = get_report_jobs()
+    job = jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche inconnue ou expirée")
+    if job["status"] == "error":
+        raise HTTPException(status_code=500, detail=job["error"])
+    path = jobs.result_path(job_id)
+    if path is None:
+        raise HTTPException(status_code=409, detail=f"Rapport non disponible (état: {job['status']})")
+    # FileResponse lit le fichier par blocs: le PDF n'est jamais chargé en mémoire
+    return FileResponse(path, media_type='application/pdf', filename="rapport_valetia.pdf")
+
 @router.post("/rapport/generer", summary="Génère un rapport PDF à partir de contenu Markdown")
 def generer_rapport(markdown: str = Body(..., embed=True)):
-    html_content = markdown_to_safe_html(markdown)
-    full_html = f"""
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <style>
-            body {{ font-family: sans-serif; margin: 2em; }}
-            h1, h2, h3 {{ color: #004080; }}
-        </style>
-    </head>
-    <body>
-        {html_content}
-    </body>
-    </html>
-    """
-    tmp = NamedTemporaryFile(delete=False, suffix=".pdf")
-    weasyprint.HTML(string=full_html).write_pdf(tmp.name)
-
-    return FileResponse(tmp.name, media_type='application/pdf', filename="rapport_valetia.pdf")
+    jobs = get_report_jobs()
+    job = jobs.wait(_submit(jobs, markdown)["job_id"], timeout=SYNC_RENDER_TIMEOUT)
+    if job["status"] == "error":
+        raise HTTPException(status_code=500, detail=job["error"])
+    path = jobs.result_path(job["job_id"])
+    if path is None:
+        raise HTTPException(status_code=504, detail=_job_response(job))
+    return FileResponse(path, media_type='application/pdf', filename="rapport_valetia.pdf")
@@ -1,10 +1,48 @@
-from fastapi import APIRouter, Query
-from valetia.utils.markdown_sanitizer import markdown_to_safe_html
+import hashlib
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from valetia.config.settings import MARKDOWN_MAX_BYTES
+from valetia.utils.markdown_sanitizer import SANITIZER_VERSION, iter_safe_html, markdown_to_safe_html
 
 router = APIRouter()
 
-@router.get("/render_markdown", summary="Convertir du markdown en HTML sécurisé")
+@router.get("/render_markdown", summary="Convertir du markdown en HTML sécurisé", deprecated=True)
 def render_markdown(text: str = Query(..., description="Texte Markdown à convertir")):
     html = markdown_to_safe_html(text)
     return {"html": html}
 
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+@router.post("/render_markdown", summary="Convertir du markdown (corps de la requête) en HTML sécurisé, en flux",
+             description="Le document est converti bloc par bloc: le HTML produit peut différer de celui "
+                         "de la route GET (espacement entre les blocs), pour un rendu équivalent.")
+async def render_markdown_stream(request: Request):
+    declared_length = request.headers.get("content-length")
+    if declared_length is not None and declared_length.isdigit() and int(declared_length) > MARKDOWN_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Document trop volumineux (maximum {MARKDOWN_MAX_BYTES} octets)")
+
+    # Lecture du corps par morceaux: le dépassement est détecté sans tout recevoir
+    body = bytearray()
+    digest = hashlib.sha256(f"{SANITIZER_VERSION}\0".encode("utf-8"))
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MARKDOWN_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Document trop volumineux (maximum {MARKDOWN_MAX_BYTES} octets)")
+        digest.update(chunk)
+
+    etag = f'"{digest.hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Le document doit être encodé en UTF-8")
+
+    # HTML transmis bloc par bloc (réponse chunked), au fil du rendu
+    return StreamingResponse(iter_safe_html(text), media_type="text/html; charset=utf-8", headers=headers)
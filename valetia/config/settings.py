@@ -11,8 +11,23 @@ MODELS_DIR = os.path.join(ROOT_DIR, "models")
 LOGS_DIR = os.path.join(ROOT_DIR, "logs")
 
 # Configuration des logs
-LOG_LEVEL = "INFO"
-LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {name} | {message}"
+# Niveaux par module (complétés par VALETIA_LOG_LEVELS="module=NIVEAU,...")
+LOG_MODULE_LEVELS = {}
+# Fichier de log au format JSON (une ligne par message)
+LOG_SERIALIZE = False
+
+# Métriques: "full" (histogrammes complets), "light" (compteur et somme, pour la production) ou "off"
+METRICS_MODE = os.environ.get("VALETIA_METRICS", "full")
+
+# Traces par requête (format OTLP/JSON, une trace par ligne)
+TRACING_ENABLED = os.environ.get("VALETIA_TRACING", "0") == "1"
+TRACES_FILE = os.path.join(LOGS_DIR, "traces.jsonl")
+# Profileur par échantillonnage: nombre de requêtes les plus lentes conservées (0: désactivé)
+PROFILE_SLOWEST = int(os.environ.get("VALETIA_PROFILE_SLOWEST", "0"))
+PROFILE_INTERVAL = 0.005  # secondes entre deux échantillons
+PROFILES_DIR = os.path.join(LOGS_DIR, "profiles")
 
 # Configuration des modèles
 DEFAULT_MODEL = "mistral-7b-instruct-v0.2.Q4_K_M"
@@ -26,3 +41,53 @@ API_RATE_LIMIT = 5  # requêtes par minute
 # Configuration base de données vectorielle
 VECTOR_DB_PATH = os.path.join(DATA_DIR, "embeddings")
 EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Configuration du chatbot local
+CHATBOT_MAX_NEW_TOKENS = 150
+PROMPT_CONTEXT_SHARE = 0.4
+
+# Décodage assisté: un petit modèle brouillon propose des tokens vérifiés en bloc par le modèle principal
+ASSISTED_GENERATION = os.environ.get("VALETIA_ASSISTED_GENERATION", "0").lower() in ("1", "true", "yes")
+DRAFT_MODEL = os.environ.get("VALETIA_DRAFT_MODEL", "distilgpt2")
+
+# Recherche sémantique (échanges utiles et documents analysés)
+RETRIEVAL_TOP_K = 3
+RETRIEVAL_LATENCY_BUDGET = 0.3  # secondes
+RETRIEVAL_MIN_SCORE = 0.5
+
+# Écriture différée des échanges dans ChromaDB
+WRITE_BEHIND_MAX_BATCH = 64
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0  # secondes
+WRITE_BEHIND_MAX_PENDING = 1024
+
+# Reconnaissance vocale locale (Whisper quantifié sur CPU)
+ASR_MODEL = os.environ.get("VALETIA_ASR_MODEL", "small")
+ASR_COMPUTE_TYPE = os.environ.get("VALETIA_ASR_COMPUTE_TYPE", "int8")
+ASR_LANGUAGE = "fr"
+ASR_BEAM_SIZE = 1
+ASR_SAMPLE_RATE = 16000
+
+# Synthèse vocale locale (voix Piper) et cache audio
+TTS_VOICE = os.environ.get("VALETIA_TTS_VOICE", "fr_FR-siwis-medium")
+TTS_MODELS_DIR = os.path.join(MODELS_DIR, "tts")
+AUDIO_CACHE_DIR = os.path.join(DATA_DIR, "audio", "cache")
+AUDIO_CACHE_MAX_BYTES = 200 * 1024 * 1024
+AUDIO_CACHE_MAX_AGE = 7 * 24 * 3600  # secondes
+
+# Rapports PDF: rendu dans un pool de processus, cache adressé par contenu
+REPORT_CACHE_DIR = os.path.join(DATA_DIR, "reports", "cache")
+REPORT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+REPORT_WORKERS = 2
+REPORT_JOB_TTL = 3600  # secondes de conservation de l'état d'une tâche terminée
+REPORT_MAX_PENDING = 16  # rendus en attente ou en cours au-delà desquels les demandes sont refusées
+REPORT_KEEP_RECENT = 60  # secondes pendant lesquelles un rapport tout juste rendu n'est pas purgé
+
+# Rendu Markdown par l'API: taille maximale d'un document envoyé
+MARKDOWN_MAX_BYTES = int(os.environ.get("VALETIA_MARKDOWN_MAX_BYTES", 2 * 1024 * 1024))
+
+# Analyse de documents par l'API: pool de processus avec modèles spaCy préchargés
+DOCUMENT_UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
+DOCUMENT_MAX_BYTES = 20 * 1024 * 1024
+DOCUMENT_WORKERS = int(os.environ.get("VALETIA_DOCUMENT_WORKERS", 2))
+DOCUMENT_MAX_PENDING = 32  # tâches en attente ou en cours au-delà desquelles les envois sont refusés
+DOCUMENT_JOB_TTL = 3600  # secondes de conservation d'un résultat
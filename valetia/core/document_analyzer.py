@@ -2,13 +2,56 @@
 Module principal pour l'analyse de documents juridiques.
 """
 import os
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Union, Any
 
 from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
+from valetia.utils.tracing import traced
 
 logger = get_logger(__name__)
 
+DOCUMENT_LOAD_SECONDS = metrics.histogram(
+    "valetia_document_load_seconds", "Durée du chargement d'un document (extraction du texte)", labels=("format",)
+)
+NLP_ANALYSIS_SECONDS = metrics.histogram("valetia_nlp_analysis_seconds", "Durée de l'analyse spaCy d'un document")
+
+# Modèles spaCy français, du plus précis au plus léger
+SPACY_MODELS = ("fr_core_news_md", "fr_core_news_sm")
+
+# Modèle spaCy chargé une fois par processus et partagé par les analyseurs
+_nlp = None
+_nlp_loaded = False
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """
+    Retourne le modèle spaCy français du processus (chargé au premier appel).
+    
+    Returns:
+        Le pipeline spaCy, ou None si aucun modèle n'est disponible
+    
+    Raises:
+        ImportError: Si spaCy n'est pas installé
+    """
+    global _nlp, _nlp_loaded
+    if not _nlp_loaded:
+        with _nlp_lock:
+            if not _nlp_loaded:
+                import spacy
+                for model_name in SPACY_MODELS:
+                    try:
+                        _nlp = spacy.load(model_name)
+                        logger.info(f"Modèle spaCy chargé: {model_name}")
+                        break
+                    except OSError:
+                        continue
+                else:
+                    logger.error("Aucun modèle spaCy français n'est disponible")
+                _nlp_loaded = True
+    return _nlp
+
 class DocumentAnalyzer:
     """
     Classe principale pour l'analyse de documents juridiques.
@@ -27,6 +70,7 @@ class DocumentAnalyzer:
         self.model_name = model_name
         logger.info(f"DocumentAnalyzer initialisé avec le modèle: {model_name}")
     
+    @traced("document.load")
     def load_document(self, file_path: Union[str, Path]) -> bool:
         """
         Charge un document depuis un chemin de fichier.
@@ -64,10 +108,11 @@ class DocumentAnalyzer:
             elif extension == ".pdf":
                 try:
                     import pypdf2
-                    reader = pypdf2.PdfReader(file_path)
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
+                    with DOCUMENT_LOAD_SECONDS.time(format="pdf"):
+                        reader = pypdf2.PdfReader(file_path)
+                        text = ""
+                        for page in reader.pages:
+                            text += page.extract_text() + "\n"
                     document_info["content"] = text
                     document_info["metadata"]["page_count"] = len(reader.pages)
                     logger.info(f"Document PDF chargé: {file_path.name} ({len(reader.pages)} pages)")
@@ -193,6 +238,7 @@ class DocumentAnalyzer:
         
         return None
     
+    @traced("document.analyze")
     def analyze_document(self, document_index: int) -> Dict[str, Any]:
         """
         Analyse un document et extrait des informations pertinentes.
@@ -218,22 +264,16 @@ class DocumentAnalyzer:
             "document_name": document["name"],
             "word_count": len(content.split()),
             "character_count": len(content),
-            "entities": [],
+            "entities": {},
             "keywords": [],
             "summary": "",
         }
         
         # Analyse NLP basique
         try:
-            import spacy
-            try:
-                nlp = spacy.load("fr_core_news_md")
-            except:
-                try:
-                    nlp = spacy.load("fr_core_news_sm")
-                except:
-                    logger.error("Aucun modèle spaCy français n'est disponible")
-                    return result
+            nlp = get_nlp()
+            if nlp is None:
+                return result
             
             # Limiter la taille du texte pour éviter les erreurs de mémoire
             max_chars = 100000  # 100K caractères max
@@ -241,7 +281,8 @@ class DocumentAnalyzer:
                 logger.warning(f"Texte tronqué de {len(content)} à {max_chars} caractères")
                 content = content[:max_chars]
             
-            doc = nlp(content)
+            with NLP_ANALYSIS_SECONDS.time():
+                doc = nlp(content)
             
             # Extraire les entités nommées
             entities = {}
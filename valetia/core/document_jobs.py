@@ -0,0 +1,235 @@
+"""
+Analyse de documents en tâches de fond.
+
+Les documents envoyés à l'API sont analysés dans un pool de processus dont
+chaque processus charge le modèle spaCy à son démarrage et le garde en
+mémoire: les analyses de plusieurs utilisateurs s'exécutent en parallèle,
+hors de la boucle d'événements du serveur. Le nombre de tâches en attente
+est borné; au-delà, les nouveaux envois sont refusés plutôt que mis en file
+sans limite. Le fichier envoyé est supprimé dès la fin de son analyse.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from valetia.config.settings import (
+    DOCUMENT_JOB_TTL,
+    DOCUMENT_MAX_PENDING,
+    DOCUMENT_WORKERS,
+)
+from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+DOCUMENT_JOBS = metrics.counter("valetia_document_jobs", "Tâches d'analyse de documents", labels=("result",))
+
+
+class QueueFullError(RuntimeError):
+    """Trop de tâches d'analyse en attente."""
+
+
+def _warm_worker() -> None:
+    """Initialisation d'un processus du pool: chargement du modèle spaCy."""
+    from valetia.core.document_analyzer import get_nlp
+
+    try:
+        get_nlp()
+    except ImportError:
+        logger.error("Module spaCy non disponible pour l'analyse NLP")
+
+
+def analyze_file(file_path: str, name: str) -> Dict[str, Any]:
+    """
+    Charge et analyse un document (exécuté dans un processus du pool).
+
+    Args:
+        file_path: Fichier du document
+        name: Nom du document d'origine
+
+    Returns:
+        Résultats de l'analyse (voir DocumentAnalyzer.analyze_document)
+    """
+    from valetia.core.document_analyzer import DocumentAnalyzer
+
+    analyzer = DocumentAnalyzer()
+    if not analyzer.load_document(file_path):
+        raise ValueError(f"Impossible de charger le document {name}")
+    analyzer.documents[0]["name"] = name
+    result = analyzer.analyze_document(0)
+    if "error" in result:
+        raise ValueError(result["error"])
+    return result
+
+
+class DocumentJobManager:
+    """File bornée des analyses de documents: dépôt, suivi et résultats."""
+
+    def __init__(self,
+                 max_workers: int = DOCUMENT_WORKERS,
+                 max_pending: int = DOCUMENT_MAX_PENDING,
+                 job_ttl: float = DOCUMENT_JOB_TTL,
+                 analyze: Callable[[str, str], Dict[str, Any]] = analyze_file,
+                 executor: Optional[Executor] = None):
+        """
+        Initialise le gestionnaire d'analyses.
+
+        Args:
+            max_workers: Nombre de processus d'analyse
+            max_pending: Nombre maximal de tâches en attente ou en cours
+            job_ttl: Durée de conservation d'une tâche terminée (et de son résultat), en secondes
+            analyze: Fonction d'analyse (chemin, nom), appelable dans un autre processus
+            executor: Pool d'exécution (par défaut un pool de processus préchargé, créé au premier dépôt)
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.analyze = analyze
+        self._executor = executor
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        # Fin de chaque tâche, signalée une fois le résultat enregistré et le fichier supprimé
+        self._finished: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # Verrou distinct: submit crée le pool alors qu'il détient déjà _lock
+        self._executor_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Démarre le pool et charge les modèles sans attendre le premier document."""
+        executor = self._get_executor()
+        if isinstance(executor, ProcessPoolExecutor):
+            # Un appel vide par processus force leur démarrage (et donc _warm_worker)
+            for _ in range(self.max_workers):
+                executor.submit(time.sleep, 0)
+
+    def submit(self, file_path: str, name: str) -> Dict[str, Any]:
+        """
+        Dépose une analyse de document.
+
+        Args:
+            file_path: Fichier envoyé (supprimé à la fin de l'analyse)
+            name: Nom du document d'origine
+
+        Returns:
+            État de la tâche (voir status)
+
+        Raises:
+            QueueFullError: Si le nombre maximal de tâches en attente est atteint
+        """
+        now = time.time()
+        with self._lock:
+            self._prune_jobs(now)
+            if len(self._futures) >= self.max_pending:
+                DOCUMENT_JOBS.inc(result="rejected")
+                raise QueueFullError(f"{len(self._futures)} analyses déjà en attente")
+
+            job = {"job_id": uuid.uuid4().hex, "name": name, "status": "running", "result": None,
+                   "error": None, "created_at": now, "finished_at": None}
+            future = self._get_executor().submit(self.analyze, str(file_path), name)
+            self._jobs[job["job_id"]] = job
+            self._futures[job["job_id"]] = future
+            self._finished[job["job_id"]] = Future()
+
+        future.add_done_callback(lambda done: self._finish(job, file_path, done))
+        logger.info(f"Analyse du document {name} déposée: {job['job_id']}")
+        return self.status(job["job_id"])
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retourne l'état d'une tâche.
+
+        Args:
+            job_id: Identifiant de la tâche
+
+        Returns:
+            {"job_id", "name", "status": running|done|error, "result", "error"}, ou None si la tâche est inconnue
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {key: job[key] for key in ("job_id", "name", "status", "result", "error")}
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Attend la fin d'une tâche sans bloquer la boucle d'événements.
+
+        Args:
+            job_id: Identifiant de la tâche
+            timeout: Temps d'attente maximal en secondes (None: sans limite)
+
+        Returns:
+            État de la tâche à la fin de l'attente
+        """
+        finished = self._finished.get(job_id)
+        if finished is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(finished)), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.status(job_id)
+
+    def pending(self) -> int:
+        """Nombre de tâches en attente ou en cours."""
+        return len(self._futures)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Arrête le pool d'analyse."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+        return self._executor
+
+    def _finish(self, job: Dict[str, Any], file_path: str, future: Future) -> None:
+        """Termine une tâche: enregistre le résultat et supprime le fichier envoyé."""
+        try:
+            job["result"] = future.result()
+            job["status"] = "done"
+            DOCUMENT_JOBS.inc(result="done")
+            logger.info(f"Analyse du document {job['name']} terminée: {job['job_id']}")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse du document {job['name']}: {e}")
+            job.update(status="error", error=str(e))
+            DOCUMENT_JOBS.inc(result="error")
+        finally:
+            job["finished_at"] = time.time()
+            with self._lock:
+                self._futures.pop(job["job_id"], None)
+                finished = self._finished.get(job["job_id"])
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+            if finished is not None:
+                finished.set_result(None)
+
+    def _prune_jobs(self, now: float) -> None:
+        """Oublie les tâches terminées depuis plus de job_ttl (verrou déjà pris)."""
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and now - job["finished_at"] > self.job_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._finished.pop(job_id, None)
+
+
+_document_jobs = None
+_document_jobs_lock = threading.Lock()
+
+
+def get_document_jobs() -> DocumentJobManager:
+    """Retourne le gestionnaire d'analyses partagé (créé au premier appel)."""
+    global _document_jobs
+    if _document_jobs is None:
+        with _document_jobs_lock:
+            if _document_jobs is None:
+                _document_jobs = DocumentJobManager()
+    return _document_jobs
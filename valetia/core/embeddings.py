@@ -0,0 +1,158 @@
+"""
+Service d'embeddings pour la base vectorielle de Valetia.
+
+Calcule les embeddings avec le modèle configuré (EMBEDDING_MODEL), par lots,
+avec un cache indexé par empreinte du contenu. Les calculs peuvent être
+délégués à un thread dédié pour ne pas bloquer le traitement des requêtes.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from valetia.config.settings import EMBEDDING_MODEL
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EmbeddingService:
+    """
+    Calcule et met en cache les embeddings de textes.
+
+    L'instance est directement utilisable comme fonction d'embedding d'une
+    collection ChromaDB (méthode __call__ recevant une liste de documents).
+    """
+
+    def __init__(self,
+                 model_name: str = EMBEDDING_MODEL,
+                 batch_size: int = 32,
+                 cache_size: int = 4096,
+                 device: Optional[str] = None):
+        """
+        Initialise le service d'embeddings (le modèle est chargé au premier usage).
+
+        Args:
+            model_name: Nom du modèle sentence-transformers
+            batch_size: Nombre de textes encodés par lot
+            cache_size: Nombre maximal d'embeddings conservés en mémoire
+            device: Périphérique de calcul ("cpu", "cuda"), détecté automatiquement si None
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.device = device
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        """Interface de fonction d'embedding attendue par ChromaDB."""
+        return self.embed(input)
+
+    @staticmethod
+    def name() -> str:
+        """Nom de la fonction d'embedding (utilisé par ChromaDB)."""
+        return "valetia_embedding_service"
+
+    def get_config(self) -> Dict[str, Any]:
+        """Configuration de la fonction d'embedding (utilisée par ChromaDB)."""
+        return {"model_name": self.model_name, "batch_size": self.batch_size}
+
+    def _get_model(self):
+        """Charge le modèle sentence-transformers une seule fois."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+                    logger.info(f"Modèle d'embeddings {self.model_name} chargé")
+        return self._model
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Empreinte du contenu utilisée comme clé de cache."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Calcule les embeddings d'une liste de textes.
+
+        Seuls les textes absents du cache sont encodés, par lots de batch_size.
+
+        Args:
+            texts: Textes à encoder
+
+        Returns:
+            Liste des embeddings, dans l'ordre des textes
+        """
+        keys = [self.content_hash(text) for text in texts]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    embeddings[i] = cached
+                else:
+                    missing.setdefault(key, []).append(i)
+            self.cache_hits += len(texts) - sum(len(idx) for idx in missing.values())
+            self.cache_misses += len(missing)
+
+        if missing:
+            missing_keys = list(missing)
+            missing_texts = [texts[missing[key][0]] for key in missing_keys]
+            vectors = self._get_model().encode(
+                missing_texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+
+            with self._cache_lock:
+                for key, vector in zip(missing_keys, vectors):
+                    vector = [float(x) for x in vector]
+                    for i in missing[key]:
+                        embeddings[i] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return embeddings
+
+    def embed_async(self, texts: Sequence[str]) -> Future:
+        """
+        Calcule les embeddings dans le thread du service.
+
+        Args:
+            texts: Textes à encoder
+
+        Returns:
+            Future contenant la liste des embeddings
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="valetia-embeddings")
+        return self._executor.submit(self.embed, list(texts))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Arrête le thread du service après les calculs en attente."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Instance unique pour l'utilisation dans l'application
+embedding_service = EmbeddingService()
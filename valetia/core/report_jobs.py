@@ -0,0 +1,359 @@
+"""
+Génération des rapports PDF en tâches de fond.
+
+Le rendu Markdown → HTML → PDF (WeasyPrint) s'exécute dans un pool de
+processus: une requête dépose une tâche, interroge son état puis télécharge
+le fichier, sans jamais attendre le rendu. Les PDF sont rangés dans un cache
+adressé par le contenu du rapport: un rapport identique est servi
+immédiatement. Chaque rendu écrit dans un fichier temporaire du cache,
+renommé à la fin ou supprimé en cas d'échec; rien n'est laissé sur le disque
+hors du cache, dont la taille est bornée. Le nombre de rendus en attente est
+borné lui aussi: au-delà, les demandes sont refusées (QueueFullError).
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+from valetia.config.settings import (
+    REPORT_CACHE_DIR,
+    REPORT_CACHE_MAX_BYTES,
+    REPORT_JOB_TTL,
+    REPORT_KEEP_RECENT,
+    REPORT_MAX_PENDING,
+    REPORT_WORKERS,
+)
+from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+REPORT_SECONDS = metrics.histogram("valetia_report_render_seconds", "Durée du rendu d'un rapport PDF")
+REPORT_REQUESTS = metrics.counter("valetia_report_requests", "Demandes de rapport PDF", labels=("result",))
+
+# Version du gabarit: la modifier invalide les rapports en cache
+REPORT_TEMPLATE_VERSION = "1"
+
+REPORT_HTML_TEMPLATE = """
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            body {{ font-family: sans-serif; margin: 2em; }}
+            h1, h2, h3 {{ color: #004080; }}
+        </style>
+    </head>
+    <body>
+        {html_content}
+    </body>
+    </html>
+    """
+
+# Fichiers temporaires plus anciens que ce délai: rendus interrompus par l'arrêt d'un processus
+STALE_TEMP_SECONDS = 3600
+
+
+class QueueFullError(RuntimeError):
+    """Trop de rendus de rapports en attente: la demande est refusée."""
+
+
+def render_report(markdown_text: str, output_path: str) -> None:
+    """
+    Rend un rapport Markdown en PDF (exécuté dans un processus du pool).
+
+    Args:
+        markdown_text: Contenu Markdown du rapport
+        output_path: Fichier PDF à écrire
+    """
+    import weasyprint
+    from valetia.utils.markdown_sanitizer import markdown_to_safe_html
+
+    full_html = REPORT_HTML_TEMPLATE.format(html_content=markdown_to_safe_html(markdown_text))
+    weasyprint.HTML(string=full_html).write_pdf(output_path)
+
+
+def _render_timed(renderer: Callable[[str, str], None], markdown_text: str, output_path: str) -> float:
+    """Exécute le rendu et retourne sa durée (le chronomètre tourne dans le processus du pool)."""
+    start = time.perf_counter()
+    renderer(markdown_text, output_path)
+    return time.perf_counter() - start
+
+
+class ReportJobManager:
+    """File des rapports PDF: dépôt, suivi et téléchargement."""
+
+    def __init__(self,
+                 cache_dir: Union[str, Path] = REPORT_CACHE_DIR,
+                 max_bytes: int = REPORT_CACHE_MAX_BYTES,
+                 job_ttl: float = REPORT_JOB_TTL,
+                 max_workers: int = REPORT_WORKERS,
+                 max_pending: int = REPORT_MAX_PENDING,
+                 keep_recent: float = REPORT_KEEP_RECENT,
+                 renderer: Callable[[str, str], None] = render_report,
+                 executor: Optional[Executor] = None):
+        """
+        Initialise le gestionnaire de rapports.
+
+        Args:
+            cache_dir: Répertoire du cache des PDF
+            max_bytes: Taille totale maximale du cache, en octets
+            job_ttl: Durée de conservation de l'état d'une tâche terminée, en secondes
+            max_workers: Nombre de processus de rendu
+            max_pending: Nombre maximal de rendus en attente ou en cours
+            keep_recent: Délai pendant lequel le PDF d'une tâche terminée n'est pas purgé, en secondes
+            renderer: Fonction de rendu (markdown, chemin de sortie), appelable dans un autre processus
+            executor: Pool d'exécution (par défaut un pool de processus créé au premier rendu)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.job_ttl = job_ttl
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_recent = keep_recent
+        self.renderer = renderer
+        self._executor = executor
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Tâche en cours par empreinte de contenu, pour ne rendre qu'une fois un même rapport
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self._remove_stale_temp_files()
+
+    @staticmethod
+    def make_key(markdown_text: str) -> str:
+        """Empreinte du contenu d'un rapport (et de la version du gabarit)."""
+        return hashlib.sha256(f"{REPORT_TEMPLATE_VERSION}\0{markdown_text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        """Chemin du PDF en cache d'une empreinte."""
+        return self.cache_dir / f"{key}.pdf"
+
+    def submit(self, markdown_text: str) -> Dict[str, Any]:
+        """
+        Dépose une demande de rapport.
+
+        Args:
+            markdown_text: Contenu Markdown du rapport
+
+        Returns:
+            État de la tâche (voir status); "done" immédiatement si le rapport est en cache
+
+        Raises:
+            QueueFullError: Si max_pending rendus sont déjà en attente ou en cours
+        """
+        key = self.make_key(markdown_text)
+        now = time.time()
+
+        with self._lock:
+            self._prune_jobs(now)
+
+            # Même rapport déjà en cours de rendu: même tâche
+            pending_id = self._pending.get(key)
+            if pending_id is not None:
+                REPORT_REQUESTS.inc(result="pending")
+                return self._public(self._jobs[pending_id])
+
+            job = {"job_id": uuid.uuid4().hex, "key": key, "status": "running", "cached": False,
+                   "error": None, "created_at": now, "finished_at": None}
+            self._jobs[job["job_id"]] = job
+
+            path = self.path_for(key)
+            if path.exists():
+                os.utime(path)
+                job.update(status="done", cached=True, finished_at=now)
+                REPORT_REQUESTS.inc(result="cached")
+                return self._public(job)
+
+            if len(self._pending) >= self.max_pending:
+                del self._jobs[job["job_id"]]
+                REPORT_REQUESTS.inc(result="rejected")
+                raise QueueFullError(f"{len(self._pending)} rapports en cours de rendu")
+
+            self._pending[key] = job["job_id"]
+
+        REPORT_REQUESTS.inc(result="rendered")
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            future = self._get_executor().submit(_render_timed, self.renderer, markdown_text, temp_path)
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+                self._jobs.pop(job["job_id"], None)
+            os.unlink(temp_path)
+            raise
+        future.add_done_callback(lambda done: self._finish(job, temp_path, done))
+        return self._public(job)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retourne l'état d'une tâche.
+
+        Args:
+            job_id: Identifiant de la tâche
+
+        Returns:
+            {"job_id", "status": running|done|error, "cached", "error"}, ou None si la tâche est inconnue
+        """
+        job = self._jobs.get(job_id)
+        return self._public(job) if job is not None else None
+
+    def result_path(self, job_id: str) -> Optional[Path]:
+        """
+        Retourne le PDF d'une tâche terminée.
+
+        Args:
+            job_id: Identifiant de la tâche
+
+        Returns:
+            Chemin du PDF, ou None si la tâche n'est pas terminée (ou si le fichier a été purgé)
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != "done":
+            return None
+        path = self.path_for(job["key"])
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 0.05) -> Optional[Dict[str, Any]]:
+        """
+        Attend la fin d'une tâche (pour les appels synchrones).
+
+        Args:
+            job_id: Identifiant de la tâche
+            timeout: Temps d'attente maximal en secondes (None: sans limite)
+            poll_interval: Intervalle entre deux vérifications
+
+        Returns:
+            État final de la tâche, ou l'état courant si le délai est dépassé
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.status(job_id)
+            if job is None or job["status"] in ("done", "error"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def cleanup(self) -> int:
+        """
+        Supprime les PDF les moins récemment utilisés au-delà de la taille maximale.
+
+        Les PDF des tâches terminées depuis moins de keep_recent secondes sont conservés,
+        pour que le client qui attend l'un d'eux puisse encore le télécharger.
+
+        Returns:
+            Nombre de fichiers supprimés
+        """
+        now = time.time()
+        with self._lock:
+            recent = {self.path_for(job["key"]) for job in self._jobs.values()
+                      if job["status"] == "done" and now - job["finished_at"] < self.keep_recent}
+
+        files = []
+        for path in self.cache_dir.glob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path in recent:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        if removed:
+            logger.info(f"Cache des rapports purgé: {removed} fichiers supprimés")
+        return removed
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Arrête le pool de rendu."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _finish(self, job: Dict[str, Any], temp_path: str, future) -> None:
+        """Termine une tâche: déplace le PDF dans le cache ou enregistre l'erreur."""
+        try:
+            REPORT_SECONDS.observe(future.result())
+            os.replace(temp_path, self.path_for(job["key"]))
+            job.update(status="done", finished_at=time.time())
+            logger.info(f"Rapport PDF généré: {job['job_id']}")
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération du rapport PDF {job['job_id']}: {e}")
+            job.update(status="error", error=str(e))
+        finally:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            if job["finished_at"] is None:
+                job["finished_at"] = time.time()
+            with self._lock:
+                self._pending.pop(job["key"], None)
+
+        if job["status"] == "done":
+            self.cleanup()
+
+    def _prune_jobs(self, now: float) -> None:
+        """Oublie les tâches terminées depuis plus de job_ttl (verrou déjà pris)."""
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and now - job["finished_at"] > self.job_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _remove_stale_temp_files(self) -> None:
+        """Supprime les fichiers temporaires laissés par un processus arrêté pendant un rendu."""
+        now = time.time()
+        for path in self.cache_dir.glob("*.tmp"):
+            try:
+                if now - path.stat().st_mtime > STALE_TEMP_SECONDS:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        """État d'une tâche transmis aux clients."""
+        return {key: job[key] for key in ("job_id", "status", "cached", "error")}
+
+
+_report_jobs = None
+_report_jobs_lock = threading.Lock()
+
+
+def get_report_jobs() -> ReportJobManager:
+    """Retourne le gestionnaire de rapports partagé (créé au premier appel)."""
+    global _report_jobs
+    if _report_jobs is None:
+        with _report_jobs_lock:
+            if _report_jobs is None:
+                _report_jobs = ReportJobManager()
+    return _report_jobs
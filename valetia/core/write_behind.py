@@ -0,0 +1,237 @@
+"""
+File d'écriture différée pour les insertions ChromaDB.
+
+Les ajouts sont placés dans une file bornée et persistés par un thread
+dédié, par lots (plusieurs ids/documents/métadonnées par appel). Un lot est
+écrit lorsqu'il atteint sa taille maximale, après un intervalle donné, sur
+demande explicite et à l'arrêt du processus. Les éléments pas encore écrits
+restent consultables (et modifiables) en mémoire, ce qui permet de relire
+ses propres écritures sans attendre le thread d'écriture.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+CHROMA_SECONDS = metrics.histogram(
+    "valetia_chroma_seconds", "Durée des opérations ChromaDB", labels=("operation",)
+)
+
+# Marqueurs de contrôle transmis au thread d'écriture
+_FLUSH = object()
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Persiste les ajouts à une collection en arrière-plan.
+
+    Quand la file est pleine, add() bloque jusqu'à put_timeout secondes
+    (contre-pression), puis abandonne l'ajout en le signalant.
+    """
+
+    def __init__(self,
+                 collection,
+                 embedder=None,
+                 max_batch: int = 64,
+                 flush_interval: float = 1.0,
+                 max_pending: int = 1024,
+                 put_timeout: float = 5.0,
+                 name: str = "chromadb"):
+        """
+        Initialise la file et démarre le thread d'écriture.
+
+        Args:
+            collection: Collection ChromaDB cible (méthode add)
+            embedder: Service d'embeddings calculant les vecteurs par lot (optionnel)
+            max_batch: Nombre maximal d'éléments par appel à collection.add
+            flush_interval: Délai maximal en secondes avant l'écriture d'un lot incomplet
+            max_pending: Nombre maximal d'éléments en attente dans la file
+            put_timeout: Temps d'attente maximal de add() lorsque la file est pleine
+            name: Nom utilisé pour le thread et les logs
+        """
+        self.collection = collection
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.name = name
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        # Éléments acceptés et pas encore enregistrés dans la collection, par identifiant
+        self._unwritten: Dict[str, Dict[str, Any]] = {}
+        self._unwritten_lock = threading.Lock()
+
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name=f"valetia-write-behind-{name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, item_id: str, document: str, metadata: Dict[str, Any]) -> bool:
+        """
+        Place un élément dans la file d'écriture.
+
+        Args:
+            item_id: Identifiant de l'élément
+            document: Texte du document
+            metadata: Métadonnées associées
+
+        Returns:
+            bool: True si l'élément a été accepté, False s'il a été abandonné
+        """
+        if self._closed:
+            logger.error(f"File d'écriture '{self.name}' fermée, élément {item_id} abandonné")
+            self.dropped += 1
+            return False
+
+        metadata = dict(metadata)
+        with self._unwritten_lock:
+            self._unwritten[item_id] = metadata
+        try:
+            self._queue.put((item_id, document, metadata), timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._unwritten_lock:
+                self._unwritten.pop(item_id, None)
+            logger.error(f"File d'écriture '{self.name}' saturée, élément {item_id} abandonné")
+            self.dropped += 1
+            return False
+
+    def pending(self) -> int:
+        """Nombre approximatif d'éléments en attente d'écriture."""
+        return self._queue.qsize()
+
+    def find_pending(self, **where: Any) -> List[Dict[str, Any]]:
+        """
+        Retourne les métadonnées des éléments pas encore écrits.
+
+        Args:
+            **where: Valeurs de métadonnées que les éléments doivent avoir
+
+        Returns:
+            Copies des métadonnées des éléments correspondants
+        """
+        with self._unwritten_lock:
+            return [dict(metadata) for metadata in self._unwritten.values()
+                    if all(metadata.get(key) == value for key, value in where.items())]
+
+    def update_pending(self, changes: Dict[str, Any], **where: Any) -> int:
+        """
+        Modifie les métadonnées des éléments pas encore écrits.
+
+        Args:
+            changes: Métadonnées à modifier
+            **where: Valeurs de métadonnées que les éléments doivent avoir
+
+        Returns:
+            Nombre d'éléments modifiés
+        """
+        updated = 0
+        with self._unwritten_lock:
+            for metadata in self._unwritten.values():
+                if all(metadata.get(key) == value for key, value in where.items()):
+                    metadata.update(changes)
+                    updated += 1
+        return updated
+
+    def flush(self) -> None:
+        """Écrit immédiatement les éléments en attente et attend la fin de l'écriture."""
+        if self._closed or not self._thread.is_alive():
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self) -> None:
+        """Écrit les éléments restants puis arrête le thread d'écriture."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        logger.info(f"File d'écriture '{self.name}' arrêtée ({self.written} écrits, {self.failed} en échec)")
+
+    def _run(self) -> None:
+        """Boucle du thread d'écriture."""
+        batch: List[Any] = []
+        deadline: Optional[float] = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # Délai écoulé: écriture du lot incomplet
+                self._write(batch)
+                batch, deadline = [], None
+                continue
+
+            if item is _FLUSH or item is _STOP:
+                if batch:
+                    self._write(batch)
+                batch, deadline = [], None
+                self._queue.task_done()
+                if item is _STOP:
+                    return
+                continue
+
+            batch.append(item)
+            self._queue.task_done()
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.max_batch:
+                self._write(batch)
+                batch, deadline = [], None
+
+    def _write(self, batch: List[Any]) -> None:
+        """Écrit un lot dans la collection."""
+        if not batch:
+            return
+        ids = [item[0] for item in batch]
+        documents = [item[1] for item in batch]
+        with self._unwritten_lock:
+            # Copie des métadonnées écrites; les éléments restent consultables jusqu'à la fin de l'écriture
+            metadatas = [dict(item[2]) for item in batch]
+
+        try:
+            kwargs = {"ids": ids, "documents": documents, "metadatas": metadatas}
+            if self.embedder is not None:
+                kwargs["embeddings"] = self.embedder.embed(documents)
+            with CHROMA_SECONDS.time(operation="add"):
+                self.collection.add(**kwargs)
+            self.written += len(batch)
+            logger.debug(f"File d'écriture '{self.name}': lot de {len(batch)} éléments écrit")
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Erreur lors de l'écriture d'un lot de {len(batch)} éléments dans '{self.name}': {e}")
+            # Éléments abandonnés: ils ne sont pas réessayés et ne doivent plus être lus comme en attente
+            with self._unwritten_lock:
+                for item_id in ids:
+                    self._unwritten.pop(item_id, None)
+            return
+
+        with self._unwritten_lock:
+            # Métadonnées modifiées pendant l'écriture (update_pending): reportées dans la collection
+            changed_ids, changed_metadatas = [], []
+            for item_id, written in zip(ids, metadatas):
+                current = self._unwritten.pop(item_id, None)
+                if current is not None and current != written:
+                    changed_ids.append(item_id)
+                    changed_metadatas.append(dict(current))
+        if changed_ids:
+            try:
+                with CHROMA_SECONDS.time(operation="update"):
+                    self.collection.update(ids=changed_ids, metadatas=changed_metadatas)
+            except Exception as e:
+                logger.error(f"Erreur lors de la mise à jour de {len(changed_ids)} éléments dans '{self.name}': {e}")
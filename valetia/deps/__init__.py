@@ -1,8 +1,11 @@
-from .checker import scan_dependencies, get_dependency_report
+from .checker import scan_dependencies, get_dependency_report, get_installed_packages, diff_dependencies
 from .alerts import check_and_alert, configure_alerts, get_alerts_summary, setup_periodic_check
+from .scheduler import get_scan_status, scan_scheduler
+from .advisories import scan_vulnerabilities
 
 __all__ = [
-    'scan_dependencies', 'get_dependency_report',
+    'scan_dependencies', 'get_dependency_report', 'get_installed_packages', 'diff_dependencies',
     'check_and_alert', 'configure_alerts', 'get_alerts_summary',
-    'setup_periodic_check'
+    'setup_periodic_check', 'get_scan_status', 'scan_scheduler',
+    'scan_vulnerabilities'
 ]
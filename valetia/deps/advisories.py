@@ -0,0 +1,376 @@
+"""
+Recherche hors ligne des vulnérabilités connues des packages installés.
+
+La base d'avis de sécurité est lue depuis des fichiers locaux au format OSV
+(fichier JSON, répertoire de fichiers JSON, ou archive zip telle que l'export
+PyPI d'osv.dev). Les avis sont indexés par nom de package normalisé avec des
+intervalles de versions pré-analysés: tous les packages sont évalués en une
+passe, sans réseau ni installation d'outil. Les résultats sont conservés pour
+que les analyses suivantes ne réévaluent que les packages modifiés.
+"""
+
+import json
+import math
+import os
+import zipfile
+from pathlib import Path
+
+# Importer le logger
+from valetia.logger import loguru_logger as logger
+
+from .checker import DEPS_DIR, normalize_package_name, parse_version
+
+# Base d'avis: fichier JSON, répertoire de fichiers OSV ou archive zip
+ADVISORY_DB_PATH = Path(os.environ.get("VALETIA_ADVISORY_DB", str(DEPS_DIR / "advisories")))
+# Résultats de la dernière analyse (analyse incrémentale)
+VULNERABILITY_SCAN_FILE = DEPS_DIR / "vulnerability_scan.json"
+
+SEVERITY_LEVELS = {"unknown": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+_SEVERITY_ALIASES = {"moderate": "medium", "important": "high", "none": "low"}
+
+# Poids des métriques CVSS v3 (score de base)
+_CVSS3_WEIGHTS = {
+    "AV": {"N": 0.85, "A": 0.62, "L": 0.55, "P": 0.2},
+    "AC": {"L": 0.77, "H": 0.44},
+    "UI": {"N": 0.85, "R": 0.62},
+    "C": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "I": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "A": {"H": 0.56, "L": 0.22, "N": 0.0},
+}
+_CVSS3_PRIVILEGES = {"U": {"N": 0.85, "L": 0.62, "H": 0.27}, "C": {"N": 0.85, "L": 0.68, "H": 0.5}}
+
+def _roundup(value):
+    """Arrondi supérieur à une décimale de la spécification CVSS v3.1."""
+    integer = int(round(value * 100000))
+    if integer % 10000 == 0:
+        return integer / 100000.0
+    return (math.floor(integer / 10000) + 1) / 10.0
+
+def cvss3_base_score(vector):
+    """
+    Calcule le score de base d'un vecteur CVSS v3.
+
+    Args:
+        vector (str): Vecteur, par exemple "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H"
+
+    Returns:
+        float: Score entre 0 et 10, ou None si le vecteur est invalide
+    """
+    try:
+        metrics = dict(part.split(":", 1) for part in vector.split("/")[1:])
+        scope = metrics["S"]
+        impact_base = 1 - (
+            (1 - _CVSS3_WEIGHTS["C"][metrics["C"]])
+            * (1 - _CVSS3_WEIGHTS["I"][metrics["I"]])
+            * (1 - _CVSS3_WEIGHTS["A"][metrics["A"]])
+        )
+        if scope == "U":
+            impact = 6.42 * impact_base
+        else:
+            impact = 7.52 * (impact_base - 0.029) - 3.25 * (impact_base - 0.02) ** 15
+        exploitability = (
+            8.22 * _CVSS3_WEIGHTS["AV"][metrics["AV"]] * _CVSS3_WEIGHTS["AC"][metrics["AC"]]
+            * _CVSS3_PRIVILEGES[scope][metrics["PR"]] * _CVSS3_WEIGHTS["UI"][metrics["UI"]]
+        )
+    except (KeyError, ValueError):
+        return None
+
+    if impact <= 0:
+        return 0.0
+    if scope == "U":
+        return _roundup(min(impact + exploitability, 10))
+    return _roundup(min(1.08 * (impact + exploitability), 10))
+
+def _severity_from_score(score):
+    """Niveau de sévérité d'un score CVSS."""
+    if score is None:
+        return "unknown"
+    if score >= 9.0:
+        return "critical"
+    if score >= 7.0:
+        return "high"
+    if score >= 4.0:
+        return "medium"
+    return "low"
+
+def normalize_severity(severity):
+    """
+    Normalise un niveau de sévérité (low, medium, high, critical ou unknown).
+
+    Args:
+        severity (str): Sévérité telle qu'indiquée dans l'avis ou la configuration
+
+    Returns:
+        str: Niveau normalisé
+    """
+    severity = str(severity or "unknown").strip().lower()
+    severity = _SEVERITY_ALIASES.get(severity, severity)
+    return severity if severity in SEVERITY_LEVELS else "unknown"
+
+def _record_severity(record, affected):
+    """Sévérité d'un avis OSV: indication explicite, sinon score CVSS v3."""
+    for source in (affected.get("ecosystem_specific"), affected.get("database_specific"), record.get("database_specific")):
+        if source and source.get("severity"):
+            severity = normalize_severity(source["severity"])
+            if severity != "unknown":
+                return severity
+
+    scores = [
+        cvss3_base_score(entry.get("score", ""))
+        for entry in record.get("severity", [])
+        if entry.get("type") == "CVSS_V3"
+    ]
+    scores = [score for score in scores if score is not None]
+    return _severity_from_score(max(scores) if scores else None)
+
+def _parse_ranges(affected):
+    """
+    Convertit les intervalles OSV d'un package en bornes de versions comparables.
+
+    Returns:
+        list: Intervalles (introduite, corrigée, dernière_affectée), bornes à None si absentes
+    """
+    intervals = []
+    for version_range in affected.get("ranges", []):
+        if version_range.get("type") not in ("ECOSYSTEM", "SEMVER"):
+            continue
+        introduced = None
+        open_interval = False
+        for event in version_range.get("events", []):
+            if "introduced" in event:
+                introduced = None if event["introduced"] == "0" else parse_version(event["introduced"])
+                open_interval = True
+            elif "fixed" in event and open_interval:
+                intervals.append((introduced, parse_version(event["fixed"]), None))
+                open_interval = False
+            elif "last_affected" in event and open_interval:
+                intervals.append((introduced, None, parse_version(event["last_affected"])))
+                open_interval = False
+        if open_interval:
+            intervals.append((introduced, None, None))
+    return intervals
+
+class Advisory:
+    """Avis de sécurité pour un package, avec ses intervalles de versions affectées."""
+
+    __slots__ = ("id", "aliases", "summary", "severity", "intervals", "versions", "fixed_versions")
+
+    def __init__(self, record, affected):
+        """
+        Construit l'avis à partir d'un enregistrement OSV.
+
+        Args:
+            record (dict): Enregistrement OSV complet
+            affected (dict): Entrée "affected" concernant le package
+        """
+        self.id = record["id"]
+        self.aliases = record.get("aliases", [])
+        self.summary = record.get("summary") or (record.get("details") or "")[:300]
+        self.severity = _record_severity(record, affected)
+        self.intervals = _parse_ranges(affected)
+        self.versions = set(affected.get("versions", []))
+        self.fixed_versions = sorted({
+            event["fixed"]
+            for version_range in affected.get("ranges", [])
+            for event in version_range.get("events", [])
+            if "fixed" in event
+        })
+
+    def affects(self, version):
+        """
+        Indique si une version est affectée.
+
+        Args:
+            version (str): Version installée
+
+        Returns:
+            bool: True si la version est dans la liste ou dans un intervalle affecté
+        """
+        if version in self.versions:
+            return True
+        parsed = parse_version(version)
+        if parsed is None:
+            return False
+        for introduced, fixed, last_affected in self.intervals:
+            if introduced is not None and parsed < introduced:
+                continue
+            if fixed is not None and parsed >= fixed:
+                continue
+            if last_affected is not None and parsed > last_affected:
+                continue
+            return True
+        return False
+
+class AdvisoryDatabase:
+    """Index des avis de sécurité PyPI par nom de package normalisé."""
+
+    def __init__(self, path=ADVISORY_DB_PATH):
+        """
+        Initialise la base (chargée au premier usage, rechargée si les fichiers changent).
+
+        Args:
+            path (Path): Fichier JSON, répertoire de fichiers OSV ou archive zip
+        """
+        self.path = Path(path)
+        self.signature = None
+        self.index = {}
+
+    def _files_signature(self):
+        """Signature (chemins, tailles, dates) des fichiers de la base."""
+        if not self.path.exists():
+            return None
+        if self.path.is_dir():
+            files = sorted(self.path.rglob("*.json"))
+        else:
+            files = [self.path]
+        return [[str(f), f.stat().st_size, f.stat().st_mtime] for f in files]
+
+    def _iter_records(self):
+        """Parcourt les enregistrements OSV de la base."""
+        def from_payload(payload):
+            if isinstance(payload, list):
+                yield from payload
+            elif isinstance(payload, dict) and "vulns" in payload:
+                yield from payload["vulns"]
+            elif isinstance(payload, dict):
+                yield payload
+
+        if self.path.is_dir():
+            for file_path in sorted(self.path.rglob("*.json")):
+                with open(file_path, 'r') as f:
+                    yield from from_payload(json.load(f))
+        elif self.path.suffix == ".zip":
+            with zipfile.ZipFile(self.path) as archive:
+                for name in archive.namelist():
+                    if name.endswith(".json"):
+                        yield from from_payload(json.loads(archive.read(name)))
+        else:
+            with open(self.path, 'r') as f:
+                yield from from_payload(json.load(f))
+
+    def load(self):
+        """
+        Charge ou recharge la base si ses fichiers ont changé.
+
+        Returns:
+            bool: True si la base a été (re)chargée
+        """
+        signature = self._files_signature()
+        if signature == self.signature:
+            return False
+
+        index = {}
+        records = 0
+        if signature is not None:
+            for record in self._iter_records():
+                if record.get("withdrawn") or "id" not in record:
+                    continue
+                records += 1
+                for affected in record.get("affected", []):
+                    package = affected.get("package", {})
+                    if package.get("ecosystem") != "PyPI" or not package.get("name"):
+                        continue
+                    index.setdefault(normalize_package_name(package["name"]), []).append(Advisory(record, affected))
+        else:
+            logger.warning(f"Base d'avis de sécurité introuvable: {self.path}")
+
+        self.index = index
+        self.signature = signature
+        logger.info(f"Base d'avis de sécurité chargée: {records} avis, {len(index)} packages concernés")
+        return True
+
+    def match(self, package_name, version, min_severity="unknown"):
+        """
+        Recherche les vulnérabilités d'une version installée.
+
+        Args:
+            package_name (str): Nom du package
+            version (str): Version installée
+            min_severity (str): Sévérité minimale retenue
+
+        Returns:
+            list: Vulnérabilités au format du rapport de dépendances
+        """
+        threshold = SEVERITY_LEVELS[normalize_severity(min_severity)]
+        return [
+            {
+                "package_name": package_name,
+                "installed_version": version,
+                "vulnerability_id": advisory.id,
+                "aliases": advisory.aliases,
+                "description": advisory.summary,
+                "severity": advisory.severity,
+                "fixed_versions": advisory.fixed_versions,
+            }
+            for advisory in self.index.get(normalize_package_name(package_name), [])
+            # Sévérité inconnue: l'avis est conservé plutôt que masqué
+            if (SEVERITY_LEVELS[advisory.severity] >= threshold or advisory.severity == "unknown")
+            and advisory.affects(version)
+        ]
+
+def scan_vulnerabilities(packages, min_severity="medium", database=None, incremental=True):
+    """
+    Évalue tous les packages installés contre la base d'avis, en une passe.
+
+    Si la base n'a pas changé depuis l'analyse précédente, seuls les packages
+    ajoutés ou dont la version a changé sont réévalués.
+
+    Args:
+        packages (dict): Dictionnaire {nom_package: version}
+        min_severity (str): Sévérité minimale retenue (low, medium, high, critical)
+        database (AdvisoryDatabase, optional): Base d'avis (par défaut, base partagée)
+        incremental (bool): Réutiliser les résultats de l'analyse précédente
+
+    Returns:
+        list: Vulnérabilités trouvées
+    """
+    database = database or advisory_database
+    database.load()
+
+    previous = {}
+    if incremental and VULNERABILITY_SCAN_FILE.exists():
+        try:
+            with open(VULNERABILITY_SCAN_FILE, 'r') as f:
+                previous = json.load(f)
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de l'analyse précédente: {str(e)}")
+
+    reusable = (
+        previous.get("signature") == database.signature
+        and previous.get("min_severity") == normalize_severity(min_severity)
+    )
+    previous_versions = previous.get("packages", {}) if reusable else {}
+    previous_results = previous.get("results", {}) if reusable else {}
+
+    results = {}
+    evaluated = 0
+    for package_name, version in packages.items():
+        if previous_versions.get(package_name) == version:
+            # Seuls les packages vulnérables sont conservés dans les résultats
+            results[package_name] = previous_results.get(package_name, [])
+        else:
+            results[package_name] = database.match(package_name, version, min_severity)
+            evaluated += 1
+
+    try:
+        tmp_file = VULNERABILITY_SCAN_FILE.with_suffix(".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump({
+                "signature": database.signature,
+                "min_severity": normalize_severity(min_severity),
+                "packages": packages,
+                "results": {name: vulns for name, vulns in results.items() if vulns},
+            }, f)
+        os.replace(tmp_file, VULNERABILITY_SCAN_FILE)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'enregistrement de l'analyse des vulnérabilités: {str(e)}")
+
+    vulnerabilities = [vuln for name in sorted(results) for vuln in results[name]]
+    logger.info(
+        f"Analyse des vulnérabilités: {evaluated}/{len(packages)} packages évalués, "
+        f"{len(vulnerabilities)} vulnérabilités (sévérité >= {normalize_severity(min_severity)})"
+    )
+    return vulnerabilities
+
+# Base partagée, chargée au premier usage
+advisory_database = AdvisoryDatabase()
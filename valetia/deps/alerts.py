@@ -4,10 +4,12 @@ Permet de configurer et d'envoyer des alertes lorsque des mises à jour
 de sécurité sont disponibles pour les dépendances.
 """
 
+import hashlib
 import json
 import os
 from pathlib import Path
 from datetime import datetime
+import threading
 import time
 
 # Importer le logger
@@ -18,7 +20,17 @@ from .checker import scan_dependencies, get_dependency_report, DEPS_DIR
 
 # Fichier de configuration des alertes
 ALERTS_CONFIG_FILE = DEPS_DIR / "alerts_config.json"
-ALERTS_LOG_FILE = DEPS_DIR / "alerts_log.json"
+# Journal des alertes: une alerte JSON par ligne, avec rotation par taille
+ALERTS_LOG_FILE = DEPS_DIR / "alerts_log.jsonl"
+ALERTS_LOG_MAX_BYTES = 5 * 1024 * 1024
+ALERTS_LOG_BACKUPS = 5
+# Index des alertes récentes et compteurs par type (lu par get_alerts_summary)
+ALERTS_INDEX_FILE = DEPS_DIR / "alerts_index.json"
+ALERTS_INDEX_SIZE = 50
+# Ancien journal (tableau JSON réécrit à chaque alerte), migré au premier usage
+LEGACY_ALERTS_LOG_FILE = DEPS_DIR / "alerts_log.json"
+
+_alerts_lock = threading.Lock()
 
 def init_alerts_config():
     """
@@ -69,39 +81,128 @@ def save_alerts_config(config):
     
     logger.info(f"Configuration des alertes mise à jour")
 
+def _alert_fingerprint(alert_type, details):
+    """Empreinte d'une alerte (type et détails), pour repérer les répétitions."""
+    payload = json.dumps([alert_type, details], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def _load_alerts_index():
+    """Charge l'index des alertes (index vide s'il n'existe pas)."""
+    if ALERTS_INDEX_FILE.exists():
+        try:
+            with open(ALERTS_INDEX_FILE, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de l'index des alertes: {str(e)}")
+    return {"recent": [], "counts": {}, "total": 0, "last_fingerprints": {}}
+
+def _save_alerts_index(index):
+    """Sauvegarde l'index des alertes (écriture atomique)."""
+    tmp_file = ALERTS_INDEX_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_file, ALERTS_INDEX_FILE)
+
+def _rotate_alerts_log():
+    """Fait tourner le journal des alertes lorsqu'il dépasse la taille maximale."""
+    if not ALERTS_LOG_FILE.exists() or ALERTS_LOG_FILE.stat().st_size < ALERTS_LOG_MAX_BYTES:
+        return
+    
+    for i in range(ALERTS_LOG_BACKUPS - 1, 0, -1):
+        source = ALERTS_LOG_FILE.with_name(f"{ALERTS_LOG_FILE.name}.{i}")
+        if source.exists():
+            os.replace(source, ALERTS_LOG_FILE.with_name(f"{ALERTS_LOG_FILE.name}.{i + 1}"))
+    os.replace(ALERTS_LOG_FILE, ALERTS_LOG_FILE.with_name(f"{ALERTS_LOG_FILE.name}.1"))
+    logger.info("Rotation du journal des alertes")
+
+def _append_alert(alert, index):
+    """Ajoute une alerte au journal et à l'index (sans déduplication)."""
+    _rotate_alerts_log()
+    with open(ALERTS_LOG_FILE, 'a') as f:
+        f.write(json.dumps(alert, default=str) + "\n")
+    
+    index["recent"].insert(0, {
+        "timestamp": alert["timestamp"],
+        "last_seen": alert["timestamp"],
+        "type": alert["type"],
+        "count": len(alert["details"]),
+        "fingerprint": alert["fingerprint"],
+        "repeats": 0
+    })
+    del index["recent"][ALERTS_INDEX_SIZE:]
+    index["counts"][alert["type"]] = index["counts"].get(alert["type"], 0) + 1
+    index["total"] += 1
+    index["last_fingerprints"][alert["type"]] = alert["fingerprint"]
+
+def _migrate_legacy_alerts_log(index):
+    """Importe l'ancien journal (tableau JSON) dans le journal JSONL."""
+    if not LEGACY_ALERTS_LOG_FILE.exists():
+        return
+    
+    try:
+        with open(LEGACY_ALERTS_LOG_FILE, 'r') as f:
+            alerts = json.load(f)
+        for alert in sorted(alerts, key=lambda x: x["timestamp"]):
+            alert["fingerprint"] = _alert_fingerprint(alert["type"], alert["details"])
+            _append_alert(alert, index)
+        os.replace(LEGACY_ALERTS_LOG_FILE, LEGACY_ALERTS_LOG_FILE.with_suffix(".json.migrated"))
+        logger.info(f"Ancien journal des alertes migré ({len(alerts)} alertes)")
+    except Exception as e:
+        logger.error(f"Erreur lors de la migration de l'ancien journal des alertes: {str(e)}")
+
 def log_alert(alert_type, details):
     """
     Enregistre une alerte dans le fichier de log.
     
+    L'alerte est ajoutée en fin de journal (une ligne JSON) et l'index des
+    alertes récentes est mis à jour. Une alerte identique à la précédente du
+    même type n'est pas réécrite: seul son compteur de répétitions augmente.
+    
     Args:
         alert_type (str): Type d'alerte (update, vulnerability)
         details (dict): Détails de l'alerte
-    """
-    # Charger les alertes existantes
-    alerts = []
-    if ALERTS_LOG_FILE.exists():
-        with open(ALERTS_LOG_FILE, 'r') as f:
-            alerts = json.load(f)
-    
-    # Ajouter la nouvelle alerte
-    alert = {
-        "timestamp": datetime.now().isoformat(),
-        "type": alert_type,
-        "details": details
-    }
     
-    alerts.append(alert)
+    Returns:
+        bool: True si l'alerte a été ajoutée, False si c'était une répétition
+    """
+    now = datetime.now().isoformat()
+    fingerprint = _alert_fingerprint(alert_type, details)
     
-    # Sauvegarder les alertes
-    with open(ALERTS_LOG_FILE, 'w') as f:
-        json.dump(alerts, f, indent=2)
+    with _alerts_lock:
+        index = _load_alerts_index()
+        _migrate_legacy_alerts_log(index)
+        
+        if index["last_fingerprints"].get(alert_type) == fingerprint:
+            for entry in index["recent"]:
+                if entry["fingerprint"] == fingerprint:
+                    entry["repeats"] = entry.get("repeats", 0) + 1
+                    entry["last_seen"] = now
+                    break
+            index["duplicates"] = index.get("duplicates", 0) + 1
+            _save_alerts_index(index)
+            logger.info(f"Alerte répétée ignorée: {alert_type}")
+            return False
+        
+        alert = {
+            "timestamp": now,
+            "type": alert_type,
+            "fingerprint": fingerprint,
+            "details": details
+        }
+        _append_alert(alert, index)
+        _save_alerts_index(index)
     
     logger.info(f"Alerte enregistrée: {alert_type}")
+    return True
 
-def check_and_alert():
+def check_and_alert(force=False, progress=None):
     """
     Vérifie les dépendances et envoie des alertes si nécessaire.
     
+    Args:
+        force (bool): Ignorer l'intervalle entre deux vérifications
+        progress (callable, optional): Fonction appelée avec le nom de chaque étape de l'analyse
+    
     Returns:
         bool: True si des alertes ont été envoyées, False sinon
     """
@@ -116,7 +217,7 @@ def check_and_alert():
     last_check = config.get("last_check")
     interval_hours = config.get("check_interval_hours", 24)
     
-    if last_check:
+    if last_check and not force:
         last_check_time = datetime.fromisoformat(last_check)
         now = datetime.now()
         elapsed_hours = (now - last_check_time).total_seconds() / 3600
@@ -127,7 +228,7 @@ def check_and_alert():
     
     # Effectuer l'analyse des dépendances
     logger.info("Démarrage de la vérification périodique des dépendances")
-    result = scan_dependencies()
+    result = scan_dependencies(progress=progress, min_severity=config.get("min_severity", "medium"))
     
     # Mettre à jour la date de dernière vérification
     config["last_check"] = datetime.now().isoformat()
@@ -189,46 +290,57 @@ def configure_alerts(enabled=None, check_interval=None, notify_updates=None,
     
     return config
 
-def get_alerts_summary():
+def get_alerts_summary(limit=10):
     """
     Retourne un résumé des alertes récentes.
     
+    Le résumé est construit à partir de l'index, sans relire le journal.
+    
+    Args:
+        limit (int): Nombre d'alertes affichées
+    
     Returns:
         str: Résumé des alertes
     """
-    if not ALERTS_LOG_FILE.exists():
-        return "Aucune alerte enregistrée."
+    with _alerts_lock:
+        index = _load_alerts_index()
+        if LEGACY_ALERTS_LOG_FILE.exists():
+            _migrate_legacy_alerts_log(index)
+            _save_alerts_index(index)
     
-    with open(ALERTS_LOG_FILE, 'r') as f:
-        alerts = json.load(f)
-    
-    if not alerts:
+    if not index["total"]:
         return "Aucune alerte enregistrée."
     
-    # Trier les alertes par date (les plus récentes d'abord)
-    alerts.sort(key=lambda x: x["timestamp"], reverse=True)
-    
     # Générer le résumé
     summary = ["=== RÉSUMÉ DES ALERTES ==="]
     
-    # Limiter aux 10 alertes les plus récentes
-    for alert in alerts[:10]:
+    # Alertes les plus récentes d'abord
+    for alert in index["recent"][:limit]:
         timestamp = datetime.fromisoformat(alert["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
         alert_type = "Mises à jour" if alert["type"] == "updates" else "Vulnérabilités"
-        count = len(alert["details"])
-        
-        summary.append(f"{timestamp} - {alert_type}: {count}")
+        line = f"{timestamp} - {alert_type}: {alert['count']}"
+        if alert.get("repeats"):
+            last_seen = datetime.fromisoformat(alert["last_seen"]).strftime("%Y-%m-%d %H:%M:%S")
+            line += f" (répétée {alert['repeats']} fois, dernière le {last_seen})"
+        summary.append(line)
+    
+    if index["total"] > limit:
+        summary.append(f"... et {index['total'] - limit} alertes plus anciennes")
     
-    if len(alerts) > 10:
-        summary.append(f"... et {len(alerts) - 10} alertes plus anciennes")
+    counts = ", ".join(f"{alert_type}: {count}" for alert_type, count in sorted(index["counts"].items()))
+    summary.append(f"Total par type: {counts}")
     
     return "\n".join(summary)
 
 def setup_periodic_check():
     """
     Configure une vérification périodique des dépendances.
-    Cette fonction est destinée à être appelée au démarrage de l'application.
+    Cette fonction est destinée à être appelée au démarrage de l'application:
+    elle démarre le planificateur en arrière-plan et rend la main immédiatement.
+    Les appels suivants sont sans effet.
     """
+    from .scheduler import scan_scheduler
+    
     config = load_alerts_config()
     
     # Si les alertes sont désactivées, ne rien faire
@@ -236,12 +348,8 @@ def setup_periodic_check():
         logger.info("Les alertes de dépendances sont désactivées")
         return
     
-    # Effectuer une vérification immédiate si nécessaire
-    if not config.get("last_check"):
-        logger.info("Première vérification des dépendances")
-        check_and_alert()
-    
-    logger.info("Vérification périodique des dépendances configurée")
+    if scan_scheduler.start():
+        logger.info("Vérification périodique des dépendances configurée")
 
 # Initialiser les alertes au chargement du module
 if __name__ != "__main__":
@@ -4,15 +4,19 @@ Permet de surveiller les versions des packages installés et d'alerter
 sur les mises à jour de sécurité.
 """
 
-import pkg_resources
-import requests
 import json
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import subprocess
+from importlib import metadata as importlib_metadata
 from pathlib import Path
 import sys
 
+from packaging.version import InvalidVersion, Version
+
 # Importer le logger
 from valetia.logger import loguru_logger as logger
 
@@ -21,20 +25,142 @@ DEPS_DIR = Path("data/deps")
 DEPS_DIR.mkdir(parents=True, exist_ok=True)
 DEPS_FILE = DEPS_DIR / "dependencies.json"
 SAFETY_DB_FILE = DEPS_DIR / "safety_db.json"
+# Inventaire des packages installés, valide tant que les répertoires d'installation ne changent pas
+INSTALLED_CACHE_FILE = DEPS_DIR / "installed_cache.json"
+
+# Vérification des mises à jour
+UPDATES_CACHE_FILE = DEPS_DIR / "updates_cache.json"
+# Mises à jour trouvées par la dernière analyse (analyse incrémentale)
+UPDATES_SCAN_FILE = DEPS_DIR / "updates_scan.json"
+# Métadonnées hors ligne: {"packages": {nom: dernière_version ou {"versions": [...]}}}
+OFFLINE_INDEX_FILE = DEPS_DIR / "package_index.json"
+UPDATES_CACHE_TTL_HOURS = 24
+UPDATE_CHECK_WORKERS = 16
+UPDATE_CHECK_TIMEOUT = 10
+# Index de packages: API JSON (https://pypi.org/pypi) ou miroir local au format simple (.../simple, PEP 691)
+PACKAGE_INDEX_URL = os.environ.get("VALETIA_PACKAGE_INDEX_URL", "https://pypi.org/pypi")
+DEPS_OFFLINE = os.environ.get("VALETIA_DEPS_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+_http = threading.local()
+_installed_cache = {"signature": None, "packages": None}
+
+def _package_key(name):
+    """Clé d'un package (minuscules, caractères spéciaux remplacés par des tirets), comme les inventaires précédents."""
+    return re.sub(r"[^A-Za-z0-9.]+", "-", name).lower()
+
+def _site_packages_signature():
+    """
+    Signature des répertoires d'installation (chemins et dates de modification).
+    
+    L'installation ou la suppression d'un package modifie la date du répertoire
+    qui contient ses métadonnées.
+    """
+    signature = []
+    for path in sys.path:
+        try:
+            signature.append([path, os.stat(path or ".").st_mtime_ns])
+        except OSError:
+            continue
+    return signature
+
+def _enumerate_packages():
+    """Parcourt les métadonnées des packages installés (le premier trouvé dans sys.path l'emporte)."""
+    packages = {}
+    for distribution in importlib_metadata.distributions():
+        name = distribution.metadata["Name"]
+        if not name:
+            continue
+        packages.setdefault(_package_key(name), distribution.version)
+    return packages
 
-def get_installed_packages():
+def get_installed_packages(use_cache=True):
     """
     Récupère la liste des packages installés avec leur version.
     
+    Le résultat est mis en cache (en mémoire et sur disque) tant que les
+    répertoires d'installation ne sont pas modifiés.
+    
+    Args:
+        use_cache (bool): Réutiliser l'inventaire en cache s'il est encore valide
+    
     Returns:
         dict: Dictionnaire {nom_package: version}
     """
-    packages = {}
-    for package in pkg_resources.working_set:
-        packages[package.key] = package.version
+    signature = _site_packages_signature()
+    
+    if use_cache:
+        if _installed_cache["signature"] == signature:
+            return dict(_installed_cache["packages"])
+        
+        if INSTALLED_CACHE_FILE.exists():
+            try:
+                with open(INSTALLED_CACHE_FILE, 'r') as f:
+                    cached = json.load(f)
+                if cached.get("signature") == signature:
+                    _installed_cache.update(signature=signature, packages=cached["packages"])
+                    return dict(cached["packages"])
+            except Exception as e:
+                logger.error(f"Erreur lors de la lecture de l'inventaire en cache: {str(e)}")
+    
+    packages = _enumerate_packages()
+    _installed_cache.update(signature=signature, packages=packages)
+    
+    try:
+        tmp_file = INSTALLED_CACHE_FILE.with_suffix(".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump({"signature": signature, "packages": packages}, f)
+        os.replace(tmp_file, INSTALLED_CACHE_FILE)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'enregistrement de l'inventaire des packages: {str(e)}")
     
     logger.info(f"Récupération de {len(packages)} packages installés")
-    return packages
+    return dict(packages)
+
+def load_dependencies_snapshot():
+    """
+    Charge le dernier inventaire enregistré dans dependencies.json.
+    
+    Returns:
+        dict: Dictionnaire {nom_package: version} (vide si aucun inventaire)
+    """
+    if not DEPS_FILE.exists():
+        return {}
+    
+    try:
+        with open(DEPS_FILE, 'r') as f:
+            return json.load(f).get("packages", {})
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de l'inventaire des dépendances: {str(e)}")
+        return {}
+
+def diff_dependencies(current=None, previous=None):
+    """
+    Compare l'inventaire courant au dernier inventaire enregistré.
+    
+    Args:
+        current (dict, optional): Inventaire courant (par défaut, packages installés)
+        previous (dict, optional): Inventaire de référence (par défaut, dependencies.json)
+    
+    Returns:
+        dict: {"added": {nom: version}, "removed": {nom: version},
+               "changed": {nom: {"old": version, "new": version}}, "unchanged": nombre}
+    """
+    current = get_installed_packages() if current is None else current
+    previous = load_dependencies_snapshot() if previous is None else previous
+    
+    added = {name: version for name, version in current.items() if name not in previous}
+    removed = {name: version for name, version in previous.items() if name not in current}
+    changed = {
+        name: {"old": previous[name], "new": version}
+        for name, version in current.items()
+        if name in previous and previous[name] != version
+    }
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "unchanged": len(current) - len(added) - len(changed),
+    }
 
 def save_dependencies_info(packages):
     """
@@ -53,79 +179,346 @@ def save_dependencies_info(packages):
     
     logger.info(f"Informations sur les dépendances sauvegardées dans {DEPS_FILE}")
 
-def check_for_updates():
+def normalize_package_name(name):
+    """
+    Normalise un nom de package (PEP 503).
+    
+    Args:
+        name (str): Nom du package
+        
+    Returns:
+        str: Nom normalisé (minuscules, séparateurs remplacés par des tirets)
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def parse_version(version):
+    """
+    Analyse un numéro de version.
+    
+    Args:
+        version (str): Numéro de version
+        
+    Returns:
+        Version: Version comparable, ou None si le format n'est pas reconnu
+    """
+    try:
+        return Version(str(version))
+    except InvalidVersion:
+        return None
+
+def latest_stable_version(versions):
+    """
+    Retourne la version stable la plus récente d'une liste.
+    
+    Args:
+        versions (list): Numéros de version
+        
+    Returns:
+        str: Version stable la plus récente (ou la plus récente si aucune n'est stable), None si la liste est vide
+    """
+    parsed = [(parse_version(v), v) for v in versions]
+    parsed = [(p, v) for p, v in parsed if p is not None]
+    if not parsed:
+        return None
+    stable = [(p, v) for p, v in parsed if not p.is_prerelease and not p.is_devrelease]
+    return max(stable or parsed)[1]
+
+def is_newer_version(latest_version, current_version):
+    """
+    Indique si une version est plus récente que la version installée.
+    
+    Args:
+        latest_version (str): Dernière version publiée
+        current_version (str): Version installée
+        
+    Returns:
+        bool: True si une mise à jour est disponible
+    """
+    latest, current = parse_version(latest_version), parse_version(current_version)
+    if latest is None or current is None:
+        return latest_version != current_version
+    return latest > current
+
+def load_offline_index(path=OFFLINE_INDEX_FILE):
+    """
+    Charge les métadonnées de packages hors ligne.
+    
+    Args:
+        path (Path): Fichier de métadonnées
+        
+    Returns:
+        dict: Dictionnaire {nom_normalisé: dernière_version}
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture des métadonnées hors ligne {path}: {str(e)}")
+        return {}
+    
+    index = {}
+    for name, entry in data.get("packages", data).items():
+        if isinstance(entry, dict):
+            latest = entry.get("latest_version") or latest_stable_version(entry.get("versions", []))
+        else:
+            latest = entry
+        if latest:
+            index[normalize_package_name(name)] = str(latest)
+    return index
+
+def export_offline_index(path=OFFLINE_INDEX_FILE):
+    """
+    Exporte le cache des dernières versions comme métadonnées hors ligne.
+    
+    Le fichier produit sur une machine connectée permet les vérifications sans réseau.
+    
+    Args:
+        path (Path): Fichier de métadonnées à écrire
+        
+    Returns:
+        int: Nombre de packages exportés
+    """
+    cache = _load_updates_cache()
+    packages = {name: entry["latest_version"] for name, entry in cache.items() if entry.get("latest_version")}
+    with open(path, 'w') as f:
+        json.dump({"timestamp": datetime.now().isoformat(), "packages": packages}, f, indent=2)
+    
+    logger.info(f"Métadonnées hors ligne exportées dans {path} ({len(packages)} packages)")
+    return len(packages)
+
+def _load_updates_cache():
+    """Charge le cache des dernières versions {nom_normalisé: {"latest_version", "checked_at"}}."""
+    if not UPDATES_CACHE_FILE.exists():
+        return {}
+    try:
+        with open(UPDATES_CACHE_FILE, 'r') as f:
+            return json.load(f).get("packages", {})
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture du cache des mises à jour: {str(e)}")
+        return {}
+
+def _save_updates_cache(cache):
+    """Sauvegarde le cache des dernières versions (écriture atomique)."""
+    tmp_file = UPDATES_CACHE_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump({"timestamp": datetime.now().isoformat(), "packages": cache}, f, indent=2)
+    os.replace(tmp_file, UPDATES_CACHE_FILE)
+
+def _get_http_session():
+    """Session HTTP propre au thread courant (connexions réutilisées entre les requêtes)."""
+    session = getattr(_http, "session", None)
+    if session is None:
+        import requests
+        session = requests.Session()
+        _http.session = session
+    return session
+
+def fetch_latest_version(package_name, index_url=PACKAGE_INDEX_URL, timeout=UPDATE_CHECK_TIMEOUT):
+    """
+    Interroge l'index de packages pour connaître la dernière version d'un package.
+    
+    Args:
+        package_name (str): Nom du package
+        index_url (str): URL de l'index (API JSON, ou miroir au format simple se terminant par /simple)
+        timeout (float): Délai maximal de la requête en secondes
+        
+    Returns:
+        str: Dernière version stable, ou None si le package est inconnu de l'index
+    """
+    session = _get_http_session()
+    base_url = index_url.rstrip("/")
+    
+    if base_url.endswith("/simple"):
+        response = session.get(
+            f"{base_url}/{package_name}/",
+            headers={"Accept": "application/vnd.pypi.simple.v1+json"},
+            timeout=timeout
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return latest_stable_version(response.json().get("versions", []))
+    
+    response = session.get(f"{base_url}/{package_name}/json", timeout=timeout)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()["info"]["version"]
+
+def check_for_updates(packages=None, max_workers=UPDATE_CHECK_WORKERS, ttl_hours=UPDATES_CACHE_TTL_HOURS,
+                      offline=None, index_url=None):
     """
     Vérifie les mises à jour disponibles pour les packages installés.
     
+    Les dernières versions proviennent, dans l'ordre, des métadonnées hors ligne,
+    du cache (valide ttl_hours heures, y compris pour les packages inconnus de
+    l'index) puis de l'index de packages, interrogé en parallèle pour les seuls
+    packages restants.
+    
+    Args:
+        packages (dict, optional): Dictionnaire {nom_package: version} (par défaut, dernier inventaire)
+        max_workers (int): Nombre de requêtes simultanées vers l'index
+        ttl_hours (float): Durée de validité du cache, en heures
+        offline (bool, optional): Ne pas interroger l'index (par défaut VALETIA_DEPS_OFFLINE)
+        index_url (str, optional): URL de l'index ou du miroir local (par défaut VALETIA_PACKAGE_INDEX_URL)
+    
     Returns:
         list: Liste des packages avec des mises à jour disponibles
     """
-    if not DEPS_FILE.exists():
-        logger.warning("Fichier de dépendances non trouvé. Exécutez d'abord scan_dependencies().")
-        return []
+    if packages is None:
+        if not DEPS_FILE.exists():
+            logger.warning("Fichier de dépendances non trouvé. Exécutez d'abord scan_dependencies().")
+            return []
+        
+        with open(DEPS_FILE, 'r') as f:
+            packages = json.load(f)["packages"]
     
-    with open(DEPS_FILE, 'r') as f:
-        data = json.load(f)
+    offline = DEPS_OFFLINE if offline is None else offline
+    index_url = index_url or PACKAGE_INDEX_URL
+    start = time.perf_counter()
     
-    packages = data["packages"]
-    updates = []
+    offline_index = load_offline_index()
+    cache = _load_updates_cache()
+    now = time.time()
+    ttl_seconds = ttl_hours * 3600
     
-    for package_name, current_version in packages.items():
+    latest_versions = {}
+    to_fetch = []
+    for package_name in packages:
+        key = normalize_package_name(package_name)
+        if key in offline_index:
+            latest_versions[key] = offline_index[key]
+        elif key in cache and now - cache[key].get("checked_at", 0) < ttl_seconds:
+            latest_versions[key] = cache[key].get("latest_version")
+        elif not offline:
+            to_fetch.append(key)
+    
+    def fetch(key):
         try:
-            # Utiliser pip pour vérifier la dernière version
-            result = subprocess.run(
-                [sys.executable, "-m", "pip", "index", "versions", package_name],
-                capture_output=True,
-                text=True
-            )
-            
-            output = result.stdout
-            if "Available versions:" in output:
-                available_versions = output.split("Available versions:")[1].strip().split("\n")[0]
-                latest_version = available_versions.split(",")[0].strip()
-                
-                if latest_version != current_version:
-                    updates.append({
-                        "name": package_name,
-                        "current_version": current_version,
-                        "latest_version": latest_version
-                    })
+            return key, fetch_latest_version(key, index_url), True
         except Exception as e:
-            logger.error(f"Erreur lors de la vérification de la mise à jour pour {package_name}: {str(e)}")
+            logger.error(f"Erreur lors de la vérification de la mise à jour pour {key}: {str(e)}")
+            return key, None, False
+    
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="valetia-deps") as executor:
+            for key, latest_version, answered in executor.map(fetch, to_fetch):
+                latest_versions[key] = latest_version
+                # Un package inconnu de l'index est aussi mis en cache (mais pas une erreur réseau)
+                if answered:
+                    cache[key] = {"latest_version": latest_version, "checked_at": now}
+        _save_updates_cache(cache)
     
-    logger.info(f"Vérification terminée: {len(updates)} mises à jour disponibles")
+    updates = []
+    for package_name, current_version in sorted(packages.items()):
+        latest_version = latest_versions.get(normalize_package_name(package_name))
+        if latest_version and is_newer_version(latest_version, current_version):
+            updates.append({
+                "name": package_name,
+                "current_version": current_version,
+                "latest_version": latest_version
+            })
+    
+    unknown = sum(1 for package_name in packages if not latest_versions.get(normalize_package_name(package_name)))
+    logger.info(
+        f"Vérification terminée en {time.perf_counter() - start:.1f}s: {len(updates)} mises à jour disponibles "
+        f"({len(to_fetch)} packages interrogés, {unknown} sans information)"
+    )
     return updates
 
-def check_security_vulnerabilities():
+def _load_updates_scan(ttl_hours=UPDATES_CACHE_TTL_HOURS):
+    """
+    Charge les mises à jour trouvées par la dernière analyse.
+    
+    Returns:
+        dict: {"checked_at", "updates"}, ou None si l'analyse est absente ou plus ancienne que ttl_hours
+    """
+    if not UPDATES_SCAN_FILE.exists():
+        return None
+    try:
+        with open(UPDATES_SCAN_FILE, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de l'analyse des mises à jour précédente: {str(e)}")
+        return None
+    if time.time() - data.get("checked_at", 0) >= ttl_hours * 3600:
+        return None
+    return data
+
+def _save_updates_scan(updates, checked_at):
+    """Sauvegarde les mises à jour trouvées (écriture atomique)."""
+    tmp_file = UPDATES_SCAN_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump({"checked_at": checked_at, "updates": updates}, f, indent=2)
+    os.replace(tmp_file, UPDATES_SCAN_FILE)
+
+def check_for_updates_incremental(packages, changes):
+    """
+    Vérifie les mises à jour des seuls packages ajoutés ou modifiés.
+    
+    Les résultats de l'analyse précédente sont repris pour les autres packages
+    tant qu'ils ont moins de UPDATES_CACHE_TTL_HOURS heures; au-delà, ou sans
+    analyse précédente, tous les packages sont vérifiés.
+    
+    Args:
+        packages (dict): Inventaire courant {nom_package: version}
+        changes (dict): Différences avec l'inventaire précédent (voir diff_dependencies)
+    
+    Returns:
+        list: Liste des packages avec des mises à jour disponibles
+    """
+    previous = _load_updates_scan()
+    if previous is None:
+        checked_at = time.time()
+        updates = check_for_updates(packages)
+        _save_updates_scan(updates, checked_at)
+        return updates
+    
+    to_check = {name: packages[name] for name in list(changes["added"]) + list(changes["changed"])}
+    kept = [
+        update for update in previous.get("updates", [])
+        if update["name"] not in to_check and packages.get(update["name"]) == update["current_version"]
+    ]
+    updates = sorted(kept + (check_for_updates(to_check) if to_check else []), key=lambda update: update["name"])
+    
+    # La date de l'analyse complète est conservée: elle détermine la prochaine vérification de tous les packages
+    _save_updates_scan(updates, previous["checked_at"])
+    return updates
+
+def check_security_vulnerabilities(packages=None, min_severity=None):
     """
     Vérifie les vulnérabilités de sécurité connues pour les packages installés.
     
+    La vérification se fait hors ligne, contre la base d'avis OSV locale
+    (voir valetia.deps.advisories).
+    
+    Args:
+        packages (dict, optional): Dictionnaire {nom_package: version} (par défaut, dernier inventaire)
+        min_severity (str, optional): Sévérité minimale (par défaut, celle de alerts_config.json)
+    
     Returns:
         list: Liste des packages avec des vulnérabilités
     """
-    if not DEPS_FILE.exists():
-        logger.warning("Fichier de dépendances non trouvé. Exécutez d'abord scan_dependencies().")
-        return []
+    from .advisories import scan_vulnerabilities
     
-    try:
-        # Utiliser safety pour vérifier les vulnérabilités
-        result = subprocess.run(
-            [sys.executable, "-m", "pip", "install", "safety"],
-            capture_output=True,
-            text=True
-        )
-        
-        result = subprocess.run(
-            ["safety", "check", "--json"],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            logger.error(f"Erreur lors de la vérification des vulnérabilités: {result.stderr}")
+    if packages is None:
+        if not DEPS_FILE.exists():
+            logger.warning("Fichier de dépendances non trouvé. Exécutez d'abord scan_dependencies().")
             return []
         
-        vulnerabilities = json.loads(result.stdout)
+        with open(DEPS_FILE, 'r') as f:
+            packages = json.load(f)["packages"]
+    
+    if min_severity is None:
+        from .alerts import load_alerts_config
+        min_severity = load_alerts_config().get("min_severity", "medium")
+    
+    try:
+        vulnerabilities = scan_vulnerabilities(packages, min_severity=min_severity)
         
         # Sauvegarder les résultats
         with open(SAFETY_DB_FILE, 'w') as f:
@@ -137,7 +530,7 @@ def check_security_vulnerabilities():
         logger.error(f"Erreur lors de la vérification des vulnérabilités: {str(e)}")
         return []
 
-def scan_dependencies():
+def scan_dependencies(progress=None, min_severity=None):
     """
     Analyse complète des dépendances: 
     - Liste les packages installés
@@ -145,32 +538,46 @@ def scan_dependencies():
     - Vérifie les mises à jour disponibles
     - Vérifie les vulnérabilités de sécurité
     
+    Args:
+        progress (callable, optional): Fonction appelée avec le nom de chaque étape
+        min_severity (str, optional): Sévérité minimale des vulnérabilités retenues
+    
     Returns:
         dict: Résultats de l'analyse
     """
     logger.info("Démarrage de l'analyse des dépendances")
+    progress = progress or (lambda step: None)
     
+    progress("packages")
     packages = get_installed_packages()
+    changes = diff_dependencies(packages)
     save_dependencies_info(packages)
     
-    updates = check_for_updates()
-    vulnerabilities = check_security_vulnerabilities()
+    # Seuls les packages ajoutés ou modifiés sont vérifiés, les résultats précédents sont repris
+    # pour les autres (l'analyse des vulnérabilités réévalue tout si la base d'avis a changé)
+    progress("updates")
+    updates = check_for_updates_incremental(packages, changes)
+    progress("vulnerabilities")
+    vulnerabilities = check_security_vulnerabilities(packages, min_severity=min_severity)
     
     result = {
         "timestamp": datetime.now().isoformat(),
         "total_packages": len(packages),
+        "changes": changes,
         "updates_available": updates,
         "vulnerabilities": vulnerabilities
     }
     
     # Journaliser les résultats
+    logger.info(f"Changements depuis la dernière analyse: {len(changes['added'])} ajoutés, "
+                f"{len(changes['removed'])} supprimés, {len(changes['changed'])} mis à jour")
     logger.info(f"Analyse des dépendances terminée: {len(packages)} packages, {len(updates)} mises à jour, {len(vulnerabilities)} vulnérabilités")
     
     # Alerter si des vulnérabilités sont trouvées
     if vulnerabilities:
         logger.warning(f"ALERTE: {len(vulnerabilities)} vulnérabilités de sécurité trouvées!")
         for vuln in vulnerabilities:
-            logger.warning(f"Vulnérabilité dans {vuln['package_name']}: {vuln['vulnerability_id']}")
+            logger.warning(f"Vulnérabilité dans {vuln['package_name']}: {vuln['vulnerability_id']} ({vuln.get('severity', 'unknown')})")
     
     return result
 
@@ -218,8 +625,10 @@ def get_dependency_report():
     
     if vulnerabilities:
         for vuln in vulnerabilities:
-            report.append(f"{vuln['package_name']} ({vuln['installed_version']}): {vuln['vulnerability_id']}")
+            report.append(f"{vuln['package_name']} ({vuln['installed_version']}): {vuln['vulnerability_id']} [{vuln.get('severity', 'unknown')}]")
             report.append(f"  Description: {vuln['description']}")
+            if vuln.get("fixed_versions"):
+                report.append(f"  Corrigé en: {', '.join(vuln['fixed_versions'])}")
             report.append("")
     else:
         report.append("Aucune vulnérabilité détectée.")
@@ -0,0 +1,233 @@
+"""
+Planificateur des analyses de dépendances en arrière-plan.
+
+Les analyses s'exécutent dans un thread dédié, hors du chemin des requêtes:
+le démarrage de l'application n'attend jamais une vérification. L'état et la
+progression de l'analyse sont enregistrés dans un fichier lu par l'interface.
+Un verrou fichier empêche deux processus de lancer la même analyse.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Importer le logger
+from valetia.logger import loguru_logger as logger
+
+from .checker import DEPS_DIR
+
+# Fichier d'état de l'analyse en cours ou de la dernière analyse
+SCAN_STATUS_FILE = DEPS_DIR / "scan_status.json"
+SCAN_LOCK_FILE = DEPS_DIR / "scan.lock"
+
+# Un verrou plus ancien que ce délai est considéré comme abandonné (processus arrêté)
+STALE_LOCK_SECONDS = 6 * 3600
+
+# Délai avant la première vérification, pour laisser l'application démarrer
+STARTUP_DELAY_SECONDS = 30
+
+def _write_status(status):
+    """Enregistre l'état de l'analyse (écriture atomique)."""
+    tmp_file = SCAN_STATUS_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp_file, SCAN_STATUS_FILE)
+
+def get_scan_status():
+    """
+    Retourne l'état de l'analyse des dépendances.
+
+    Returns:
+        dict: État {"state": idle|running|error, "step", "started_at", "finished_at", "next_run", ...}
+    """
+    if not SCAN_STATUS_FILE.exists():
+        return {"state": "idle", "step": None, "started_at": None, "finished_at": None, "next_run": None}
+
+    try:
+        with open(SCAN_STATUS_FILE, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de l'état de l'analyse: {str(e)}")
+        return {"state": "error", "error": str(e)}
+
+def _acquire_lock():
+    """
+    Prend le verrou inter-processus de l'analyse.
+
+    Returns:
+        bool: True si le verrou a été obtenu
+    """
+    try:
+        if SCAN_LOCK_FILE.exists() and time.time() - SCAN_LOCK_FILE.stat().st_mtime > STALE_LOCK_SECONDS:
+            logger.warning("Verrou d'analyse des dépendances abandonné, suppression")
+            SCAN_LOCK_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+    try:
+        fd = os.open(SCAN_LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(os.getpid()))
+    return True
+
+def _release_lock():
+    """Libère le verrou inter-processus de l'analyse."""
+    try:
+        SCAN_LOCK_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+class DependencyScanScheduler:
+    """
+    Exécute check_and_alert périodiquement dans un thread d'arrière-plan.
+    """
+
+    def __init__(self, startup_delay=STARTUP_DELAY_SECONDS):
+        """
+        Initialise le planificateur.
+
+        Args:
+            startup_delay (float): Délai avant la première vérification, en secondes
+        """
+        self.startup_delay = startup_delay
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Démarre le thread du planificateur (sans effet s'il tourne déjà).
+
+        Returns:
+            bool: True si le thread a été démarré par cet appel
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="valetia-deps-scheduler", daemon=True)
+            self._thread.start()
+
+        logger.info("Planificateur des analyses de dépendances démarré")
+        return True
+
+    def stop(self, timeout=5):
+        """
+        Arrête le planificateur (une analyse en cours se termine en arrière-plan).
+
+        Args:
+            timeout (float): Temps d'attente maximal de l'arrêt du thread, en secondes
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_now(self):
+        """Demande une analyse immédiate, sans attendre l'échéance (démarre le planificateur si besoin)."""
+        self._wake.set()
+        self.start()
+
+    def is_running(self):
+        """Indique si le thread du planificateur est actif."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _seconds_until_next_check(self, config):
+        """Délai avant la prochaine analyse, d'après la configuration des alertes."""
+        last_check = config.get("last_check")
+        if not last_check:
+            return 0
+        interval = timedelta(hours=config.get("check_interval_hours", 24))
+        due = datetime.fromisoformat(last_check) + interval
+        return max((due - datetime.now()).total_seconds(), 0)
+
+    def _run(self):
+        """Boucle du planificateur."""
+        from .alerts import load_alerts_config
+
+        if self._wait(self.startup_delay):
+            return
+
+        while not self._stop.is_set():
+            forced = self._wake.is_set()
+            self._wake.clear()
+            try:
+                config = load_alerts_config()
+                delay = 0 if forced else self._seconds_until_next_check(config)
+                if (forced or config.get("enabled", True)) and delay == 0:
+                    self.run_scan(force=forced)
+                    config = load_alerts_config()
+                    delay = self._seconds_until_next_check(config)
+                elif not config.get("enabled", True):
+                    # Alertes désactivées: la configuration est relue toutes les heures
+                    delay = 3600
+            except Exception as e:
+                logger.error(f"Erreur dans le planificateur des dépendances: {str(e)}")
+                delay = 3600
+
+            # Attente jusqu'à l'échéance suivante (ou une demande d'analyse immédiate)
+            if self._wait(max(delay, 60)):
+                return
+
+    def _wait(self, seconds):
+        """Attend un délai; retourne True si le planificateur doit s'arrêter."""
+        self._wake.wait(seconds)
+        return self._stop.is_set()
+
+    def run_scan(self, force=False):
+        """
+        Exécute une analyse en enregistrant sa progression.
+
+        Args:
+            force (bool): Ignorer l'intervalle entre deux vérifications
+
+        Returns:
+            bool: True si des alertes ont été envoyées, None si une analyse était déjà en cours
+        """
+        from .alerts import check_and_alert, load_alerts_config
+
+        if not _acquire_lock():
+            logger.info("Analyse des dépendances déjà en cours dans un autre processus")
+            return None
+
+        status = {
+            "state": "running",
+            "step": "start",
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "next_run": None,
+            "pid": os.getpid(),
+        }
+
+        def progress(step):
+            status["step"] = step
+            status["updated_at"] = datetime.now().isoformat()
+            _write_status(status)
+
+        try:
+            progress("start")
+            alerts_sent = check_and_alert(force=force, progress=progress)
+            status.update(state="idle", step="done", alerts_sent=alerts_sent, error=None)
+            return alerts_sent
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse des dépendances en arrière-plan: {str(e)}")
+            status.update(state="error", error=str(e))
+            return False
+        finally:
+            status["finished_at"] = datetime.now().isoformat()
+            try:
+                config = load_alerts_config()
+                next_run = datetime.now() + timedelta(seconds=self._seconds_until_next_check(config))
+                status["next_run"] = next_run.isoformat()
+            except Exception:
+                pass
+            _write_status(status)
+            _release_lock()
+
+# Instance unique pour le processus de l'application
+scan_scheduler = DependencyScanScheduler()
@@ -6,19 +6,38 @@ Utilise transformers pour la compréhension et génération de texte.
 import os
 import random
 from pathlib import Path
+import threading
 import time
-from typing import Dict, List, Optional, Tuple, Union
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline, AutoModelForSeq2SeqLM
+from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline, AutoModelForSeq2SeqLM, TextIteratorStreamer
 import chromadb
 from chromadb.config import Settings
 
+from valetia.config.settings import (
+    ASSISTED_GENERATION,
+    CHATBOT_MAX_NEW_TOKENS,
+    DRAFT_MODEL,
+    PROMPT_CONTEXT_SHARE,
+    WRITE_BEHIND_FLUSH_INTERVAL,
+    WRITE_BEHIND_MAX_BATCH,
+    WRITE_BEHIND_MAX_PENDING
+)
+from valetia.core.embeddings import embedding_service
+from valetia.core.write_behind import WriteBehindQueue
 from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
+from valetia.utils.tracing import traced
 from valetia.modules.learning.feedback import feedback_manager
+from valetia.modules.chatbot.domain_classifier import detect_domain
+from valetia.modules.chatbot.prompt_builder import PromptBuilder, get_model_max_length
+from valetia.modules.chatbot.retrieval import KnowledgeRetriever
 from valetia.modules.chatbot.legal_prompts import (
     get_legal_prompt,
     get_vulgarization_prompt,
+    LEGAL_EXPERTISE_PROMPT,
     LEGAL_PREFIXES,
     LEGAL_DISCLAIMERS,
     COMMON_LEGAL_REFERENCES
@@ -26,18 +45,41 @@ from valetia.modules.chatbot.legal_prompts import (
 
 logger = get_logger(__name__)
 
+# Réponses de repli
+EMPTY_RESPONSE_FALLBACK = "Je ne suis pas sûr de comprendre votre question juridique. Pourriez-vous la reformuler ou préciser le domaine du droit concerné (copropriété, prud'hommes, succession)?"
+GENERATION_ERROR_RESPONSE = "Désolé, j'ai rencontré un problème technique lors de l'analyse de votre question juridique. Veuillez réessayer en reformulant."
+
+# Métriques partagées par les gestionnaires de conversation
+RESPONSE_SECONDS = metrics.histogram(
+    "valetia_response_seconds", "Durée de traitement d'une question", labels=("manager",)
+)
+GENERATION_SECONDS = metrics.histogram(
+    "valetia_generation_seconds", "Durée des appels au modèle de génération", labels=("backend",)
+)
+GENERATION_ERRORS = metrics.counter(
+    "valetia_generation_errors", "Erreurs lors de la génération d'une réponse", labels=("backend",)
+)
+
 class ConversationManager:
     """Gère les conversations avec l'utilisateur."""
     
-    def __init__(self, model_name: str = "facebook/blenderbot-400M-distill"):
+    def __init__(self,
+                 model_name: str = "facebook/blenderbot-400M-distill",
+                 max_new_tokens: int = CHATBOT_MAX_NEW_TOKENS,
+                 assisted_generation: bool = ASSISTED_GENERATION,
+                 draft_model_name: str = DRAFT_MODEL):
         """
         Initialise le gestionnaire de conversation.
         
         Args:
             model_name: Nom du modèle à charger. Par défaut "facebook/blenderbot-400M-distill".
                         Pour un modèle plus léger, utiliser "distilgpt2".
+            max_new_tokens: Nombre maximal de tokens générés pour une réponse
+            assisted_generation: Activer le décodage assisté par un modèle brouillon
+            draft_model_name: Modèle brouillon proposant les tokens (par défaut "distilgpt2")
         """
         self.model_name = model_name
+        self.max_new_tokens = max_new_tokens
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Initialisation du ConversationManager avec le modèle {model_name} sur {self.device}")
         
@@ -68,6 +110,22 @@ class ConversationManager:
             self.model_type = "causal_lm"
             logger.info("Fallback sur le modèle distilgpt2")
         
+        # Constructeur de prompts respectant la fenêtre du modèle
+        # (la réponse d'un modèle seq2seq est produite par le décodeur, hors de cette fenêtre)
+        self.prompt_builder = PromptBuilder(
+            self.tokenizer,
+            max_length=get_model_max_length(self.tokenizer, self.model) or 1024,
+            answer_tokens=self.max_new_tokens,
+            reserve_answer=self.model_type == "causal_lm",
+            context_share=PROMPT_CONTEXT_SHARE
+        )
+        
+        # Modèle brouillon pour le décodage assisté (optionnel)
+        self.assistant_model = None
+        self.assistant_tokenizer = None
+        if assisted_generation:
+            self._load_assistant_model(draft_model_name)
+        
         # Initialisation de la base de données vectorielle pour stocker l'historique
         self.db_path = Path("data/conversations")
         self.db_path.mkdir(parents=True, exist_ok=True)
@@ -77,13 +135,43 @@ class ConversationManager:
             settings=Settings(allow_reset=True)
         )
         
+        # Service d'embeddings basé sur EMBEDDING_MODEL (par lots, avec cache)
+        self.embedder = embedding_service
+        
         # Création de la collection pour stocker les conversations
         try:
-            self.collection = self.db.get_or_create_collection(name="conversations")
+            self.collection = self.db.get_or_create_collection(
+                name="conversations",
+                embedding_function=self.embedder
+            )
             logger.info("Collection ChromaDB 'conversations' initialisée")
+        except ValueError as e:
+            # Collection existante créée avec une autre fonction d'embedding:
+            # les embeddings sont de toute façon fournis explicitement à l'ajout
+            logger.warning(f"Fonction d'embedding non appliquée à la collection existante: {e}")
+            self.collection = self.db.get_or_create_collection(name="conversations")
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation de ChromaDB: {e}")
+        
+        # Les échanges sont persistés par lots en arrière-plan, après l'envoi de la réponse
+        self.write_queue = WriteBehindQueue(
+            self.collection,
+            embedder=self.embedder,
+            max_batch=WRITE_BEHIND_MAX_BATCH,
+            flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+            max_pending=WRITE_BEHIND_MAX_PENDING,
+            name="conversations"
+        )
+        
+        # Recherche sémantique dans les échanges utiles et les documents analysés
+        try:
+            self.retriever = KnowledgeRetriever(client=self.db, embedder=self.embedder)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation de la recherche sémantique: {e}")
+            self.retriever = None
     
+    @RESPONSE_SECONDS.timed(manager="local")
+    @traced("chatbot.get_response", manager="local")
     def get_response(self, 
                      user_input: str, 
                      conversation_id: str, 
@@ -99,77 +187,245 @@ class ConversationManager:
         Returns:
             Réponse générée
         """
-        # Récupérer l'historique de la conversation
-        history = self._get_conversation_history(conversation_id)
-        
-        # Ajout du contexte à la question si fourni
-        if context:
-            context_str = "Contexte: "
-            for ctx in context:
-                for key, value in ctx.items():
-                    context_str += f"{key}: {value}. "
-            enhanced_input = f"{context_str}\n\nQuestion: {user_input}"
-        else:
-            enhanced_input = user_input
-        
-        # Appliquer le template juridique à la question
-        legal_input = get_legal_prompt(enhanced_input)
+        prompt = self._prepare_prompt(user_input, conversation_id, context)
         
         # Génération de la réponse selon le type de modèle
         try:
-            if self.model_type == "seq2seq":
-                # Pour les modèles de type seq2seq (comme BlenderBot)
-                inputs = self.tokenizer([legal_input], return_tensors="pt").to(self.device)
-                outputs = self.model.generate(
-                    inputs.input_ids,
-                    max_length=150,
-                    num_return_sequences=1,
-                    temperature=0.7,
-                    top_k=50,
-                    top_p=0.95,
-                    do_sample=True
-                )
-                
-                response = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
-            else:
-                # Pour les modèles de type causal LM (comme GPT-2)
-                
-                # Construction du prompt avec l'historique
-                prompt = self._build_prompt(legal_input, history)
-                
-                inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-                outputs = self.model.generate(
-                    inputs.input_ids,
-                    max_length=150,
-                    num_return_sequences=1,
-                    temperature=0.7,
-                    top_k=50,
-                    top_p=0.95,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id
-                )
-                
-                full_response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-                
-                # Extraire seulement la réponse sans répéter le prompt
-                response = full_response[len(prompt):].strip()
+            response = self._generate(prompt)
             
             # Fallback si la réponse est vide
             if not response:
-                response = "Je ne suis pas sûr de comprendre votre question juridique. Pourriez-vous la reformuler ou préciser le domaine du droit concerné (copropriété, prud'hommes, succession)?"
+                response = EMPTY_RESPONSE_FALLBACK
                 
             # Post-traitement de la réponse pour la rendre plus juridique en français
             response = self._enhance_legal_response(response, user_input)
                 
         except Exception as e:
             logger.error(f"Erreur lors de la génération de la réponse: {e}")
-            response = "Désolé, j'ai rencontré un problème technique lors de l'analyse de votre question juridique. Veuillez réessayer en reformulant."
+            GENERATION_ERRORS.inc(backend="local")
+            response = GENERATION_ERROR_RESPONSE
         
         # Enregistrer l'échange dans l'historique
         self._save_conversation(conversation_id, user_input, response, context)
         
         return response
     
+    def stream_response(self, 
+                        user_input: str, 
+                        conversation_id: str, 
+                        context: Optional[List[Dict[str, str]]] = None) -> Iterator[str]:
+        """
+        Génère une réponse en la transmettant au fil de la génération.
+        
+        Le préfixe juridique est choisi sur les premiers caractères générés, les
+        références et avertissements sont ajoutés en fin de réponse.
+        
+        Args:
+            user_input: Texte envoyé par l'utilisateur
+            conversation_id: Identifiant unique de la conversation
+            context: Contexte optionnel (métadonnées sur le dossier)
+            
+        Yields:
+            Les fragments successifs de la réponse
+        """
+        prompt = self._prepare_prompt(user_input, conversation_id, context)
+        
+        emitted: List[str] = []
+        pending = ""
+        prefixed = False
+        try:
+            for piece in self._generate_stream(prompt):
+                if not prefixed:
+                    # Attendre assez de texte pour décider du préfixe juridique
+                    pending += piece
+                    if len(pending) < 30:
+                        continue
+                    piece = self._legal_prefix(pending) + pending
+                    prefixed = True
+                emitted.append(piece)
+                yield piece
+            
+            if not prefixed:
+                pending = pending.strip() or EMPTY_RESPONSE_FALLBACK
+                piece = self._legal_prefix(pending) + pending
+                emitted.append(piece)
+                yield piece
+            
+            suffix = self._legal_suffix("".join(emitted), user_input)
+            if suffix:
+                emitted.append(suffix)
+                yield suffix
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de la réponse: {e}")
+            if not emitted:
+                emitted.append(GENERATION_ERROR_RESPONSE)
+                yield GENERATION_ERROR_RESPONSE
+        finally:
+            self._save_conversation(conversation_id, user_input, "".join(emitted).strip(), context)
+    
+    @traced("chatbot.prepare_prompt")
+    def _prepare_prompt(self, 
+                        user_input: str, 
+                        conversation_id: str, 
+                        context: Optional[List[Dict[str, str]]] = None) -> str:
+        """Rassemble historique, contexte et références, puis construit le prompt."""
+        # Récupérer l'historique de la conversation (y compris les tours encore en file)
+        history = self._get_conversation_history(conversation_id)
+        
+        # Mise en forme du contexte si fourni
+        context_str = ""
+        if context:
+            context_str = "Contexte: "
+            for ctx in context:
+                for key, value in ctx.items():
+                    context_str += f"{key}: {value}. "
+        
+        # Ajout des échanges utiles et extraits de documents proches de la question
+        if self.retriever is not None:
+            hits = self.retriever.search(user_input, domain=detect_domain(user_input))
+            references = self.retriever.format_hits(hits)
+            if references:
+                context_str = f"{context_str}\n{references}".strip()
+        
+        # Construction du prompt juridique dans le budget de tokens du modèle
+        return self._build_prompt(user_input, history, context_str)
+    
+    def _load_assistant_model(self, draft_model_name: str) -> None:
+        """
+        Charge le modèle brouillon utilisé pour le décodage assisté.
+        
+        Le brouillon doit être de même nature que le modèle principal. Un brouillon
+        causal avec un tokenizer différent est pris en charge via le décodage assisté
+        universel (tokenizers fournis à generate); un modèle seq2seq exige un brouillon
+        seq2seq partageant son vocabulaire.
+        
+        Args:
+            draft_model_name: Nom du modèle brouillon
+        """
+        if draft_model_name == self.model_name:
+            logger.warning("Décodage assisté ignoré: le modèle brouillon est le modèle principal")
+            return
+        
+        try:
+            draft_tokenizer = AutoTokenizer.from_pretrained(draft_model_name)
+            same_vocab = draft_tokenizer.get_vocab() == self.tokenizer.get_vocab()
+            if self.model_type == "seq2seq":
+                if not same_vocab:
+                    logger.warning(
+                        f"Décodage assisté désactivé: {draft_model_name} ne partage pas "
+                        f"le vocabulaire du modèle seq2seq {self.model_name}"
+                    )
+                    return
+                draft_model = AutoModelForSeq2SeqLM.from_pretrained(draft_model_name)
+            else:
+                draft_model = AutoModelForCausalLM.from_pretrained(draft_model_name)
+            
+            draft_model.to(self.device)
+            draft_model.eval()
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement du modèle brouillon {draft_model_name}: {e}")
+            return
+        
+        self.assistant_model = draft_model
+        # Tokenizer distinct seulement si les vocabulaires diffèrent
+        if not same_vocab:
+            self.assistant_tokenizer = draft_tokenizer
+        logger.info(f"Décodage assisté activé avec le modèle brouillon {draft_model_name}")
+    
+    @traced("chatbot.generate", backend="local")
+    def _generate(self, prompt: str, assisted: Optional[bool] = None) -> str:
+        """
+        Génère le texte de la réponse pour un prompt déjà construit.
+        
+        Args:
+            prompt: Prompt construit par le PromptBuilder
+            assisted: Forcer ou désactiver le décodage assisté (par défaut: selon la configuration)
+            
+        Returns:
+            Le texte généré, sans le prompt
+        """
+        inputs, generation_kwargs = self._generation_inputs(prompt, assisted)
+        
+        with torch.inference_mode(), GENERATION_SECONDS.time(backend="local"):
+            outputs = self.model.generate(inputs.input_ids, **generation_kwargs)
+        
+        if self.model_type == "seq2seq":
+            # Pour les modèles de type seq2seq (comme BlenderBot), la sortie ne contient que la réponse
+            return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
+        
+        # Pour les modèles de type causal LM (comme GPT-2), décoder seulement les tokens générés
+        generated = outputs[0][inputs.input_ids.shape[-1]:]
+        return self.tokenizer.decode(generated, skip_special_tokens=True).strip()
+    
+    def _generate_stream(self, prompt: str, assisted: Optional[bool] = None) -> Iterator[str]:
+        """
+        Génère le texte de la réponse en le transmettant au fil des tokens.
+        
+        La génération s'exécute dans un thread; les fragments décodés sont lus
+        depuis un TextIteratorStreamer.
+        
+        Args:
+            prompt: Prompt construit par le PromptBuilder
+            assisted: Forcer ou désactiver le décodage assisté (par défaut: selon la configuration)
+            
+        Yields:
+            Les fragments de texte générés, sans le prompt
+        """
+        inputs, generation_kwargs = self._generation_inputs(prompt, assisted)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=60.0)
+        generation_kwargs["streamer"] = streamer
+        
+        errors: List[Exception] = []
+        
+        def run() -> None:
+            try:
+                with torch.inference_mode(), GENERATION_SECONDS.time(backend="local"):
+                    self.model.generate(inputs.input_ids, **generation_kwargs)
+            except Exception as e:
+                errors.append(e)
+                # Débloquer le lecteur du streamer
+                streamer.end()
+        
+        thread = threading.Thread(target=run, name="valetia-generation", daemon=True)
+        thread.start()
+        for piece in streamer:
+            if piece:
+                yield piece
+        thread.join()
+        if errors:
+            raise errors[0]
+    
+    def _generation_inputs(self, prompt: str, assisted: Optional[bool] = None) -> Tuple[Any, Dict[str, Any]]:
+        """Tokenise le prompt et prépare les paramètres de generate."""
+        inputs = self.tokenizer(
+            prompt,
+            return_tensors="pt",
+            truncation=True,
+            max_length=self.prompt_builder.max_length
+        ).to(self.device)
+        
+        generation_kwargs = {
+            "attention_mask": inputs.attention_mask,
+            "max_new_tokens": self.max_new_tokens,
+            "num_return_sequences": 1,
+            "temperature": 0.7,
+            "top_k": 50,
+            "top_p": 0.95,
+            "do_sample": True
+        }
+        if self.model_type == "causal_lm":
+            generation_kwargs["pad_token_id"] = self.tokenizer.eos_token_id
+        
+        if assisted is None:
+            assisted = self.assistant_model is not None
+        if assisted and self.assistant_model is not None:
+            generation_kwargs["assistant_model"] = self.assistant_model
+            if self.assistant_tokenizer is not None:
+                generation_kwargs["tokenizer"] = self.tokenizer
+                generation_kwargs["assistant_tokenizer"] = self.assistant_tokenizer
+        
+        return inputs, generation_kwargs
+    
     def _enhance_legal_response(self, response: str, question: str) -> str:
         """
         Améliore la réponse pour la rendre plus juridique et française.
@@ -181,30 +437,32 @@ class ConversationManager:
         Returns:
             La réponse améliorée
         """
+        response = self._legal_prefix(response) + response
+        return response + self._legal_suffix(response, question)
+    
+    def _legal_prefix(self, response_start: str) -> str:
+        """Choisit un préfixe juridique si le début de la réponse n'en contient pas déjà un."""
+        if not any(prefix in response_start[:30] for prefix in LEGAL_PREFIXES):
+            return random.choice(LEGAL_PREFIXES)
+        return ""
+    
+    def _legal_suffix(self, response: str, question: str) -> str:
+        """Construit la fin de réponse: référence juridique du domaine et avertissement."""
         # Détecter le domaine juridique concerné
-        domain = "général"
-        if any(keyword in question.lower() for keyword in ["copropriété", "syndic", "assemblee generale", "ag", "lot", "immeuble"]):
-            domain = "copropriété"
-        elif any(keyword in question.lower() for keyword in ["travail", "licenciement", "contrat", "employeur", "salarié", "prud'homme"]):
-            domain = "prud'hommes"
-        elif any(keyword in question.lower() for keyword in ["héritage", "succession", "testament", "héritier", "notaire"]):
-            domain = "succession"
-        
-        # Ajouter un préfixe juridique s'il n'y en a pas déjà
-        if not any(prefix in response[:30] for prefix in LEGAL_PREFIXES):
-            response = random.choice(LEGAL_PREFIXES) + response
+        domain = detect_domain(question)
+        suffix = ""
         
         # Ajouter une référence juridique si pertinent
         if domain in COMMON_LEGAL_REFERENCES and random.random() < 0.7:  # 70% de chance
             reference = random.choice(COMMON_LEGAL_REFERENCES[domain])
             if "selon" not in response.lower()[:50] and "d'après" not in response.lower()[:50]:
-                response += f"\n\nSelon {reference}, cette position est bien établie."
+                suffix += f"\n\nSelon {reference}, cette position est bien établie."
         
         # Ajouter un disclaimer juridique si non présent
         if not any(disclaimer in response.lower() for disclaimer in [d.lower() for d in LEGAL_DISCLAIMERS]):
-            response += f"\n\n{random.choice(LEGAL_DISCLAIMERS)}"
+            suffix += f"\n\n{random.choice(LEGAL_DISCLAIMERS)}"
         
-        return response
+        return suffix
     
     def save_feedback(self, 
                      conversation_id: str, 
@@ -225,42 +483,69 @@ class ConversationManager:
         Returns:
             bool: True si l'enregistrement a réussi, False sinon
         """
-        return feedback_manager.save_feedback(
+        success = feedback_manager.save_feedback(
             conversation_id=conversation_id,
             user_input=user_input,
             assistant_response=assistant_response,
             is_helpful=is_helpful,
-            feedback_text=feedback_text
+            feedback_text=feedback_text,
+            metadata={"domain": detect_domain(user_input)}
         )
-    
-    def _build_prompt(self, user_input: str, history: List[Dict[str, str]]) -> str:
-        """Construit le prompt avec l'historique de la conversation."""
-        prompt = ""
         
-        # Inclure l'historique récent dans le prompt (limité aux 5 derniers échanges)
-        for exchange in history[-5:]:
-            prompt += f"Utilisateur: {exchange['user']}\nAssistant: {exchange['assistant']}\n"
+        # Rendre l'échange disponible pour la recherche sémantique
+        if success and is_helpful and self.retriever is not None:
+            # L'échange encore dans la file d'écriture sera écrit déjà marqué
+            marked = self.write_queue.update_pending(
+                {"helpful": True}, conversation_id=conversation_id, user_input=user_input
+            )
+            if not marked and not self.retriever.mark_helpful(conversation_id, user_input):
+                self.retriever.add_helpful_exchange(
+                    conversation_id,
+                    user_input,
+                    assistant_response,
+                    domain=detect_domain(user_input)
+                )
         
-        # Ajouter la question actuelle
-        prompt += f"Utilisateur: {user_input}\nAssistant:"
+        return success
+    
+    def _build_prompt(self,
+                      user_input: str,
+                      history: List[Dict[str, str]],
+                      context_str: str = "") -> str:
+        """
+        Construit le prompt avec le template juridique, le contexte et l'historique.
         
-        return prompt
+        Les segments sont tronqués ou résumés pour laisser la place à la réponse.
+        """
+        return self.prompt_builder.build(
+            user_input,
+            history=history,
+            context=context_str,
+            template=LEGAL_EXPERTISE_PROMPT
+        )
     
     def _get_conversation_history(self, conversation_id: str) -> List[Dict[str, str]]:
-        """Récupère l'historique de la conversation depuis ChromaDB."""
+        """Récupère l'historique de la conversation depuis ChromaDB et la file d'écriture."""
         try:
+            # Les derniers tours peuvent ne pas encore être écrits. Un tour reste dans la file
+            # jusqu'à ce que ChromaDB l'ait enregistré: lu avant ChromaDB, il figure dans l'une
+            # des deux lectures au moins (les doublons sont retirés ci-dessous)
+            pending = self.write_queue.find_pending(conversation_id=conversation_id)
             results = self.collection.get(
                 where={"conversation_id": conversation_id},
                 limit=10  # Limiter aux 10 derniers échanges
             )
             
-            if not results or not results['metadatas']:
+            metadatas = list(results['metadatas'] or []) if results else []
+            metadatas.extend(pending)
+            if not metadatas:
                 return []
             
-            # Trier par timestamp
-            exchanges = [(metadata, metadata.get('timestamp', 0)) 
-                        for metadata in results['metadatas']]
-            exchanges.sort(key=lambda x: x[1])
+            # Trier par timestamp, sans doublons
+            unique = {(metadata.get('timestamp', 0), metadata.get('user_input'), metadata.get('assistant_response')): metadata
+                      for metadata in metadatas}
+            exchanges = sorted(((metadata, key[0]) for key, metadata in unique.items()), key=lambda x: x[1])
+            exchanges = exchanges[-10:]
             
             history = []
             for exchange, _ in exchanges:
@@ -275,6 +560,7 @@ class ConversationManager:
             logger.error(f"Erreur lors de la récupération de l'historique: {e}")
             return []
     
+    @traced("chatbot.save_conversation")
     def _save_conversation(self, 
                           conversation_id: str, 
                           user_input: str, 
@@ -283,13 +569,17 @@ class ConversationManager:
         """Enregistre l'échange dans ChromaDB."""
         try:
             timestamp = int(time.time())
-            exchange_id = f"{conversation_id}_{timestamp}"
+            # Suffixe aléatoire: deux échanges d'une même seconde ne doivent pas invalider un lot
+            exchange_id = f"{conversation_id}_{timestamp}_{uuid.uuid4().hex[:8]}"
             
             metadata = {
                 "conversation_id": conversation_id,
                 "user_input": user_input,
                 "assistant_response": assistant_response,
-                "timestamp": timestamp
+                "timestamp": timestamp,
+                "helpful": False,
+                "domain": detect_domain(user_input),
+                "prompt_version": LEGAL_EXPERTISE_PROMPT.key
             }
             
             # Ajouter le contexte aux métadonnées s'il est fourni
@@ -298,17 +588,11 @@ class ConversationManager:
                     for key, value in ctx.items():
                         metadata[f"context_{i}_{key}"] = str(value)
             
-            # Créer un embeddings (simplifiée pour l'instant)
-            # TODO: Utiliser un modèle d'embeddings plus sophistiqué
             combined_text = f"{user_input} {assistant_response}"
             
-            self.collection.add(
-                ids=[exchange_id],
-                documents=[combined_text],
-                metadatas=[metadata]
-            )
-            
-            logger.info(f"Conversation {conversation_id} mise à jour")
+            # Insertion différée: l'embedding et l'écriture sont faits par lots en arrière-plan
+            if self.write_queue.add(exchange_id, combined_text, metadata):
+                logger.info(f"Conversation {conversation_id} mise à jour")
         except Exception as e:
             logger.error(f"Erreur lors de l'enregistrement de la conversation: {e}")
 
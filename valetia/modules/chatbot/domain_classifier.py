@@ -0,0 +1,160 @@
+"""
+Classification des questions par domaine juridique.
+
+Tous les vocabulaires sont compilés en une seule expression régulière avec
+limites de mots, insensible à la casse et aux accents: une question est
+analysée en une passe linéaire, et les mots courts ("ag", "lot") ne sont plus
+reconnus à l'intérieur d'autres mots.
+"""
+
+from functools import lru_cache
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Domaine retenu lorsqu'aucun vocabulaire ne correspond
+DEFAULT_DOMAIN = "général"
+
+# Catégorie des termes juridiques généraux (utilisée pour le routage, pas comme domaine)
+LEGAL_TERMS_CATEGORY = "termes_juridiques"
+
+# Textes mis en cache: questions et messages courts (les documents entiers ne sont pas conservés)
+CACHE_MAX_CHARS = 2000
+
+# Vocabulaires par domaine: terme -> poids
+DOMAIN_VOCABULARIES: Dict[str, Dict[str, float]] = {
+    "copropriété": {
+        "copropriété": 2.0, "copropriétaire": 2.0, "syndic": 2.0, "syndicat des copropriétaires": 2.0,
+        "assemblée générale": 1.5, "ag": 1.0, "lot": 1.0, "immeuble": 1.0, "tantième": 1.5,
+        "charges de copropriété": 2.0, "règlement de copropriété": 2.0, "parties communes": 1.5,
+    },
+    "prud'hommes": {
+        "prud'homme": 2.0, "prud'hommes": 2.0, "prud'homal": 2.0, "travail": 1.0, "licenciement": 1.5,
+        "contrat de travail": 2.0, "contrat": 0.5, "employeur": 1.5, "salarié": 1.5, "démission": 1.5,
+        "rupture conventionnelle": 2.0, "cdi": 1.0, "cdd": 1.0,
+    },
+    "succession": {
+        "succession": 2.0, "héritage": 2.0, "héritier": 2.0, "hériter": 1.5, "testament": 2.0,
+        "notaire": 1.0, "réserve héréditaire": 2.0, "légataire": 1.5, "donation": 1.0, "défunt": 1.5,
+    },
+    LEGAL_TERMS_CATEGORY: {
+        "article": 1.0, "loi": 1.0, "code": 1.0, "juridique": 1.0, "légal": 1.0, "règlement": 1.0,
+        "jurisprudence": 1.0, "tribunal": 1.0, "cour": 1.0, "contentieux": 1.0, "judiciaire": 1.0,
+    },
+}
+
+# Classes de caractères rendant les motifs insensibles aux accents
+_ACCENT_CLASSES = {
+    "a": "[aàâä]", "c": "[cç]", "e": "[eéèêë]", "i": "[iîï]", "o": "[oôö]", "u": "[uùûü]",
+    "'": "['’]", " ": r"\s+",
+}
+
+# Terminaisons acceptées (pluriel, féminin) pour les termes d'au moins 4 lettres
+_INFLECTION = "(?:e|s|es|x)?"
+
+
+def _strip_accents(text: str) -> str:
+    """Retire les accents d'un terme (é -> e)."""
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _term_pattern(term: str) -> str:
+    """Construit le motif d'un terme: accents et apostrophes indifférents, flexions simples."""
+    pattern = "".join(_ACCENT_CLASSES.get(char, re.escape(char)) for char in _strip_accents(term.lower()))
+    if len(term) >= 4:
+        pattern += _INFLECTION
+    return pattern
+
+
+class LegalDomainClassifier:
+    """Classe les textes par domaine juridique en une seule passe."""
+
+    def __init__(self, vocabularies: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Compile les vocabulaires.
+
+        Args:
+            vocabularies: Vocabulaires par catégorie {catégorie: {terme: poids}} (par défaut DOMAIN_VOCABULARIES)
+        """
+        self.vocabularies = vocabularies or DOMAIN_VOCABULARIES
+
+        # Un groupe nommé par terme; les termes longs d'abord pour préférer la correspondance la plus longue
+        self._groups: Dict[str, Tuple[str, float]] = {}
+        alternatives = []
+        entries = [
+            (term, category, weight)
+            for category, terms in self.vocabularies.items()
+            for term, weight in terms.items()
+        ]
+        for index, (term, category, weight) in enumerate(sorted(entries, key=lambda entry: -len(entry[0]))):
+            group = f"t{index}"
+            self._groups[group] = (category, weight)
+            alternatives.append(f"(?P<{group}>{_term_pattern(term)})")
+
+        self._pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)", re.IGNORECASE)
+        self._classify_cached = lru_cache(maxsize=512)(self._classify)
+
+    def _classify(self, text: str) -> Tuple[Tuple[Tuple[str, float], ...], int]:
+        """Calcule les scores par domaine et le nombre de termes juridiques généraux."""
+        scores: Dict[str, float] = {}
+        legal_terms = 0
+        for match in self._pattern.finditer(text):
+            category, weight = self._groups[match.lastgroup]
+            if category == LEGAL_TERMS_CATEGORY:
+                legal_terms += 1
+            else:
+                scores[category] = scores.get(category, 0.0) + weight
+
+        ranked = tuple(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+        return ranked, legal_terms
+
+    def _lookup(self, text: str) -> Tuple[Tuple[Tuple[str, float], ...], int]:
+        """Scores d'un texte, depuis le cache pour les textes courts."""
+        if len(text) > CACHE_MAX_CHARS:
+            return self._classify(text)
+        return self._classify_cached(text)
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """
+        Classe un texte par domaine juridique.
+
+        Args:
+            text: Texte à analyser (question de l'utilisateur, extrait de document...)
+
+        Returns:
+            Dictionnaire {"domain": domaine principal, "scores": [(domaine, score), ...] par score décroissant,
+            "legal_terms": nombre de termes juridiques généraux}
+        """
+        ranked, legal_terms = self._lookup(text)
+        return {
+            "domain": ranked[0][0] if ranked else DEFAULT_DOMAIN,
+            "scores": list(ranked),
+            "legal_terms": legal_terms,
+        }
+
+    def detect(self, text: str) -> str:
+        """Retourne le domaine principal d'un texte ("général" si aucun)."""
+        ranked, _ = self._lookup(text)
+        return ranked[0][0] if ranked else DEFAULT_DOMAIN
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        """Retourne les domaines détectés avec leur score, par score décroissant."""
+        return list(self._lookup(text)[0])
+
+
+# Instance unique partagée par les gestionnaires de conversation
+domain_classifier = LegalDomainClassifier()
+
+
+def detect_domain(text: str) -> str:
+    """
+    Détecte le domaine juridique principal d'un texte.
+
+    Args:
+        text: Texte à analyser
+
+    Returns:
+        Le domaine ("copropriété", "prud'hommes", "succession" ou "général")
+    """
+    return domain_classifier.detect(text)
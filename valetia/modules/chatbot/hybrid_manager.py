@@ -8,30 +8,70 @@ import random
 import time
 from pathlib import Path
 import json
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 
 import numpy as np
 from valetia.utils.logger import get_logger
-from valetia.modules.api.claude_client import claude_client
+from valetia.utils.metrics import metrics
+from valetia.utils.tracing import traced
+try:
+    from valetia.modules.api.claude_client import claude_client
+except ImportError:
+    # Client distant indisponible: le gestionnaire ne répond qu'en local
+    claude_client = None
 from valetia.modules.learning.feedback import feedback_manager
+from valetia.modules.chatbot.domain_classifier import detect_domain, domain_classifier
+from valetia.modules.chatbot.retrieval import get_knowledge_retriever
 from valetia.modules.chatbot.legal_prompts import (
     get_legal_prompt,
+    get_system_prompt,
     LEGAL_PREFIXES,
     LEGAL_DISCLAIMERS
 )
 
 logger = get_logger(__name__)
 
+# Métriques partagées avec le gestionnaire local (même nom, même instance)
+RESPONSE_SECONDS = metrics.histogram(
+    "valetia_response_seconds", "Durée de traitement d'une question", labels=("manager",)
+)
+GENERATION_SECONDS = metrics.histogram(
+    "valetia_generation_seconds", "Durée des appels au modèle de génération", labels=("backend",)
+)
+RESPONSES = metrics.counter(
+    "valetia_hybrid_responses", "Réponses du gestionnaire hybride par origine", labels=("source",)
+)
+
 class HybridConversationManager:
     """
     Gestionnaire de conversation hybride qui combine un modèle local
     et l'API Claude pour maximiser l'efficacité et l'apprentissage.
     """
     
-    def __init__(self):
-        """Initialise le gestionnaire de conversation hybride."""
+    def __init__(self,
+                 remote_client: Optional[Any] = None,
+                 learning_dir: str = "data/learning",
+                 conversations_dir: str = "data/conversations",
+                 use_retrieval: bool = True,
+                 local_manager: Optional[Any] = None):
+        """
+        Initialise le gestionnaire de conversation hybride.
+        
+        Args:
+            remote_client: Client de l'API distante (par défaut le client Claude)
+            learning_dir: Répertoire des données d'apprentissage
+            conversations_dir: Répertoire d'enregistrement des conversations
+            use_retrieval: Ajouter les résultats de la recherche sémantique aux prompts
+            local_manager: Gestionnaire local générant les réponses (get_response, stream_response),
+                utilisé à la place des réponses de base s'il est fourni
+        """
+        self.remote_client = remote_client if remote_client is not None else claude_client
+        self.local_manager = local_manager
+        self.conversations_dir = Path(conversations_dir)
+        self.use_retrieval = use_retrieval
+        
         # Répertoire pour stocker les données d'apprentissage
-        self.learning_dir = Path("data/learning")
+        self.learning_dir = Path(learning_dir)
         self.learning_dir.mkdir(parents=True, exist_ok=True)
         
         # Fichier pour les exemples d'apprentissage
@@ -46,10 +86,13 @@ class HybridConversationManager:
         # Compteurs pour les stratégies
         self.local_responses = 0
         self.claude_responses = 0
+        self.learned_responses = 0
         
         logger.info("Gestionnaire de conversation hybride initialisé")
         logger.info(f"Nombre d'exemples d'apprentissage chargés: {len(self.learned_examples)}")
     
+    @RESPONSE_SECONDS.timed(manager="hybrid")
+    @traced("chatbot.get_response", manager="hybrid")
     def get_response(self, 
                      user_input: str, 
                      conversation_id: str, 
@@ -65,6 +108,72 @@ class HybridConversationManager:
         Returns:
             Réponse générée
         """
+        source, similar_example = self._choose_source(user_input, context)
+        
+        if source == "learned":
+            return similar_example["response"]
+        
+        if source == "local":
+            # Le gestionnaire local enregistre lui-même l'échange
+            response = self.local_manager.get_response(user_input, conversation_id, context=context)
+        else:
+            response = self._respond(source, similar_example, user_input, context)
+            # Enregistrer la conversation
+            self._save_conversation(conversation_id, user_input, response, context)
+        
+        # Journaliser les statistiques d'utilisation
+        total_responses = self.local_responses + self.claude_responses
+        if total_responses % 10 == 0:
+            logger.info(f"Statistiques - Local: {self.local_responses}, Claude: {self.claude_responses} "
+                       f"(économie: {(self.local_responses / total_responses * 100):.1f}%)")
+        
+        return response
+    
+    def stream_response(self, 
+                        user_input: str, 
+                        conversation_id: str, 
+                        context: Optional[List[Dict[str, str]]] = None) -> Iterator[str]:
+        """
+        Génère une réponse en la transmettant au fil de la génération.
+        
+        La stratégie est la même que pour get_response. Une réponse générée par le
+        gestionnaire local est transmise au fil de sa génération; les autres
+        réponses (apprises, adaptées, de base ou de l'API Claude) sont transmises
+        d'un bloc dès qu'elles sont disponibles.
+        
+        Args:
+            user_input: Texte envoyé par l'utilisateur
+            conversation_id: Identifiant unique de la conversation
+            context: Contexte optionnel (métadonnées sur le dossier)
+            
+        Yields:
+            Les fragments successifs de la réponse
+        """
+        source, similar_example = self._choose_source(user_input, context)
+        
+        if source == "learned":
+            yield similar_example["response"]
+            return
+        if source == "local":
+            yield from self.local_manager.stream_response(user_input, conversation_id, context=context)
+            return
+        
+        response = self._respond(source, similar_example, user_input, context)
+        try:
+            yield response
+        finally:
+            # Enregistré même si le client interrompt la lecture du flux
+            self._save_conversation(conversation_id, user_input, response, context)
+    
+    def _choose_source(self, 
+                       user_input: str, 
+                       context: Optional[List[Dict[str, str]]]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Choisit l'origine de la réponse et met à jour les compteurs.
+        
+        Returns:
+            Tuple (origine: learned|claude|adapted|local|basic, exemple similaire ou None)
+        """
         # Vérifier si une réponse similaire existe déjà dans les exemples appris
         similar_example, similarity = self._find_similar_example(user_input)
         
@@ -72,41 +181,44 @@ class HybridConversationManager:
         if similar_example and similarity > 0.8:
             logger.info(f"Utilisation d'une réponse apprise (similarité: {similarity:.2f})")
             self.local_responses += 1
-            return similar_example["response"]
+            self.learned_responses += 1
+            RESPONSES.inc(source="learned")
+            return "learned", similar_example
         
         # Décider si on utilise Claude ou une réponse locale
-        use_claude = self._should_use_claude(user_input, context, similarity)
-        
-        if use_claude:
-            # Utiliser l'API Claude
+        if self._should_use_claude(user_input, context, similarity):
             logger.info("Utilisation de l'API Claude pour la réponse")
             self.claude_responses += 1
+            RESPONSES.inc(source="claude")
+            return "claude", similar_example
+        
+        logger.info("Utilisation d'une réponse locale")
+        self.local_responses += 1
+        if similar_example:
+            # Utiliser l'exemple similaire mais l'adapter
+            source = "adapted"
+        elif self.local_manager is not None:
+            source = "local"
+        else:
+            # Générer une réponse basique
+            source = "basic"
+        RESPONSES.inc(source=source)
+        return source, similar_example
+    
+    def _respond(self, 
+                 source: str, 
+                 similar_example: Optional[Dict[str, Any]], 
+                 user_input: str, 
+                 context: Optional[List[Dict[str, str]]]) -> str:
+        """Produit la réponse d'origine claude, adapted ou basic."""
+        if source == "claude":
             response = self._get_claude_response(user_input, context)
-            
             # Apprendre de cette réponse pour les futures interactions
             self._learn_from_response(user_input, response)
-        else:
-            # Utiliser une approche locale
-            logger.info("Utilisation d'une réponse locale")
-            self.local_responses += 1
-            
-            if similar_example:
-                # Utiliser l'exemple similaire mais l'adapter
-                response = self._adapt_similar_response(similar_example["response"], user_input)
-            else:
-                # Générer une réponse basique
-                response = self._generate_basic_response(user_input, context)
-        
-        # Enregistrer la conversation
-        self._save_conversation(conversation_id, user_input, response, context)
-        
-        # Journaliser les statistiques d'utilisation
-        total_responses = self.local_responses + self.claude_responses
-        if total_responses % 10 == 0:
-            logger.info(f"Statistiques - Local: {self.local_responses}, Claude: {self.claude_responses} "
-                       f"(économie: {(self.local_responses / total_responses * 100):.1f}%)")
-        
-        return response
+            return response
+        if source == "adapted":
+            return self._adapt_similar_response(similar_example["response"], user_input)
+        return self._generate_basic_response(user_input, context)
     
     def save_feedback(self, 
                      conversation_id: str, 
@@ -133,12 +245,23 @@ class HybridConversationManager:
             user_input=user_input,
             assistant_response=assistant_response,
             is_helpful=is_helpful,
-            feedback_text=feedback_text
+            feedback_text=feedback_text,
+            metadata={"domain": detect_domain(user_input)}
         )
         
         # Si le feedback est positif, apprendre de cette interaction
         if success and is_helpful:
             self._learn_from_response(user_input, assistant_response, is_helpful=True)
+            
+            # Rendre l'échange disponible pour la recherche sémantique
+            retriever = get_knowledge_retriever() if self.use_retrieval else None
+            if retriever is not None:
+                retriever.add_helpful_exchange(
+                    conversation_id,
+                    user_input,
+                    assistant_response,
+                    domain=detect_domain(user_input)
+                )
         
         return success
     
@@ -157,6 +280,10 @@ class HybridConversationManager:
         Returns:
             bool: True si Claude doit être utilisé
         """
+        # Sans client distant, toutes les réponses sont locales
+        if self.remote_client is None:
+            return False
+        
         # Si la question est très courte, éviter d'utiliser Claude
         if len(user_input.split()) < 5:
             return False
@@ -168,10 +295,7 @@ class HybridConversationManager:
         # Si la question est complexe (longue ou contient des termes juridiques)
         is_complex = (
             len(user_input.split()) > 20 or
-            any(term in user_input.lower() for term in [
-                "article", "loi", "code", "juridique", "légal", "règlement",
-                "jurisprudence", "tribunal", "cour", "contentieux", "judiciaire"
-            ])
+            domain_classifier.classify(user_input)["legal_terms"] > 0
         )
         
         # Si du contexte est fourni, c'est probablement plus complexe
@@ -188,6 +312,7 @@ class HybridConversationManager:
         random_factor = random.random()
         return random_factor > 0.7  # 30% de chance d'utiliser Claude
     
+    @traced("chatbot.generate", backend="claude")
     def _get_claude_response(self, 
                             user_input: str, 
                             context: Optional[List[Dict[str, str]]]) -> str:
@@ -211,21 +336,23 @@ class HybridConversationManager:
         else:
             enhanced_input = user_input
         
+        # Ajouter les échanges utiles et extraits de documents proches de la question
+        retriever = get_knowledge_retriever() if self.use_retrieval else None
+        if retriever is not None:
+            references = retriever.format_hits(retriever.search(user_input, domain=detect_domain(user_input)))
+            if references:
+                enhanced_input = f"{references}\n\n{enhanced_input}"
+        
         # Obtenir une réponse de Claude
-        system_prompt = """
-        Tu es Valetia, un assistant juridique français intelligent spécialisé dans la copropriété,
-        les prud'hommes et les successions. Tes réponses sont précises, basées sur le droit français
-        et européen, mais vulgarisées pour être comprises par tous. Tu cites les références légales
-        pertinentes et proposes des pistes d'action concrètes. Tu indiques toujours tes limites et
-        rappelles que tes conseils ne remplacent pas ceux d'un professionnel du droit.
-        """
+        system_prompt = get_system_prompt()
         
-        result = claude_client.get_response(
-            prompt=enhanced_input,
-            system_prompt=system_prompt,
-            max_tokens=800,
-            temperature=0.7
-        )
+        with GENERATION_SECONDS.time(backend="claude"):
+            result = self.remote_client.get_response(
+                prompt=enhanced_input,
+                system_prompt=system_prompt.text,
+                max_tokens=800,
+                temperature=0.7
+            )
         
         # Extraire la réponse du résultat
         if "content" in result and isinstance(result["content"], list):
@@ -242,6 +369,7 @@ class HybridConversationManager:
         # Autre fallback
         return "Je n'ai pas pu générer une réponse à votre question juridique. Pourriez-vous reformuler votre demande?"
     
+    @traced("chatbot.generate", backend="basic")
     def _generate_basic_response(self, 
                                 user_input: str, 
                                 context: Optional[List[Dict[str, str]]]) -> str:
@@ -256,16 +384,13 @@ class HybridConversationManager:
             La réponse générée
         """
         # Détecter le domaine juridique concerné
-        domain = "général"
+        domain = detect_domain(user_input)
         
-        if any(keyword in user_input.lower() for keyword in ["copropriété", "syndic", "assemblée générale", "ag", "lot", "immeuble"]):
-            domain = "copropriété"
+        if domain == "copropriété":
             response = self._get_coproprietee_response(user_input)
-        elif any(keyword in user_input.lower() for keyword in ["travail", "licenciement", "contrat", "employeur", "salarié", "prud'homme"]):
-            domain = "prud'hommes"
+        elif domain == "prud'hommes":
             response = self._get_prudhommes_response(user_input)
-        elif any(keyword in user_input.lower() for keyword in ["héritage", "succession", "testament", "héritier", "notaire"]):
-            domain = "succession"
+        elif domain == "succession":
             response = self._get_succession_response(user_input)
         else:
             # Réponse générique
@@ -347,6 +472,7 @@ class HybridConversationManager:
         
         return response
     
+    @traced("chatbot.find_similar_example")
     def _find_similar_example(self, user_input: str) -> Tuple[Optional[Dict[str, str]], float]:
         """
         Cherche un exemple similaire dans les exemples appris.
@@ -406,6 +532,7 @@ class HybridConversationManager:
         
         return base_response
     
+    @traced("chatbot.learn_from_response")
     def _learn_from_response(self, 
                             user_input: str, 
                             response: str, 
@@ -490,6 +617,7 @@ class HybridConversationManager:
         except Exception as e:
             logger.error(f"Erreur lors de la sauvegarde des exemples d'apprentissage: {e}")
     
+    @traced("chatbot.save_conversation")
     def _save_conversation(self, 
                           conversation_id: str, 
                           user_input: str, 
@@ -505,7 +633,7 @@ class HybridConversationManager:
             context: Contexte optionnel
         """
         # Créer un fichier de conversation simple
-        conversation_dir = Path(f"data/conversations/{conversation_id}")
+        conversation_dir = self.conversations_dir / conversation_id
         conversation_dir.mkdir(parents=True, exist_ok=True)
         
         timestamp = int(time.time())
@@ -515,7 +643,8 @@ class HybridConversationManager:
             "timestamp": timestamp,
             "user_input": user_input,
             "assistant_response": assistant_response,
-            "context": context
+            "context": context,
+            "prompt_version": get_system_prompt().key
         }
         
         try:
@@ -1,7 +1,12 @@
 """
 Module contenant des templates de prompts spécialisés pour le domaine juridique français.
+
+Les templates sont compilés une fois dans le registre de prompts; leur clé de
+version identifie le prompt utilisé dans les caches et les logs.
 """
 
+from valetia.modules.chatbot.prompt_templates import PromptTemplate, prompt_registry
+
 # Template pour injecter l'expertise juridique dans les réponses
 LEGAL_EXPERTISE_TEMPLATE = """
 Tu es Valetia, un assistant juridique français spécialisé en droit de la copropriété, droit du travail (prud'hommes) et droit des successions. Tu dois répondre aux questions en français, de manière précise mais compréhensible pour des non-juristes.
@@ -33,6 +38,19 @@ Explique la notion juridique suivante en termes simples, comme si tu t'adressais
 Explication vulgarisée :
 """
 
+# Prompt système de l'assistant pour l'API distante
+HYBRID_SYSTEM_PROMPT = """Tu es Valetia, un assistant juridique français intelligent spécialisé dans la copropriété,
+les prud'hommes et les successions. Tes réponses sont précises, basées sur le droit français
+et européen, mais vulgarisées pour être comprises par tous. Tu cites les références légales
+pertinentes et proposes des pistes d'action concrètes. Tu indiques toujours tes limites et
+rappelles que tes conseils ne remplacent pas ceux d'un professionnel du droit.
+"""
+
+# Templates compilés (nom dans le registre de prompts)
+LEGAL_EXPERTISE_PROMPT = prompt_registry.register("legal_expertise", LEGAL_EXPERTISE_TEMPLATE, version=1)
+SIMPLIFICATION_PROMPT = prompt_registry.register("simplification", SIMPLIFICATION_TEMPLATE, version=1)
+SYSTEM_PROMPT = prompt_registry.register("hybrid_system", HYBRID_SYSTEM_PROMPT, version=1)
+
 # Formulations pour les réponses juridiques
 LEGAL_PREFIXES = [
     "D'un point de vue juridique, ",
@@ -83,7 +101,7 @@ def get_legal_prompt(question: str) -> str:
     Returns:
         Le prompt enrichi de contexte juridique
     """
-    return LEGAL_EXPERTISE_TEMPLATE.format(question=question)
+    return LEGAL_EXPERTISE_PROMPT.render(question=question)
 
 def get_vulgarization_prompt(concept: str) -> str:
     """
@@ -95,4 +113,13 @@ def get_vulgarization_prompt(concept: str) -> str:
     Returns:
         Le prompt pour la vulgarisation
     """
-    return SIMPLIFICATION_TEMPLATE.format(concept=concept)
+    return SIMPLIFICATION_PROMPT.render(concept=concept)
+
+def get_system_prompt() -> PromptTemplate:
+    """
+    Retourne le prompt système compilé de l'assistant.
+    
+    Returns:
+        Le template du prompt système (texte dans .text, version dans .key)
+    """
+    return SYSTEM_PROMPT
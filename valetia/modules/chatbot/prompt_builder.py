@@ -0,0 +1,259 @@
+"""
+Construction des prompts sous contrainte de budget de tokens.
+
+Le prompt est assemblé à partir de segments (template juridique, contexte du
+dossier, historique, question) dont la taille est mesurée avec le tokenizer
+du modèle. Chaque segment reçoit une part du budget, l'historique ancien est
+résumé puis abandonné lorsque la place manque.
+"""
+
+from collections import OrderedDict
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from valetia.modules.chatbot.prompt_templates import PromptTemplate
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Au-delà de cette valeur, model_max_length est une valeur sentinelle des tokenizers HF
+_UNBOUNDED_LENGTH = 100_000
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def get_model_max_length(tokenizer, model=None) -> Optional[int]:
+    """
+    Détermine la taille maximale d'entrée supportée par un modèle.
+
+    Args:
+        tokenizer: Tokenizer du modèle
+        model: Modèle transformers (optionnel)
+
+    Returns:
+        Nombre maximal de positions, ou None si inconnu
+    """
+    candidates = []
+
+    config = getattr(model, "config", None)
+    for attr in ("max_position_embeddings", "n_positions"):
+        value = getattr(config, attr, None)
+        if isinstance(value, int) and value > 0:
+            candidates.append(value)
+            break
+
+    tokenizer_max = getattr(tokenizer, "model_max_length", None)
+    if isinstance(tokenizer_max, int) and 0 < tokenizer_max < _UNBOUNDED_LENGTH:
+        candidates.append(tokenizer_max)
+
+    return min(candidates) if candidates else None
+
+
+class PromptBuilder:
+    """
+    Assemble les prompts du chatbot en respectant la fenêtre du modèle.
+
+    Le budget total est réparti entre la réponse (réservée d'office pour les
+    modèles causaux), le template juridique, la question, le contexte et
+    l'historique. Les tokenisations sont mises en cache par segment pour
+    que l'assemblage reste peu coûteux d'un tour à l'autre.
+    """
+
+    def __init__(self,
+                 tokenizer,
+                 max_length: int,
+                 answer_tokens: int = 150,
+                 reserve_answer: bool = True,
+                 context_share: float = 0.4,
+                 summary_tokens: int = 24,
+                 safety_margin: int = 8,
+                 cache_size: int = 512):
+        """
+        Initialise le constructeur de prompts.
+
+        Args:
+            tokenizer: Tokenizer du modèle (doit fournir encode et decode)
+            max_length: Nombre maximal de tokens supportés par le modèle
+            answer_tokens: Nombre de tokens réservés à la réponse
+            reserve_answer: Si la réponse partage la fenêtre du prompt (modèles causaux)
+            context_share: Part maximale du budget restant accordée au contexte
+            summary_tokens: Taille maximale d'un message résumé dans l'historique
+            safety_margin: Marge absorbant les écarts de tokenisation entre segments
+            cache_size: Nombre de segments dont la tokenisation est conservée
+        """
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.answer_tokens = answer_tokens
+        self.reserve_answer = reserve_answer
+        self.context_share = context_share
+        self.summary_tokens = summary_tokens
+        self.safety_margin = safety_margin
+        self.cache_size = cache_size
+
+        self._token_cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def input_budget(self) -> int:
+        """Nombre de tokens disponibles pour le prompt lui-même."""
+        budget = self.max_length - self.safety_margin
+        if self.reserve_answer:
+            budget -= self.answer_tokens
+        return max(budget, 0)
+
+    def encode(self, text: str) -> List[int]:
+        """
+        Tokenise un segment en utilisant le cache.
+
+        Args:
+            text: Segment de texte
+
+        Returns:
+            Liste des identifiants de tokens
+        """
+        with self._lock:
+            ids = self._token_cache.get(text)
+            if ids is not None:
+                self._token_cache.move_to_end(text)
+                return ids
+
+        # Tokenisation hors du verrou: les autres threads ne l'attendent pas
+        ids = list(self.tokenizer.encode(text, add_special_tokens=False))
+        with self._lock:
+            self._token_cache[text] = ids
+            self._token_cache.move_to_end(text)
+            while len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        return ids
+
+    def count_tokens(self, text: str) -> int:
+        """Retourne le nombre de tokens d'un segment."""
+        if not text:
+            return 0
+        return len(self.encode(text))
+
+    def truncate(self, text: str, max_tokens: int, keep_end: bool = False) -> str:
+        """
+        Tronque un segment à un nombre maximal de tokens.
+
+        Args:
+            text: Segment à tronquer
+            max_tokens: Nombre maximal de tokens conservés
+            keep_end: Conserver la fin du texte plutôt que le début
+
+        Returns:
+            Le segment tronqué (inchangé s'il tient dans le budget)
+        """
+        if max_tokens <= 0:
+            return ""
+
+        ids = self.encode(text)
+        if len(ids) <= max_tokens:
+            return text
+
+        kept = ids[-max_tokens:] if keep_end else ids[:max_tokens]
+        return self.tokenizer.decode(kept, skip_special_tokens=True).strip()
+
+    def summarize(self, text: str) -> str:
+        """
+        Résume un message de l'historique (première phrase, tronquée).
+
+        Args:
+            text: Message à résumer
+
+        Returns:
+            Le résumé extractif du message
+        """
+        first_sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+        return self.truncate(first_sentence, self.summary_tokens)
+
+    def build(self,
+              question: str,
+              history: Optional[Sequence[Dict[str, str]]] = None,
+              context: str = "",
+              template: Optional[Union[PromptTemplate, Callable[[str], str]]] = None) -> str:
+        """
+        Construit le prompt final dans le budget du modèle.
+
+        Args:
+            question: Question de l'utilisateur
+            history: Échanges précédents ({'user': ..., 'assistant': ...}), du plus ancien au plus récent
+            context: Contexte du dossier déjà mis en forme
+            template: Template compilé ou fonction appliquant le template système à la question (optionnel).
+                Les parties fixes d'un template compilé ne sont tokenisées qu'une fois.
+
+        Returns:
+            Le prompt prêt à être tokenisé
+        """
+        history = list(history or [])
+        budget = self.input_budget
+
+        # Template et question sont prioritaires; le template est abandonné s'il ne tient pas
+        def render(ctx: str) -> str:
+            body = f"{ctx}\n\nQuestion: {question}" if ctx else question
+            if template is not None:
+                body = template(body)
+            return f"Utilisateur: {body}\nAssistant:"
+
+        def measure(ctx: str) -> int:
+            if isinstance(template, PromptTemplate):
+                # Parties fixes pré-tokenisées: seule la partie variable est tokenisée
+                body = f"{ctx}\n\nQuestion: {question}" if ctx else question
+                return (self.count_tokens("Utilisateur: \nAssistant:")
+                        + template.static_token_count(self.tokenizer) + self.count_tokens(body))
+            return self.count_tokens(render(ctx))
+
+        question_tokens = measure("")
+        if question_tokens > budget and template is not None:
+            logger.warning("Template juridique abandonné: il dépasse la fenêtre du modèle")
+            template = None
+            question_tokens = measure("")
+
+        if question_tokens > budget:
+            question = self.truncate(question, budget - self.count_tokens("Utilisateur: \nAssistant:"), keep_end=True)
+            return render("")
+
+        remaining = budget - question_tokens
+
+        # Répartition du reste entre contexte et historique
+        full_turns = [self._format_turn(turn["user"], turn["assistant"]) for turn in history]
+        history_need = sum(self.count_tokens(turn) for turn in full_turns)
+        context_cap = max(int(remaining * self.context_share), remaining - history_need)
+
+        if context:
+            # L'en-tête "Question:" ajouté autour du contexte consomme aussi des tokens
+            overhead = measure(context) - question_tokens - self.count_tokens(context)
+            context = self.truncate(context, min(context_cap, remaining) - max(overhead, 0))
+        prompt_tail = render(context)
+        remaining = budget - measure(context)
+
+        # Historique: les échanges récents sont gardés intacts, les plus anciens résumés puis abandonnés
+        kept_turns: List[str] = []
+        summarizing = False
+        for turn, exchange in zip(reversed(full_turns), reversed(history)):
+            if not summarizing:
+                cost = self.count_tokens(turn)
+                if cost <= remaining:
+                    kept_turns.append(turn)
+                    remaining -= cost
+                    continue
+                summarizing = True
+
+            summary = self._format_turn(self.summarize(exchange["user"]), self.summarize(exchange["assistant"]))
+            cost = self.count_tokens(summary)
+            if cost > remaining:
+                break
+            kept_turns.append(summary)
+            remaining -= cost
+
+        dropped = len(history) - len(kept_turns)
+        if dropped or summarizing:
+            logger.debug(f"Historique réduit: {len(kept_turns)}/{len(history)} échanges conservés")
+
+        return "".join(reversed(kept_turns)) + prompt_tail
+
+    @staticmethod
+    def _format_turn(user: str, assistant: str) -> str:
+        """Met en forme un échange de l'historique."""
+        return f"Utilisateur: {user}\nAssistant: {assistant}\n"
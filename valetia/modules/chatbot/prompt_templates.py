@@ -0,0 +1,184 @@
+"""
+Registre des templates de prompts compilés et versionnés.
+
+Chaque template est analysé une seule fois: ses parties fixes et ses champs
+sont séparés, le rendu se limite à une concaténation. Les parties fixes sont
+tokenisées une fois par tokenizer, ce qui donne le coût en tokens d'un
+template sans retokeniser son texte à chaque question. La clé de version
+(nom, version, empreinte du texte) permet d'indexer caches et logs.
+"""
+
+import hashlib
+from string import Formatter
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PromptTemplate:
+    """Template compilé: parties fixes et champs à remplacer."""
+
+    def __init__(self, name: str, text: str, version: int = 1):
+        """
+        Compile un template au format str.format.
+
+        Args:
+            name: Nom du template dans le registre
+            text: Texte du template (champs nommés entre accolades)
+            version: Numéro de version du template
+        """
+        self.name = name
+        self.text = text
+        self.version = version
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+        # Découpage en [(texte fixe, champ ou None), ...]
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, format_spec, conversion in Formatter().parse(text):
+            if field is not None and (format_spec or conversion or not field.isidentifier()):
+                raise ValueError(f"Champ non supporté dans le template '{name}': {{{field}}}")
+            self._parts.append((literal, field))
+
+        self.fields: Tuple[str, ...] = tuple(dict.fromkeys(field for _, field in self._parts if field))
+        self.static_text = "".join(literal for literal, _ in self._parts)
+
+        self._token_counts: Dict[int, Tuple[object, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        """Clé de version du template (nom, version et empreinte du texte)."""
+        return f"{self.name}:v{self.version}:{self.digest}"
+
+    def render(self, **values: str) -> str:
+        """
+        Remplit les champs du template.
+
+        Args:
+            **values: Valeur de chaque champ
+
+        Returns:
+            Le prompt rendu
+        """
+        try:
+            return "".join(literal + (str(values[field]) if field else "") for literal, field in self._parts)
+        except KeyError as e:
+            raise KeyError(f"Champ manquant pour le template '{self.name}': {e}") from None
+
+    def __call__(self, *args: str, **values: str) -> str:
+        """Rend le template; une valeur positionnelle remplit l'unique champ du template."""
+        if args:
+            if len(args) != 1 or len(self.fields) != 1:
+                raise TypeError(f"Le template '{self.name}' attend les champs nommés {self.fields}")
+            values[self.fields[0]] = args[0]
+        return self.render(**values)
+
+    def static_token_count(self, tokenizer) -> int:
+        """
+        Nombre de tokens des parties fixes pour un tokenizer (calculé une fois).
+
+        Args:
+            tokenizer: Tokenizer du modèle (méthode encode)
+
+        Returns:
+            Nombre de tokens du texte fixe, hors champs
+        """
+        cached = self._token_counts.get(id(tokenizer))
+        if cached is not None and cached[0] is tokenizer:
+            return cached[1]
+
+        count = sum(
+            len(tokenizer.encode(literal, add_special_tokens=False))
+            for literal, _ in self._parts
+            if literal
+        )
+        with self._lock:
+            # La référence au tokenizer empêche la réutilisation de son id par un autre objet
+            self._token_counts[id(tokenizer)] = (tokenizer, count)
+        return count
+
+
+class PromptRegistry:
+    """Registre des templates, par nom et par version."""
+
+    def __init__(self):
+        """Initialise un registre vide."""
+        self._templates: Dict[str, Dict[int, PromptTemplate]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, text: str, version: Optional[int] = None) -> PromptTemplate:
+        """
+        Compile et enregistre un template.
+
+        Args:
+            name: Nom du template
+            text: Texte du template
+            version: Numéro de version (par défaut, version suivant la dernière enregistrée)
+
+        Returns:
+            Le template compilé (celui déjà enregistré si le texte est identique)
+        """
+        with self._lock:
+            versions = self._templates.setdefault(name, {})
+            latest = versions[max(versions)] if versions else None
+
+            if version is None:
+                if latest is not None and latest.text == text:
+                    return latest
+                version = latest.version + 1 if latest is not None else 1
+            elif version in versions:
+                if versions[version].text != text:
+                    raise ValueError(f"La version {version} du template '{name}' existe déjà avec un autre texte")
+                return versions[version]
+
+            template = PromptTemplate(name, text, version)
+            versions[version] = template
+
+        logger.debug(f"Template de prompt enregistré: {template.key}")
+        return template
+
+    def get(self, name: str, version: Optional[int] = None) -> PromptTemplate:
+        """
+        Récupère un template.
+
+        Args:
+            name: Nom du template
+            version: Numéro de version (par défaut, la dernière)
+
+        Returns:
+            Le template compilé
+        """
+        versions = self._templates.get(name)
+        if not versions:
+            raise KeyError(f"Template de prompt inconnu: {name}")
+        if version is None:
+            return versions[max(versions)]
+        if version not in versions:
+            raise KeyError(f"Version {version} inconnue pour le template '{name}'")
+        return versions[version]
+
+    def versions(self, name: str) -> List[int]:
+        """Retourne les versions enregistrées d'un template, par ordre croissant."""
+        return sorted(self._templates.get(name, {}))
+
+    def token_counts(self, tokenizer) -> Dict[str, int]:
+        """
+        Coût en tokens des parties fixes de la dernière version de chaque template.
+
+        Args:
+            tokenizer: Tokenizer du modèle
+
+        Returns:
+            Dictionnaire {clé de version: nombre de tokens}
+        """
+        return {
+            template.key: template.static_token_count(tokenizer)
+            for template in (self.get(name) for name in sorted(self._templates))
+        }
+
+
+# Registre partagé de l'application
+prompt_registry = PromptRegistry()
@@ -0,0 +1,410 @@
+"""
+Recherche sémantique dans les échanges passés et les documents analysés.
+
+Les échanges jugés utiles et les extraits des documents chargés par le
+DocumentAnalyzer sont indexés dans ChromaDB. Les meilleurs résultats sont
+injectés dans le prompt, dans un budget de latence fixé. Les requêtes qui
+dépassent ce budget continuent dans le pool: tant qu'il est saturé, les
+nouvelles recherches sont abandonnées plutôt que mises en file derrière elles.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+import hashlib
+from pathlib import Path
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from valetia.config.settings import (
+    RETRIEVAL_LATENCY_BUDGET,
+    RETRIEVAL_MIN_SCORE,
+    RETRIEVAL_TOP_K
+)
+from valetia.core.embeddings import EmbeddingService, embedding_service
+from valetia.modules.chatbot.domain_classifier import detect_domain
+from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+CHROMA_SECONDS = metrics.histogram(
+    "valetia_chroma_seconds", "Durée des opérations ChromaDB", labels=("operation",)
+)
+
+
+class KnowledgeRetriever:
+    """
+    Recherche top-k dans les collections 'conversations' et 'documents'.
+
+    Les échanges ne sont retenus que s'ils ont reçu un feedback positif
+    (métadonnée 'helpful'); les deux collections peuvent être filtrées par
+    domaine juridique (métadonnée 'domain').
+    """
+
+    def __init__(self,
+                 client=None,
+                 embedder: EmbeddingService = embedding_service,
+                 db_path: str = "data/conversations",
+                 top_k: int = RETRIEVAL_TOP_K,
+                 latency_budget: float = RETRIEVAL_LATENCY_BUDGET,
+                 min_score: float = RETRIEVAL_MIN_SCORE,
+                 chunk_size: int = 800,
+                 chunk_overlap: int = 100,
+                 max_workers: int = 2):
+        """
+        Initialise le moteur de recherche.
+
+        Args:
+            client: Client ChromaDB existant (optionnel, sinon client persistant sur db_path)
+            embedder: Service d'embeddings partagé avec les collections
+            db_path: Répertoire de la base ChromaDB
+            top_k: Nombre de résultats retenus par défaut
+            latency_budget: Temps maximal accordé à la recherche, en secondes
+            min_score: Score de similarité minimal (cosinus) d'un résultat
+            chunk_size: Taille des extraits de documents, en caractères
+            chunk_overlap: Recouvrement entre deux extraits consécutifs, en caractères
+            max_workers: Nombre de threads de recherche
+        """
+        if client is None:
+            import chromadb
+            from chromadb.config import Settings
+
+            Path(db_path).mkdir(parents=True, exist_ok=True)
+            client = chromadb.PersistentClient(path=db_path, settings=Settings(allow_reset=True))
+
+        self.client = client
+        self.embedder = embedder
+        self.top_k = top_k
+        self.latency_budget = latency_budget
+        self.min_score = min_score
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+        self.conversations = self._get_collection("conversations")
+        self.documents = self._get_collection("documents")
+
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="valetia-retrieval")
+        # Tâches soumises au pool et pas encore terminées (y compris celles des recherches abandonnées)
+        self._running = 0
+        self._running_lock = threading.Lock()
+
+        logger.info("KnowledgeRetriever initialisé (collections 'conversations' et 'documents')")
+
+    def _get_collection(self, name: str):
+        """Récupère ou crée une collection utilisant le service d'embeddings."""
+        try:
+            return self.client.get_or_create_collection(name=name, embedding_function=self.embedder)
+        except ValueError as e:
+            logger.warning(f"Fonction d'embedding non appliquée à la collection existante '{name}': {e}")
+            return self.client.get_or_create_collection(name=name)
+
+    def search(self,
+               query: str,
+               domain: Optional[str] = None,
+               k: Optional[int] = None,
+               timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Recherche les échanges utiles et extraits de documents proches d'une question.
+
+        Args:
+            query: Question de l'utilisateur
+            domain: Domaine juridique pour filtrer les résultats (optionnel, "général" ne filtre pas)
+            k: Nombre de résultats (par défaut top_k)
+            timeout: Budget de latence en secondes (par défaut latency_budget)
+
+        Returns:
+            Liste de résultats {"source", "text", "score", "metadata"}, du plus pertinent au moins pertinent.
+            Les recherches qui dépassent le budget sont ignorées.
+        """
+        k = k or self.top_k
+        timeout = self.latency_budget if timeout is None else timeout
+        deadline = time.perf_counter() + timeout
+
+        if self._saturated():
+            logger.warning("Recherche abandonnée: requêtes précédentes encore en cours")
+            return []
+
+        try:
+            embedding_future = self._submit(self.embedder.embed, [query])
+            query_embedding = embedding_future.result(timeout=timeout)[0]
+        except FutureTimeoutError:
+            embedding_future.cancel()
+            logger.warning(f"Recherche abandonnée: embedding de la question au-delà de {timeout:.2f}s")
+            return []
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul de l'embedding de la question: {e}")
+            return []
+
+        if domain == "général":
+            domain = None
+        conversation_filter: Dict[str, Any] = {"helpful": True}
+        if domain:
+            conversation_filter = {"$and": [{"helpful": True}, {"domain": domain}]}
+        document_filter = {"domain": domain} if domain else None
+
+        futures = {
+            "conversation": self._submit(
+                self._query, self.conversations, query_embedding, k, conversation_filter
+            ),
+            "document": self._submit(
+                self._query, self.documents, query_embedding, k, document_filter
+            ),
+        }
+        wait(futures.values(), timeout=max(deadline - time.perf_counter(), 0))
+
+        hits = []
+        for source, future in futures.items():
+            if not future.done():
+                # Requête pas encore démarrée: retirée du pool; sinon elle s'y termine
+                future.cancel()
+                logger.warning(f"Recherche '{source}' ignorée: budget de latence de {timeout:.2f}s dépassé")
+                continue
+            try:
+                hits.extend(dict(hit, source=source) for hit in future.result())
+            except Exception as e:
+                logger.error(f"Erreur lors de la recherche '{source}': {e}")
+
+        hits.sort(key=lambda hit: hit["score"], reverse=True)
+        return hits[:k]
+
+    def _submit(self, fn, *args):
+        """Soumet une tâche au pool en comptant les tâches non terminées."""
+        with self._running_lock:
+            self._running += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._task_done(None)
+            raise
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _task_done(self, future) -> None:
+        with self._running_lock:
+            self._running -= 1
+
+    def _saturated(self) -> bool:
+        """Vrai si tous les threads du pool sont occupés par des tâches non terminées."""
+        with self._running_lock:
+            return self._running >= self.max_workers
+
+    def _query(self, collection, embedding: List[float], k: int, where: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Exécute une requête vectorielle et convertit les distances en scores."""
+        if collection.count() == 0:
+            return []
+
+        with CHROMA_SECONDS.time(operation="query"):
+            results = collection.query(
+                query_embeddings=[embedding],
+                n_results=k,
+                where=where,
+                include=["documents", "metadatas", "distances"]
+            )
+
+        hits = []
+        for text, metadata, distance in zip(results["documents"][0], results["metadatas"][0], results["distances"][0]):
+            # Embeddings normalisés: distance L2 au carré = 2 - 2 * cosinus
+            score = 1.0 - distance / 2.0
+            if score >= self.min_score:
+                hits.append({"text": text, "score": score, "metadata": metadata or {}})
+        return hits
+
+    def format_hits(self, hits: List[Dict[str, Any]], max_chars: int = 600) -> str:
+        """
+        Met en forme les résultats pour les injecter dans un prompt.
+
+        Args:
+            hits: Résultats de search()
+            max_chars: Taille maximale d'un résultat dans le prompt
+
+        Returns:
+            Bloc de texte prêt à être ajouté au contexte (vide si aucun résultat)
+        """
+        if not hits:
+            return ""
+
+        lines = ["Références pertinentes:"]
+        for hit in hits:
+            metadata = hit["metadata"]
+            if hit["source"] == "conversation":
+                text = f"Q: {metadata.get('user_input', '')} R: {metadata.get('assistant_response', '')}"
+                label = "Échange validé"
+            else:
+                text = hit["text"]
+                label = f"Document {metadata.get('document_name', '')}".strip()
+            lines.append(f"- [{label}] {text[:max_chars]}")
+        return "\n".join(lines)
+
+    def add_helpful_exchange(self,
+                             conversation_id: str,
+                             user_input: str,
+                             assistant_response: str,
+                             domain: Optional[str] = None) -> None:
+        """
+        Indexe un échange jugé utile qui n'est pas déjà dans la collection.
+
+        Args:
+            conversation_id: Identifiant de la conversation
+            user_input: Question de l'utilisateur
+            assistant_response: Réponse jugée utile
+            domain: Domaine juridique de l'échange (optionnel)
+        """
+        document = f"{user_input} {assistant_response}"
+        exchange_id = f"{conversation_id}_{hashlib.sha256(document.encode('utf-8')).hexdigest()[:16]}"
+        metadata = {
+            "conversation_id": conversation_id,
+            "user_input": user_input,
+            "assistant_response": assistant_response,
+            "timestamp": int(time.time()),
+            "helpful": True,
+            "domain": domain or "général"
+        }
+        try:
+            embeddings = self.embedder.embed([document])
+            with CHROMA_SECONDS.time(operation="upsert"):
+                self.conversations.upsert(
+                    ids=[exchange_id],
+                    documents=[document],
+                    metadatas=[metadata],
+                    embeddings=embeddings
+                )
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation de l'échange utile: {e}")
+
+    def mark_helpful(self, conversation_id: str, user_input: str) -> int:
+        """
+        Marque comme utiles les échanges déjà enregistrés pour une question.
+
+        Args:
+            conversation_id: Identifiant de la conversation
+            user_input: Question de l'utilisateur
+
+        Returns:
+            Nombre d'échanges mis à jour
+        """
+        try:
+            results = self.conversations.get(
+                where={"$and": [{"conversation_id": conversation_id}, {"user_input": user_input}]}
+            )
+            if not results or not results["ids"]:
+                return 0
+
+            metadatas = [dict(metadata or {}, helpful=True) for metadata in results["metadatas"]]
+            self.conversations.update(ids=results["ids"], metadatas=metadatas)
+            return len(results["ids"])
+        except Exception as e:
+            logger.error(f"Erreur lors du marquage de l'échange utile: {e}")
+            return 0
+
+    def chunk_text(self, text: str) -> List[str]:
+        """
+        Découpe un texte en extraits, en privilégiant les limites de paragraphes.
+
+        Args:
+            text: Texte à découper
+
+        Returns:
+            Liste des extraits
+        """
+        paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+        chunks: List[str] = []
+        current = ""
+
+        for paragraph in paragraphs:
+            if current and len(current) + len(paragraph) + 1 > self.chunk_size:
+                chunks.append(current)
+                current = current[-self.chunk_overlap:] if self.chunk_overlap else ""
+            current = f"{current}\n{paragraph}".strip()
+
+            # Paragraphes plus longs qu'un extrait
+            while len(current) > self.chunk_size:
+                chunks.append(current[:self.chunk_size])
+                current = current[self.chunk_size - self.chunk_overlap:]
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def index_document(self, document_info: Dict[str, Any], domain: Optional[str] = None) -> int:
+        """
+        Indexe les extraits d'un document chargé par le DocumentAnalyzer.
+
+        Args:
+            document_info: Informations du document (voir DocumentAnalyzer.load_document)
+            domain: Domaine juridique du document (optionnel, détecté à partir du contenu sinon)
+
+        Returns:
+            Nombre d'extraits indexés
+        """
+        content = document_info.get("content")
+        if not content:
+            return 0
+        domain = domain or detect_domain(content)
+
+        chunks = self.chunk_text(content)
+        if not chunks:
+            return 0
+
+        doc_key = hashlib.sha256(f"{document_info['path']}:{content}".encode("utf-8")).hexdigest()[:16]
+        ids = [f"doc_{doc_key}_{i}" for i in range(len(chunks))]
+        metadatas = [
+            {
+                "document_name": document_info["name"],
+                "path": document_info["path"],
+                "chunk": i,
+                "domain": domain
+            }
+            for i in range(len(chunks))
+        ]
+
+        try:
+            embeddings = self.embedder.embed(chunks)
+            with CHROMA_SECONDS.time(operation="upsert"):
+                self.documents.upsert(
+                    ids=ids,
+                    documents=chunks,
+                    metadatas=metadatas,
+                    embeddings=embeddings
+                )
+            logger.info(f"Document {document_info['name']} indexé ({len(chunks)} extraits)")
+            return len(chunks)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation du document {document_info['name']}: {e}")
+            return 0
+
+    def index_analyzer(self, analyzer, domain: Optional[str] = None) -> int:
+        """
+        Indexe tous les documents chargés dans un DocumentAnalyzer.
+
+        Args:
+            analyzer: Instance de DocumentAnalyzer
+            domain: Domaine juridique des documents (optionnel, détecté document par document sinon)
+
+        Returns:
+            Nombre total d'extraits indexés
+        """
+        return sum(self.index_document(document, domain=domain) for document in analyzer.documents)
+
+
+_retriever: Optional[KnowledgeRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_knowledge_retriever() -> Optional[KnowledgeRetriever]:
+    """
+    Retourne l'instance partagée du moteur de recherche (créée au premier appel).
+
+    Returns:
+        Le KnowledgeRetriever, ou None si ChromaDB n'est pas disponible
+    """
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                try:
+                    _retriever = KnowledgeRetriever()
+                except Exception as e:
+                    logger.error(f"Recherche sémantique indisponible: {e}")
+                    return None
+    return _retriever
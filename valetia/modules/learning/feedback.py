@@ -3,15 +3,22 @@ Module pour la gestion des feedbacks utilisateur.
 Permet d'enregistrer et d'analyser les feedbacks pour améliorer les réponses.
 """
 
-import json
 import time
+import uuid
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
 from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
+from valetia.modules.learning.feedback_store import FeedbackStore
 
 logger = get_logger(__name__)
 
+FEEDBACK_IO_SECONDS = metrics.histogram(
+    "valetia_feedback_io_seconds", "Durée des lectures et écritures du feedback", labels=("operation",)
+)
+FEEDBACK_ERRORS = metrics.counter("valetia_feedback_errors", "Échecs d'enregistrement d'un feedback")
+
 class FeedbackManager:
     """Gère les feedbacks des utilisateurs sur les réponses du chatbot."""
     
@@ -28,6 +35,10 @@ class FeedbackManager:
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
+        # Base indexée des feedbacks; les anciens fichiers JSON y sont importés
+        self.store = FeedbackStore(self.storage_path / "feedbacks.sqlite3")
+        self.store.migrate_json_files(self.storage_path)
+        
         logger.info(f"FeedbackManager initialisé avec stockage dans {self.storage_path}")
     
     def save_feedback(self, 
@@ -54,7 +65,7 @@ class FeedbackManager:
         try:
             # Créer un identifiant unique pour ce feedback
             timestamp = int(time.time())
-            feedback_id = f"{conversation_id}_{timestamp}"
+            feedback_id = f"{conversation_id}_{timestamp}_{uuid.uuid4().hex[:8]}"
             
             # Préparer les données à enregistrer
             feedback_data = {
@@ -71,16 +82,16 @@ class FeedbackManager:
             if metadata:
                 feedback_data["metadata"] = metadata
             
-            # Enregistrer dans un fichier JSON
-            feedback_file = self.storage_path / f"{feedback_id}.json"
-            with open(feedback_file, "w", encoding="utf-8") as f:
-                json.dump(feedback_data, f, ensure_ascii=False, indent=2)
+            # Enregistrer dans la base indexée
+            with FEEDBACK_IO_SECONDS.time(operation="insert"):
+                self.store.insert(feedback_data)
             
             logger.info(f"Feedback enregistré avec succès: {feedback_id}")
             return True
         
         except Exception as e:
             logger.error(f"Erreur lors de l'enregistrement du feedback: {e}")
+            FEEDBACK_ERRORS.inc()
             return False
     
     def get_feedbacks(self, 
@@ -97,59 +108,83 @@ class FeedbackManager:
             Liste des feedbacks
         """
         try:
-            feedbacks = []
-            
-            # Récupérer tous les fichiers JSON dans le répertoire
-            json_files = list(self.storage_path.glob("*.json"))
-            
-            # Filtrer par conversation_id si spécifié
-            for file_path in json_files[:limit]:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    feedback_data = json.load(f)
-                    
-                    # Filtrer par conversation_id si spécifié
-                    if conversation_id is None or feedback_data.get("conversation_id") == conversation_id:
-                        feedbacks.append(feedback_data)
-            
-            # Trier par timestamp (du plus récent au plus ancien)
-            feedbacks.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-            
-            return feedbacks[:limit]
+            # Requête indexée: filtre par conversation et tri du plus récent au plus ancien
+            with FEEDBACK_IO_SECONDS.time(operation="query"):
+                return self.store.query(conversation_id=conversation_id, limit=limit)
         
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des feedbacks: {e}")
             return []
     
-    def get_stats(self, conversation_id: Optional[str] = None) -> Dict[str, Any]:
+    def get_stats(self,
+                  conversation_id: Optional[str] = None,
+                  domain: Optional[str] = None,
+                  day: Optional[str] = None) -> Dict[str, Any]:
         """
         Calcule des statistiques sur les feedbacks.
         
+        Les compteurs sont maintenus à chaque enregistrement: la lecture est en temps constant
+        quel que soit le nombre de feedbacks. Ils sont agrégés par critère: un seul filtre
+        peut être donné à la fois.
+        
         Args:
             conversation_id: Filtrer par ID de conversation (optionnel)
+            domain: Filtrer par domaine juridique (optionnel)
+            day: Filtrer par jour UTC au format "AAAA-MM-JJ" (optionnel)
             
         Returns:
             Statistiques (taux de satisfaction, nombre de feedbacks, etc.)
+            
+        Raises:
+            ValueError: Si plusieurs filtres sont combinés
         """
-        feedbacks = self.get_feedbacks(conversation_id=conversation_id, limit=1000)
+        filters = [name for name, value in (("conversation_id", conversation_id), ("domain", domain), ("day", day))
+                   if value is not None]
+        if len(filters) > 1:
+            raise ValueError(f"Filtres non combinables: {', '.join(filters)}")
         
-        if not feedbacks:
-            return {
-                "total_count": 0,
-                "helpful_count": 0,
-                "unhelpful_count": 0,
-                "satisfaction_rate": 0
-            }
+        if conversation_id is not None:
+            counts = self.store.get_stats("conversation", conversation_id)
+        elif domain is not None:
+            counts = self.store.get_stats("domain", domain)
+        elif day is not None:
+            counts = self.store.get_stats("day", day)
+        else:
+            counts = self.store.get_stats()
         
-        total_count = len(feedbacks)
-        helpful_count = sum(1 for f in feedbacks if f.get("is_helpful", False))
-        unhelpful_count = total_count - helpful_count
+        return self._format_stats(counts["total_count"], counts["helpful_count"])
+    
+    def get_stats_series(self,
+                         granularity: str = "day",
+                         since: Optional[str] = None,
+                         limit: int = 30) -> List[Dict[str, Any]]:
+        """
+        Retourne l'évolution de la satisfaction par tranche de temps.
         
+        Args:
+            granularity: "day" ou "hour"
+            since: Première tranche incluse ("AAAA-MM-JJ" ou "AAAA-MM-JJTHH", optionnel)
+            limit: Nombre maximal de tranches (les plus récentes)
+            
+        Returns:
+            Liste de statistiques par tranche, de la plus récente à la plus ancienne
+        """
+        series = []
+        for row in self.store.get_rollup(granularity, since=since, limit=limit):
+            stats = self._format_stats(row["total_count"], row["helpful_count"])
+            stats["period"] = row["key"]
+            series.append(stats)
+        return series
+    
+    @staticmethod
+    def _format_stats(total_count: int, helpful_count: int) -> Dict[str, Any]:
+        """Met en forme des compteurs agrégés."""
         satisfaction_rate = (helpful_count / total_count) * 100 if total_count > 0 else 0
         
         return {
             "total_count": total_count,
             "helpful_count": helpful_count,
-            "unhelpful_count": unhelpful_count,
+            "unhelpful_count": total_count - helpful_count,
             "satisfaction_rate": satisfaction_rate
         }
 
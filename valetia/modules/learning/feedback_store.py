@@ -0,0 +1,267 @@
+"""
+Stockage indexé des feedbacks utilisateur (SQLite).
+
+Remplace l'ancien stockage à raison d'un fichier JSON par feedback: les
+requêtes filtrées par conversation et triées du plus récent au plus ancien
+s'appuient sur des index au lieu de parcourir tout le répertoire.
+"""
+
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedbacks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    feedback_id TEXT NOT NULL UNIQUE,
+    conversation_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    user_input TEXT,
+    assistant_response TEXT,
+    is_helpful INTEGER NOT NULL,
+    feedback_text TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_feedbacks_conversation_timestamp
+    ON feedbacks (conversation_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_feedbacks_timestamp
+    ON feedbacks (timestamp DESC);
+CREATE TABLE IF NOT EXISTS feedback_stats (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    total_count INTEGER NOT NULL DEFAULT 0,
+    helpful_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+) WITHOUT ROWID;
+"""
+
+# Agrégats maintenus à chaque écriture: (portée, fonction donnant la clé)
+STATS_SCOPES = {
+    "global": lambda feedback: "all",
+    "conversation": lambda feedback: feedback["conversation_id"],
+    "domain": lambda feedback: (feedback.get("metadata") or {}).get("domain", "général"),
+    "day": lambda feedback: time.strftime("%Y-%m-%d", time.gmtime(int(feedback.get("timestamp", 0)))),
+    "hour": lambda feedback: time.strftime("%Y-%m-%dT%H", time.gmtime(int(feedback.get("timestamp", 0)))),
+}
+
+_COLUMNS = (
+    "feedback_id", "conversation_id", "timestamp", "user_input",
+    "assistant_response", "is_helpful", "feedback_text", "metadata"
+)
+
+
+class FeedbackStore:
+    """Base SQLite des feedbacks, partagée entre les threads de l'application."""
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        Ouvre (ou crée) la base de feedbacks.
+
+        Args:
+            db_path: Chemin du fichier SQLite
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._rebuild_stats_if_missing(self._conn)
+
+    def insert(self, feedback_data: Dict[str, Any]) -> bool:
+        """
+        Ajoute un feedback.
+
+        Args:
+            feedback_data: Données du feedback (format de FeedbackManager.save_feedback)
+
+        Returns:
+            bool: True si le feedback a été ajouté, False s'il existait déjà
+        """
+        with self._lock, self._conn:
+            cursor = self._insert(self._conn, feedback_data)
+        return cursor.rowcount > 0
+
+    def _insert(self, conn: sqlite3.Connection, feedback_data: Dict[str, Any]) -> sqlite3.Cursor:
+        """
+        Insère un feedback dans la transaction courante (ignoré s'il existe déjà).
+
+        Les agrégats sont mis à jour dans la même transaction.
+        """
+        metadata = feedback_data.get("metadata")
+        values = (
+            feedback_data["feedback_id"],
+            feedback_data["conversation_id"],
+            int(feedback_data.get("timestamp", 0)),
+            feedback_data.get("user_input"),
+            feedback_data.get("assistant_response"),
+            1 if feedback_data.get("is_helpful") else 0,
+            feedback_data.get("feedback_text"),
+            json.dumps(metadata, ensure_ascii=False) if metadata is not None else None,
+        )
+        cursor = conn.execute(
+            f"INSERT OR IGNORE INTO feedbacks ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+            values
+        )
+        if cursor.rowcount > 0:
+            self._update_stats(conn, feedback_data)
+        return cursor
+
+    @staticmethod
+    def _update_stats(conn: sqlite3.Connection, feedback_data: Dict[str, Any]) -> None:
+        """Incrémente les agrégats de toutes les portées pour un feedback."""
+        helpful = 1 if feedback_data.get("is_helpful") else 0
+        conn.executemany(
+            "INSERT INTO feedback_stats (scope, key, total_count, helpful_count) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT (scope, key) DO UPDATE SET "
+            "total_count = total_count + 1, helpful_count = helpful_count + excluded.helpful_count",
+            [(scope, str(key_fn(feedback_data)), helpful) for scope, key_fn in STATS_SCOPES.items()]
+        )
+
+    def _rebuild_stats_if_missing(self, conn: sqlite3.Connection) -> None:
+        """Recalcule les agrégats d'une base créée avant leur introduction."""
+        has_stats = conn.execute("SELECT 1 FROM feedback_stats LIMIT 1").fetchone()
+        has_feedbacks = conn.execute("SELECT 1 FROM feedbacks LIMIT 1").fetchone()
+        if has_stats or not has_feedbacks:
+            return
+
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM feedbacks").fetchall()
+        for row in rows:
+            self._update_stats(conn, self._row_to_feedback(row))
+        logger.info(f"Agrégats des feedbacks recalculés ({len(rows)} feedbacks)")
+
+    def get_stats(self, scope: str = "global", key: str = "all") -> Dict[str, int]:
+        """
+        Lit les compteurs agrégés d'une portée.
+
+        Args:
+            scope: Portée des agrégats (global, conversation, domain, day, hour)
+            key: Clé dans la portée (ID de conversation, domaine, "AAAA-MM-JJ", "AAAA-MM-JJTHH")
+
+        Returns:
+            Dictionnaire {"total_count", "helpful_count"}
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_count, helpful_count FROM feedback_stats WHERE scope = ? AND key = ?",
+                (scope, key)
+            ).fetchone()
+        if row is None:
+            return {"total_count": 0, "helpful_count": 0}
+        return {"total_count": row["total_count"], "helpful_count": row["helpful_count"]}
+
+    def get_rollup(self, scope: str, since: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Lit les agrégats d'une portée, par clé décroissante (utile pour les séries day/hour).
+
+        Args:
+            scope: Portée des agrégats
+            since: Clé minimale incluse (par exemple "2025-05-01" pour la portée day)
+            limit: Nombre maximal de clés retournées
+
+        Returns:
+            Liste de {"key", "total_count", "helpful_count"}
+        """
+        sql = "SELECT key, total_count, helpful_count FROM feedback_stats WHERE scope = ?"
+        params: List[Any] = [scope]
+        if since is not None:
+            sql += " AND key >= ?"
+            params.append(since)
+        sql += " ORDER BY key DESC LIMIT ?"
+        params.append(int(limit))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def query(self, conversation_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Récupère les feedbacks du plus récent au plus ancien.
+
+        Args:
+            conversation_id: Filtrer par ID de conversation (optionnel)
+            limit: Nombre maximum de feedbacks à récupérer
+
+        Returns:
+            Liste des feedbacks
+        """
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM feedbacks"
+        params: List[Any] = []
+        if conversation_id is not None:
+            sql += " WHERE conversation_id = ?"
+            params.append(conversation_id)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(int(limit))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_feedback(row) for row in rows]
+
+    @staticmethod
+    def _row_to_feedback(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convertit une ligne SQLite au format historique des feedbacks."""
+        feedback = {
+            "feedback_id": row["feedback_id"],
+            "conversation_id": row["conversation_id"],
+            "timestamp": row["timestamp"],
+            "user_input": row["user_input"],
+            "assistant_response": row["assistant_response"],
+            "is_helpful": bool(row["is_helpful"]),
+            "feedback_text": row["feedback_text"],
+        }
+        if row["metadata"] is not None:
+            feedback["metadata"] = json.loads(row["metadata"])
+        return feedback
+
+    def migrate_json_files(self, directory: Union[str, Path]) -> int:
+        """
+        Importe les feedbacks stockés en fichiers JSON individuels.
+
+        Les fichiers importés sont déplacés dans le sous-répertoire "migrated"
+        pour ne pas être relus au démarrage suivant.
+
+        Args:
+            directory: Répertoire contenant les fichiers <conversation>_<timestamp>.json
+
+        Returns:
+            Nombre de feedbacks importés
+        """
+        directory = Path(directory)
+        json_files = sorted(directory.glob("*.json"))
+        if not json_files:
+            return 0
+
+        archive_dir = directory / "migrated"
+        archive_dir.mkdir(exist_ok=True)
+
+        imported = 0
+        for file_path in json_files:
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    feedback_data = json.load(f)
+                feedback_data.setdefault("feedback_id", file_path.stem)
+                with self._lock, self._conn:
+                    imported += self._insert(self._conn, feedback_data).rowcount
+                file_path.replace(archive_dir / file_path.name)
+            except Exception as e:
+                logger.error(f"Erreur lors de la migration du feedback {file_path.name}: {e}")
+
+        logger.info(f"Migration des feedbacks JSON terminée: {imported}/{len(json_files)} importés")
+        return imported
+
+    def close(self) -> None:
+        """Ferme la connexion à la base."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,248 @@
+"""
+Banc de rejeu hors ligne des questions enregistrées avec leurs feedbacks.
+
+Les questions des feedbacks sont rejouées en parallèle sur une configuration
+de gestionnaire de conversation. Le rapport donne les percentiles de latence,
+les taux de réponses apprises et d'appels distants, et l'accord avec les
+réponses jugées utiles. L'API distante est remplacée par un client local.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StubRemoteClient:
+    """
+    Remplace le client de l'API distante pendant un rejeu.
+
+    Répond avec le format de l'API (liste "content" de blocs texte), sans
+    accès réseau, avec une latence simulée optionnelle.
+    """
+
+    def __init__(self,
+                 answers: Optional[Dict[str, str]] = None,
+                 latency: float = 0.0):
+        """
+        Initialise le client local.
+
+        Args:
+            answers: Réponses connues, par question (optionnel)
+            latency: Latence simulée d'un appel, en secondes
+        """
+        self.answers = answers or {}
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_response(self,
+                     prompt: str,
+                     system_prompt: Optional[str] = None,
+                     max_tokens: int = 800,
+                     temperature: float = 0.7) -> Dict[str, Any]:
+        """Retourne une réponse déterministe au format de l'API distante."""
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        # Le prompt peut être précédé du contexte: la question est en fin de prompt
+        text = next(
+            (answer for question, answer in self.answers.items() if prompt.endswith(question)),
+            f"Réponse simulée de l'API distante pour la question : {prompt[-200:]}"
+        )
+        return {"content": [{"type": "text", "text": text}]}
+
+
+def token_agreement(response: str, reference: str) -> float:
+    """
+    Mesure l'accord entre deux réponses (similarité de Jaccard sur les mots).
+
+    Args:
+        response: Réponse produite pendant le rejeu
+        reference: Réponse jugée utile par l'utilisateur
+
+    Returns:
+        Score entre 0 et 1
+    """
+    response_words = set(response.lower().split())
+    reference_words = set(reference.lower().split())
+    if not response_words or not reference_words:
+        return 0.0
+    return len(response_words & reference_words) / len(response_words | reference_words)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Percentile par interpolation linéaire (0 si aucune valeur)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def load_replay_cases(feedback_manager, limit: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Construit les cas de rejeu à partir des feedbacks enregistrés.
+
+    Args:
+        feedback_manager: Instance de FeedbackManager
+        limit: Nombre maximal de feedbacks (les plus récents)
+
+    Returns:
+        Liste de cas {"conversation_id", "question", "reference", "is_helpful"}
+    """
+    return [
+        {
+            "conversation_id": feedback["conversation_id"],
+            "question": feedback["user_input"],
+            "reference": feedback["assistant_response"],
+            "is_helpful": feedback["is_helpful"],
+        }
+        for feedback in feedback_manager.get_feedbacks(limit=limit)
+        if feedback.get("user_input")
+    ]
+
+
+class ReplayHarness:
+    """Rejoue des questions sur une configuration de gestionnaire et agrège les mesures."""
+
+    def __init__(self,
+                 manager,
+                 remote_client: Optional[StubRemoteClient] = None,
+                 workers: int = 4,
+                 agreement_threshold: float = 0.3,
+                 seed: Optional[int] = 0):
+        """
+        Initialise le banc de rejeu.
+
+        Args:
+            manager: Gestionnaire de conversation (méthode get_response)
+            remote_client: Client local injecté dans le gestionnaire (compte les appels distants)
+            workers: Nombre de questions rejouées en parallèle
+            agreement_threshold: Score minimal pour considérer une réponse en accord
+            seed: Graine des choix aléatoires du gestionnaire (None pour ne pas la fixer)
+        """
+        self.manager = manager
+        self.remote_client = remote_client
+        self.workers = workers
+        self.agreement_threshold = agreement_threshold
+        self.seed = seed
+
+    def _counter(self, name: str) -> int:
+        """Lit un compteur du gestionnaire (0 s'il n'existe pas)."""
+        return getattr(self.manager, name, 0)
+
+    def _replay_case(self, index: int, case: Dict[str, Any]) -> Dict[str, Any]:
+        """Rejoue une question et mesure sa latence."""
+        conversation_id = f"replay_{index}_{case.get('conversation_id', '')}"
+        start = time.perf_counter()
+        try:
+            response = self.manager.get_response(case["question"], conversation_id)
+            error = None
+        except Exception as e:
+            response, error = "", str(e)
+        return {"latency": time.perf_counter() - start, "response": response, "error": error}
+
+    def run(self, cases: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Rejoue les cas et produit le rapport.
+
+        Args:
+            cases: Cas de rejeu (voir load_replay_cases)
+
+        Returns:
+            Rapport de mesures
+        """
+        if self.seed is not None:
+            random.seed(self.seed)
+
+        counters_before = {name: self._counter(name) for name in ("local_responses", "claude_responses", "learned_responses")}
+        remote_before = self.remote_client.calls if self.remote_client else 0
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self._replay_case, range(len(cases)), cases))
+        duration = time.perf_counter() - start
+
+        latencies = [result["latency"] for result in results]
+        errors = sum(1 for result in results if result["error"])
+        total = len(cases)
+
+        scores = [
+            token_agreement(result["response"], case["reference"])
+            for case, result in zip(cases, results)
+            if case.get("is_helpful") and case.get("reference")
+        ]
+
+        counters = {name: self._counter(name) - before for name, before in counters_before.items()}
+        remote_calls = (self.remote_client.calls - remote_before) if self.remote_client else counters["claude_responses"]
+
+        report = {
+            "cases": total,
+            "errors": errors,
+            "duration_s": duration,
+            "throughput_qps": total / duration if duration > 0 else 0.0,
+            "latency_ms": {
+                "p50": percentile(latencies, 50) * 1000,
+                "p90": percentile(latencies, 90) * 1000,
+                "p99": percentile(latencies, 99) * 1000,
+                "max": max(latencies, default=0.0) * 1000,
+            },
+            "local_responses": counters["local_responses"],
+            "learned_example_hit_rate": counters["learned_responses"] / total if total else 0.0,
+            "remote_calls": remote_calls,
+            "remote_call_rate": remote_calls / total if total else 0.0,
+            "helpful_cases": len(scores),
+            "mean_agreement": sum(scores) / len(scores) if scores else 0.0,
+            "agreement_rate": (
+                sum(1 for score in scores if score >= self.agreement_threshold) / len(scores) if scores else 0.0
+            ),
+        }
+
+        embedder = getattr(self.manager, "embedder", None)
+        if embedder is not None:
+            lookups = embedder.cache_hits + embedder.cache_misses
+            report["embedding_cache_hit_rate"] = embedder.cache_hits / lookups if lookups else 0.0
+
+        logger.info(
+            f"Rejeu terminé: {total} questions, p50 {report['latency_ms']['p50']:.1f} ms, "
+            f"{remote_calls} appels distants, accord {report['agreement_rate'] * 100:.1f}%"
+        )
+        return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Met en forme un rapport de rejeu.
+
+    Args:
+        report: Rapport produit par ReplayHarness.run
+
+    Returns:
+        Rapport formaté
+    """
+    latency = report["latency_ms"]
+    lines = [
+        "=== RAPPORT DE REJEU ===",
+        f"Questions rejouées: {report['cases']} ({report['errors']} erreurs) en {report['duration_s']:.2f}s "
+        f"({report['throughput_qps']:.1f} q/s)",
+        f"Latence (ms): p50 {latency['p50']:.1f} | p90 {latency['p90']:.1f} | "
+        f"p99 {latency['p99']:.1f} | max {latency['max']:.1f}",
+        f"Réponses locales: {report['local_responses']} | "
+        f"réponses apprises: {report['learned_example_hit_rate'] * 100:.1f}%",
+        f"Appels distants: {report['remote_calls']} ({report['remote_call_rate'] * 100:.1f}%)",
+        f"Accord avec les réponses utiles: {report['agreement_rate'] * 100:.1f}% "
+        f"(score moyen {report['mean_agreement']:.2f} sur {report['helpful_cases']} cas)",
+    ]
+    if "embedding_cache_hit_rate" in report:
+        lines.append(f"Cache d'embeddings: {report['embedding_cache_hit_rate'] * 100:.1f}% de succès")
+    return "\n".join(lines)
@@ -0,0 +1,278 @@
+"""
+Reconnaissance vocale locale (Whisper quantifié via faster-whisper).
+
+Le modèle est chargé une seule fois, au premier usage, et partagé par tous
+les appels. Un fichier est transcrit segment par segment (transcriptions
+partielles au fil de l'eau); un flux audio est découpé en énoncés par une
+détection d'activité vocale sur l'énergie des trames, avec des
+transcriptions partielles pendant que l'utilisateur parle.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from valetia.config.settings import (
+    ASR_BEAM_SIZE,
+    ASR_COMPUTE_TYPE,
+    ASR_LANGUAGE,
+    ASR_MODEL,
+    ASR_SAMPLE_RATE
+)
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+AudioChunk = Union[bytes, np.ndarray]
+
+
+def to_float32(chunk: AudioChunk) -> np.ndarray:
+    """
+    Convertit un bloc audio en échantillons float32 dans [-1, 1].
+
+    Args:
+        chunk: PCM 16 bits mono (bytes) ou tableau d'échantillons
+
+    Returns:
+        Tableau float32 mono
+    """
+    if isinstance(chunk, (bytes, bytearray, memoryview)):
+        return np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0
+    samples = np.asarray(chunk)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+class EnergyVAD:
+    """Détection d'activité vocale par énergie (RMS) des trames."""
+
+    def __init__(self,
+                 sample_rate: int = ASR_SAMPLE_RATE,
+                 frame_ms: int = 30,
+                 threshold: float = 0.01,
+                 min_speech_ratio: float = 0.2):
+        """
+        Initialise le détecteur.
+
+        Args:
+            sample_rate: Fréquence d'échantillonnage
+            frame_ms: Durée d'une trame d'analyse, en millisecondes
+            threshold: Énergie RMS minimale d'une trame de parole
+            min_speech_ratio: Part minimale de trames de parole pour qu'un bloc soit considéré comme parlé
+        """
+        self.frame_size = max(int(sample_rate * frame_ms / 1000), 1)
+        self.threshold = threshold
+        self.min_speech_ratio = min_speech_ratio
+
+    def speech_ratio(self, samples: np.ndarray) -> float:
+        """Part des trames d'un bloc dont l'énergie dépasse le seuil."""
+        frames = len(samples) // self.frame_size
+        if frames == 0:
+            return 0.0
+        framed = samples[:frames * self.frame_size].reshape(frames, self.frame_size)
+        rms = np.sqrt(np.mean(framed * framed, axis=1))
+        return float(np.mean(rms > self.threshold))
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        """Indique si un bloc contient de la parole."""
+        return self.speech_ratio(samples) >= self.min_speech_ratio
+
+
+class SpeechRecognizer:
+    """Transcription locale sur CPU avec un modèle Whisper quantifié."""
+
+    def __init__(self,
+                 model_name: str = ASR_MODEL,
+                 device: str = "cpu",
+                 compute_type: str = ASR_COMPUTE_TYPE,
+                 language: str = ASR_LANGUAGE,
+                 beam_size: int = ASR_BEAM_SIZE,
+                 sample_rate: int = ASR_SAMPLE_RATE,
+                 cpu_threads: int = 0):
+        """
+        Initialise le moteur de reconnaissance (le modèle est chargé au premier usage).
+
+        Args:
+            model_name: Modèle Whisper ("small", "whisper-small", ou chemin d'un modèle converti)
+            device: Périphérique d'inférence ("cpu" ou "cuda")
+            compute_type: Quantification des poids ("int8" recommandé sur CPU)
+            language: Langue des transcriptions
+            beam_size: Largeur du faisceau (1 = décodage glouton, le plus rapide)
+            sample_rate: Fréquence d'échantillonnage attendue par le modèle
+            cpu_threads: Nombre de threads CPU (0 = valeur par défaut du runtime)
+        """
+        # "whisper-small" (nom historique de la configuration) -> "small"
+        self.model_name = model_name[len("whisper-"):] if model_name.startswith("whisper-") else model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.language = language
+        self.beam_size = beam_size
+        self.sample_rate = sample_rate
+        self.cpu_threads = cpu_threads
+
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        """Charge le modèle une seule fois (thread-safe)."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from faster_whisper import WhisperModel
+
+                    logger.info(f"Chargement du modèle de reconnaissance vocale {self.model_name} ({self.compute_type})")
+                    self._model = WhisperModel(
+                        self.model_name,
+                        device=self.device,
+                        compute_type=self.compute_type,
+                        cpu_threads=self.cpu_threads
+                    )
+        return self._model
+
+    def load_audio(self, audio_path: str) -> np.ndarray:
+        """
+        Décode un fichier audio en échantillons mono à la fréquence du modèle.
+
+        Args:
+            audio_path: Chemin vers le fichier audio
+
+        Returns:
+            Tableau float32
+        """
+        from faster_whisper import decode_audio
+
+        return decode_audio(audio_path, sampling_rate=self.sample_rate)
+
+    def transcribe_array(self, samples: np.ndarray, initial_prompt: Optional[str] = None) -> str:
+        """
+        Transcrit un énoncé déjà en mémoire.
+
+        Args:
+            samples: Échantillons float32 mono
+            initial_prompt: Texte précédent, pour la continuité de la transcription (optionnel)
+
+        Returns:
+            Le texte reconnu
+        """
+        segments, _ = self._get_model().transcribe(
+            samples,
+            language=self.language,
+            beam_size=self.beam_size,
+            condition_on_previous_text=False,
+            initial_prompt=initial_prompt
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def transcribe_stream(self, audio_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Transcrit un fichier segment par segment.
+
+        Les silences sont écartés par le filtre VAD du runtime; chaque segment
+        décodé produit une transcription partielle.
+
+        Args:
+            audio_path: Chemin vers le fichier audio
+
+        Yields:
+            Dictionnaires {"text": transcription cumulée, "segment": dernier segment,
+            "start", "end" (secondes), "final": bool}
+        """
+        segments, _ = self._get_model().transcribe(
+            audio_path,
+            language=self.language,
+            beam_size=self.beam_size,
+            vad_filter=True
+        )
+
+        parts: List[str] = []
+        end = 0.0
+        # Le runtime décode à la demande: chaque itération produit le segment suivant
+        for segment in segments:
+            text = segment.text.strip()
+            if not text:
+                continue
+            parts.append(text)
+            end = segment.end
+            yield {"text": " ".join(parts), "segment": text, "start": segment.start, "end": end, "final": False}
+
+        yield {"text": " ".join(parts), "segment": "", "start": end, "end": end, "final": True}
+
+    def transcribe(self, audio_path: str) -> str:
+        """
+        Transcrit un fichier audio complet.
+
+        Args:
+            audio_path: Chemin vers le fichier audio
+
+        Returns:
+            Le texte reconnu
+        """
+        result = {"text": ""}
+        for result in self.transcribe_stream(audio_path):
+            pass
+        return result["text"]
+
+    def transcribe_chunks(self,
+                          chunks: Iterable[AudioChunk],
+                          vad: Optional[EnergyVAD] = None,
+                          min_silence: float = 0.6,
+                          partial_interval: float = 1.0,
+                          max_utterance: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """
+        Transcrit un flux audio (micro, WebSocket...) arrivant par blocs.
+
+        Les blocs silencieux avant un énoncé sont ignorés. Pendant un énoncé,
+        une transcription partielle est produite toutes les partial_interval
+        secondes de parole; l'énoncé est validé après min_silence secondes de
+        silence (ou au-delà de max_utterance secondes).
+
+        Args:
+            chunks: Blocs audio mono à la fréquence du modèle (PCM 16 bits ou float32)
+            vad: Détecteur d'activité vocale (par défaut EnergyVAD)
+            min_silence: Silence marquant la fin d'un énoncé, en secondes
+            partial_interval: Intervalle entre deux transcriptions partielles, en secondes de parole
+            max_utterance: Durée maximale d'un énoncé avant validation forcée, en secondes
+
+        Yields:
+            Dictionnaires {"text": transcription cumulée, "utterance_end": bool, "final": bool}
+        """
+        vad = vad or EnergyVAD(sample_rate=self.sample_rate)
+        min_silence_samples = int(min_silence * self.sample_rate)
+        partial_samples = int(partial_interval * self.sample_rate)
+        max_samples = int(max_utterance * self.sample_rate)
+
+        committed: List[str] = []
+        buffer: List[np.ndarray] = []
+        buffered = silence = since_partial = 0
+
+        def commit() -> None:
+            text = self.transcribe_array(np.concatenate(buffer), initial_prompt=" ".join(committed[-2:]) or None)
+            if text:
+                committed.append(text)
+
+        for chunk in chunks:
+            samples = to_float32(chunk)
+            if vad.is_speech(samples):
+                silence = 0
+                since_partial += len(samples)
+            elif buffer:
+                silence += len(samples)
+            else:
+                continue
+            buffer.append(samples)
+            buffered += len(samples)
+
+            if silence >= min_silence_samples or buffered >= max_samples:
+                commit()
+                buffer, buffered, silence, since_partial = [], 0, 0, 0
+                yield {"text": " ".join(committed), "utterance_end": True, "final": False}
+            elif since_partial >= partial_samples and silence == 0:
+                since_partial = 0
+                partial = self.transcribe_array(np.concatenate(buffer), initial_prompt=" ".join(committed[-2:]) or None)
+                yield {"text": " ".join(committed + [partial]).strip(), "utterance_end": False, "final": False}
+
+        if buffer:
+            commit()
+        yield {"text": " ".join(committed), "utterance_end": True, "final": True}
@@ -0,0 +1,214 @@
+"""
+Mode vocal en pipeline: transcription au fil de la parole, réponse et synthèse en chevauchement.
+
+Les transcriptions partielles sont transmises au fil de la reconnaissance;
+dès que la question est complète, la réponse est générée en flux (si le
+gestionnaire de conversation le permet) et chaque phrase terminée part en
+synthèse pendant que la suivante est générée. Seules la réponse et la
+synthèse se chevauchent: la réponse ne commence qu'avec la transcription
+finale, après la fin de la reconnaissance.
+"""
+
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from valetia.modules.speech.tts import split_sentences
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SENTENCE_BOUNDARY = re.compile(r"[.!?…:;](?=\s)|\n")
+
+# Fin des flux échangés entre les étapes
+_END = object()
+
+
+class IncrementalSentenceSplitter:
+    """Découpe en phrases un texte reçu par fragments."""
+
+    def __init__(self, min_chars: int = 20):
+        """
+        Initialise le découpeur.
+
+        Args:
+            min_chars: Longueur minimale d'une phrase émise (les plus courtes sont regroupées)
+        """
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Ajoute un fragment et retourne les phrases complètes.
+
+        Args:
+            text: Fragment de texte
+
+        Returns:
+            Phrases terminées depuis le dernier appel
+        """
+        self._buffer += text
+        boundaries = [match.end() for match in _SENTENCE_BOUNDARY.finditer(self._buffer)]
+        if not boundaries or len(self._buffer[:boundaries[-1]].strip()) < self.min_chars:
+            return []
+
+        complete, self._buffer = self._buffer[:boundaries[-1]], self._buffer[boundaries[-1]:]
+        return split_sentences(complete, min_chars=self.min_chars)
+
+    def flush(self) -> List[str]:
+        """Retourne le texte restant comme dernières phrases."""
+        remaining, self._buffer = self._buffer, ""
+        return split_sentences(remaining, min_chars=self.min_chars)
+
+
+class VoicePipeline:
+    """Enchaîne reconnaissance vocale, réponse du chatbot et synthèse vocale en flux."""
+
+    def __init__(self, speech_processor, manager):
+        """
+        Initialise le pipeline.
+
+        Args:
+            speech_processor: Processeur vocal (recognizer et synthesizer)
+            manager: Gestionnaire de conversation (stream_response si disponible, sinon get_response)
+        """
+        self.speech_processor = speech_processor
+        self.manager = manager
+
+    def run(self,
+            audio_path: Optional[str] = None,
+            chunks: Optional[Iterable[Any]] = None,
+            conversation_id: str = "voice",
+            context: Optional[List[Dict[str, str]]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Traite une commande vocale de bout en bout.
+
+        Args:
+            audio_path: Fichier audio de la commande
+            chunks: Flux audio par blocs (alternative à audio_path)
+            conversation_id: Identifiant de la conversation
+            context: Contexte optionnel (métadonnées sur le dossier)
+
+        Yields:
+            Événements dans l'ordre de disponibilité:
+            {"type": "partial", "text"} pendant la reconnaissance,
+            {"type": "transcript", "text"} quand la question est complète,
+            {"type": "audio", "sentence", "audio_path", "cached"} pour chaque phrase synthétisée,
+            {"type": "done", "transcript", "response", "audio_paths", "latency"} en fin de traitement
+        """
+        if (audio_path is None) == (chunks is None):
+            raise ValueError("Indiquer soit audio_path, soit chunks")
+
+        start = time.perf_counter()
+        latency: Dict[str, Optional[float]] = {
+            "asr_first_partial": None,
+            "asr": None,
+            "answer_first_token": None,
+            "answer": None,
+            "tts_first_audio": None,
+            "tts_busy": 0.0,
+            "total": None,
+        }
+
+        # 1. Reconnaissance: transcriptions partielles au fil de l'audio
+        recognizer = self.speech_processor.recognizer
+        partials = recognizer.transcribe_stream(audio_path) if audio_path is not None else recognizer.transcribe_chunks(chunks)
+        transcript = ""
+        for partial in partials:
+            if latency["asr_first_partial"] is None:
+                latency["asr_first_partial"] = time.perf_counter() - start
+            transcript = partial["text"]
+            if not partial["final"]:
+                yield {"type": "partial", "text": transcript}
+        latency["asr"] = time.perf_counter() - start
+        yield {"type": "transcript", "text": transcript}
+
+        if not transcript:
+            latency["total"] = time.perf_counter() - start
+            yield {"type": "done", "transcript": "", "response": "", "audio_paths": [], "latency": latency}
+            return
+
+        # 2 et 3. Réponse en flux et synthèse phrase par phrase, dans deux threads
+        sentences: "queue.Queue[Any]" = queue.Queue()
+        events: "queue.Queue[Any]" = queue.Queue()
+        response_parts: List[str] = []
+
+        def answer() -> None:
+            splitter = IncrementalSentenceSplitter()
+            try:
+                for piece in self._answer_stream(transcript, conversation_id, context):
+                    if latency["answer_first_token"] is None:
+                        latency["answer_first_token"] = time.perf_counter() - start
+                    response_parts.append(piece)
+                    for sentence in splitter.feed(piece):
+                        sentences.put(sentence)
+                for sentence in splitter.flush():
+                    sentences.put(sentence)
+            except Exception as e:
+                logger.error(f"Erreur lors de la génération de la réponse vocale: {e}")
+            finally:
+                latency["answer"] = time.perf_counter() - start
+                sentences.put(_END)
+
+        def synthesize() -> None:
+            synthesizer = self.speech_processor.synthesizer
+            while True:
+                sentence = sentences.get()
+                if sentence is _END:
+                    break
+                try:
+                    result = synthesizer.synthesize_sentence(sentence)
+                except Exception as e:
+                    logger.error(f"Erreur lors de la synthèse vocale d'une phrase: {e}")
+                    continue
+                latency["tts_busy"] += result["latency"]
+                if latency["tts_first_audio"] is None:
+                    latency["tts_first_audio"] = time.perf_counter() - start
+                events.put(result)
+            events.put(_END)
+
+        threads = [
+            threading.Thread(target=answer, name="valetia-voice-answer", daemon=True),
+            threading.Thread(target=synthesize, name="valetia-voice-tts", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        audio_paths: List[str] = []
+        while True:
+            result = events.get()
+            if result is _END:
+                break
+            audio_paths.append(result["audio_path"])
+            yield dict(result, type="audio")
+
+        for thread in threads:
+            thread.join()
+
+        latency["total"] = time.perf_counter() - start
+        response = "".join(response_parts).strip()
+        logger.info(
+            f"Commande vocale traitée en {latency['total']:.2f}s "
+            f"(reconnaissance {latency['asr']:.2f}s, réponse {latency['answer']:.2f}s, "
+            f"synthèse {latency['tts_busy']:.2f}s)"
+        )
+        yield {
+            "type": "done",
+            "transcript": transcript,
+            "response": response,
+            "audio_paths": audio_paths,
+            "latency": latency,
+        }
+
+    def _answer_stream(self,
+                       question: str,
+                       conversation_id: str,
+                       context: Optional[List[Dict[str, str]]]) -> Iterator[str]:
+        """Réponse du gestionnaire, en flux si possible, sinon d'un bloc."""
+        stream_response = getattr(self.manager, "stream_response", None)
+        if stream_response is not None:
+            yield from stream_response(question, conversation_id, context=context)
+        else:
+            yield self.manager.get_response(question, conversation_id, context=context)
@@ -0,0 +1,361 @@
+"""
+Synthèse vocale locale, phrase par phrase, avec cache audio.
+
+Le texte est découpé en phrases synthétisées l'une après l'autre: la lecture
+peut commencer dès la première phrase. Chaque phrase est mise en cache sous
+l'empreinte de son texte et de la voix (les avertissements juridiques et
+réponses fréquentes ne sont synthétisés qu'une fois); le cache est purgé par
+âge et par taille. Le moteur par défaut est Piper (voix ONNX sur CPU).
+"""
+
+import hashlib
+import os
+from pathlib import Path
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+import uuid
+import wave
+
+from valetia.config.settings import (
+    AUDIO_CACHE_DIR,
+    AUDIO_CACHE_MAX_AGE,
+    AUDIO_CACHE_MAX_BYTES,
+    TTS_MODELS_DIR,
+    TTS_VOICE
+)
+from valetia.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…:;])\s+|\n+")
+_CLAUSE_END = re.compile(r"(?<=[,)])\s+")
+
+
+def split_sentences(text: str, max_chars: int = 300, min_chars: int = 20) -> List[str]:
+    """
+    Découpe un texte en phrases à synthétiser.
+
+    Les fragments trop courts sont regroupés avec le suivant; les phrases trop
+    longues sont coupées aux virgules, puis aux espaces.
+
+    Args:
+        text: Texte à découper
+        max_chars: Longueur maximale d'un fragment
+        min_chars: Longueur minimale d'un fragment (hors dernier)
+
+    Returns:
+        Liste des fragments, dans l'ordre du texte
+    """
+    sentences: List[str] = []
+    pending = ""
+    for sentence in _SENTENCE_END.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        pending = f"{pending} {sentence}".strip()
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        sentences.append(pending)
+
+    fragments: List[str] = []
+    for sentence in sentences:
+        while len(sentence) > max_chars:
+            cut = max((m.end() for m in _CLAUSE_END.finditer(sentence, 0, max_chars)), default=0)
+            if cut <= 0:
+                cut = sentence.rfind(" ", 0, max_chars) + 1 or max_chars
+            fragments.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            fragments.append(sentence)
+    return fragments
+
+
+class AudioCache:
+    """
+    Cache de fichiers audio adressé par contenu.
+
+    Les lectures rafraîchissent la date de modification des fichiers: la
+    purge par taille supprime donc les fichiers les moins récemment utilisés.
+    """
+
+    def __init__(self,
+                 directory: Union[str, Path] = AUDIO_CACHE_DIR,
+                 max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+                 max_age: float = AUDIO_CACHE_MAX_AGE,
+                 cleanup_every: int = 50):
+        """
+        Initialise le cache et purge les fichiers expirés.
+
+        Args:
+            directory: Répertoire du cache
+            max_bytes: Taille totale maximale du cache, en octets
+            max_age: Âge maximal d'un fichier non utilisé, en secondes
+            cleanup_every: Nombre d'ajouts entre deux purges
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.cleanup_every = cleanup_every
+
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        self.cleanup()
+
+    @staticmethod
+    def make_key(text: str, voice: str) -> str:
+        """Empreinte d'un texte pour une voix donnée."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{voice}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        """Chemin du fichier audio d'une clé."""
+        return self.directory / f"{key}.wav"
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        Récupère un fichier en cache.
+
+        Args:
+            key: Clé du fichier (voir make_key)
+
+        Returns:
+            Le chemin du fichier, ou None s'il n'est pas en cache
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key: str, source: Union[str, Path]) -> Path:
+        """
+        Place un fichier dans le cache (déplacement atomique).
+
+        Args:
+            key: Clé du fichier
+            source: Fichier audio à déplacer dans le cache
+
+        Returns:
+            Le chemin du fichier en cache
+        """
+        path = self.path_for(key)
+        os.replace(source, path)
+
+        with self._lock:
+            self._puts += 1
+            due = self._puts % self.cleanup_every == 0
+        if due:
+            self.cleanup()
+        return path
+
+    def cleanup(self) -> int:
+        """
+        Supprime les fichiers expirés, puis les moins récemment utilisés au-delà de la taille maximale.
+
+        Returns:
+            Nombre de fichiers supprimés
+        """
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.wav"):
+            if path.name.startswith("."):
+                # Fichier temporaire d'une synthèse en cours
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                removed += 1
+                total -= size
+            except FileNotFoundError:
+                continue
+
+        if removed:
+            logger.info(f"Cache audio purgé: {removed} fichiers supprimés")
+        return removed
+
+
+class SpeechSynthesizer:
+    """Synthèse vocale phrase par phrase avec cache."""
+
+    def __init__(self,
+                 voice: str = TTS_VOICE,
+                 cache: Optional[AudioCache] = None,
+                 backend: Optional[Callable[[str, str], None]] = None,
+                 models_dir: Union[str, Path] = TTS_MODELS_DIR):
+        """
+        Initialise le synthétiseur (la voix est chargée au premier usage).
+
+        Args:
+            voice: Nom de la voix Piper (fichier <voice>.onnx dans models_dir) ou chemin du modèle
+            cache: Cache audio (par défaut, cache partagé dans data/audio/cache)
+            backend: Fonction (texte, chemin WAV) remplaçant Piper (optionnel)
+            models_dir: Répertoire des voix Piper
+        """
+        self.voice = voice
+        self.cache = cache or AudioCache()
+        self.models_dir = Path(models_dir)
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    def _get_backend(self) -> Callable[[str, str], None]:
+        """Charge la voix Piper une seule fois (thread-safe)."""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    from piper.voice import PiperVoice
+
+                    model_path = Path(self.voice)
+                    if not model_path.suffix:
+                        model_path = self.models_dir / f"{self.voice}.onnx"
+                    logger.info(f"Chargement de la voix de synthèse {model_path}")
+                    piper_voice = PiperVoice.load(str(model_path))
+
+                    def synthesize(text: str, wav_path: str) -> None:
+                        with wave.open(wav_path, "wb") as wav_file:
+                            # synthesize_wav depuis piper-tts 1.3, synthesize auparavant
+                            if hasattr(piper_voice, "synthesize_wav"):
+                                piper_voice.synthesize_wav(text, wav_file)
+                            else:
+                                piper_voice.synthesize(text, wav_file)
+
+                    self._backend = synthesize
+        return self._backend
+
+    def synthesize_sentence(self, sentence: str) -> Dict[str, Any]:
+        """
+        Synthétise une phrase, ou la récupère dans le cache.
+
+        Args:
+            sentence: Phrase à synthétiser
+
+        Returns:
+            Dictionnaire {"sentence", "audio_path", "cached", "latency"}
+        """
+        start = time.perf_counter()
+        key = AudioCache.make_key(sentence, self.voice)
+        path = self.cache.get(key)
+        cached = path is not None
+
+        if not cached:
+            # Fichier temporaire unique: deux synthèses simultanées ne s'écrasent pas
+            fd, tmp_path = tempfile.mkstemp(suffix=".wav", dir=self.cache.directory, prefix=".tmp_")
+            os.close(fd)
+            try:
+                self._get_backend()(sentence, tmp_path)
+                path = self.cache.put(key, tmp_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+        return {
+            "sentence": sentence,
+            "audio_path": str(path),
+            "cached": cached,
+            "latency": time.perf_counter() - start,
+        }
+
+    def stream(self, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Synthétise un texte phrase par phrase.
+
+        Args:
+            text: Texte à synthétiser
+
+        Yields:
+            Un résultat par phrase (voir synthesize_sentence), dans l'ordre du texte
+        """
+        for sentence in split_sentences(text):
+            yield self.synthesize_sentence(sentence)
+
+    def combine(self, parts: List[str]) -> str:
+        """
+        Assemble des phrases synthétisées en un fichier du cache audio.
+
+        Le fichier est adressé par les phrases qui le composent: une réponse
+        déjà assemblée est réutilisée, et les réponses sont purgées avec le
+        reste du cache (par âge et par taille).
+
+        Args:
+            parts: Fichiers des phrases, issus du cache (voir synthesize_sentence)
+
+        Returns:
+            Le chemin du fichier assemblé
+        """
+        key = hashlib.sha256("\0".join(Path(part).stem for part in parts).encode("utf-8")).hexdigest()
+        path = self.cache.get(key)
+        if path is None:
+            fd, tmp_path = tempfile.mkstemp(suffix=".wav", dir=self.cache.directory, prefix=".tmp_")
+            os.close(fd)
+            try:
+                concatenate_wav(parts, tmp_path)
+                path = self.cache.put(key, tmp_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        return str(path)
+
+    def synthesize(self, text: str, output_path: Union[str, Path]) -> str:
+        """
+        Synthétise un texte complet dans un seul fichier WAV.
+
+        Args:
+            text: Texte à synthétiser
+            output_path: Chemin du fichier de sortie
+
+        Returns:
+            Le chemin du fichier généré
+        """
+        parts = [result["audio_path"] for result in self.stream(text)]
+        concatenate_wav(parts, output_path)
+        return str(output_path)
+
+
+def concatenate_wav(parts: List[str], output_path: Union[str, Path]) -> None:
+    """
+    Concatène des fichiers WAV de même format.
+
+    Args:
+        parts: Fichiers à concaténer, dans l'ordre
+        output_path: Fichier de sortie (écrit de façon atomique)
+    """
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex[:8]}")
+    with wave.open(str(tmp_path), "wb") as output:
+        params_set = False
+        for part in parts:
+            with wave.open(part, "rb") as source:
+                if not params_set:
+                    output.setparams(source.getparams())
+                    params_set = True
+                output.writeframes(source.readframes(source.getnframes()))
+        if not params_set:
+            # Texte vide: fichier silencieux mono 16 bits
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(22050)
+    os.replace(tmp_path, output_path)
@@ -1,42 +1,67 @@
 """
 Module pour la reconnaissance et la synthèse vocale.
-Ce module est préparé pour une future implémentation complète.
+La reconnaissance s'appuie sur un modèle Whisper local (voir asr.py), la
+synthèse sur une voix Piper locale avec cache audio (voir tts.py).
 """
 
-from typing import Optional, Tuple
+from typing import Any, Dict, Iterator, Optional, Tuple
 import os
 import time
 from pathlib import Path
+import uuid
 
+from valetia.modules.speech.asr import SpeechRecognizer
+from valetia.modules.speech.pipeline import VoicePipeline
+from valetia.modules.speech.tts import SpeechSynthesizer
 from valetia.utils.logger import get_logger
+from valetia.utils.metrics import metrics
 
 logger = get_logger(__name__)
 
+SPEECH_SECONDS = metrics.histogram(
+    "valetia_speech_seconds", "Durée des étapes vocales (reconnaissance, synthèse, commande complète)", labels=("step",)
+)
+
 class SpeechProcessor:
     """
     Classe pour gérer la reconnaissance et la synthèse vocale.
-    Actuellement en préparation pour une future implémentation.
+    Les modèles sont chargés au premier usage puis partagés.
     """
     
     def __init__(self, 
                 speech_recognition_model: str = "whisper-small",
-                text_to_speech_model: str = "tts-french"):
+                text_to_speech_model: Optional[str] = None):
         """
         Initialise le processeur vocal.
         
         Args:
             speech_recognition_model: Modèle de reconnaissance vocale à utiliser
-            text_to_speech_model: Modèle de synthèse vocale à utiliser
+            text_to_speech_model: Voix de synthèse à utiliser (par défaut TTS_VOICE)
         """
         self.speech_recognition_model = speech_recognition_model
         self.text_to_speech_model = text_to_speech_model
         self.audio_folder = Path("data/audio")
         self.audio_folder.mkdir(parents=True, exist_ok=True)
         
-        logger.info(f"Initialisation du SpeechProcessor (préparation)")
-        logger.info(f"Dossier audio configuré: {self.audio_folder}")
+        # Les modèles sont chargés au premier usage puis partagés
+        self.recognizer = SpeechRecognizer(model_name=speech_recognition_model)
+        self.synthesizer = SpeechSynthesizer(voice=text_to_speech_model) if text_to_speech_model else SpeechSynthesizer()
         
-        # TODO: Charger les modèles de reconnaissance et synthèse vocale
+        self._remove_old_responses()
+        
+        logger.info(f"Initialisation du SpeechProcessor (reconnaissance: {speech_recognition_model}, "
+                    f"synthèse: {self.synthesizer.voice})")
+        logger.info(f"Dossier audio configuré: {self.audio_folder}")
+    
+    def _remove_old_responses(self) -> None:
+        """Supprime les réponses écrites hors du cache audio par les versions précédentes, une fois expirées."""
+        now = time.time()
+        for path in self.audio_folder.glob("response_*.wav"):
+            try:
+                if now - path.stat().st_mtime > self.synthesizer.cache.max_age:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
     
     def recognize_speech(self, audio_path: str) -> str:
         """
@@ -46,11 +71,32 @@ class SpeechProcessor:
             audio_path: Chemin vers le fichier audio
             
         Returns:
-            Le texte reconnu
+            Le texte reconnu (vide en cas d'erreur)
+        """
+        logger.info(f"Reconnaissance vocale pour: {audio_path}")
+        try:
+            with SPEECH_SECONDS.time(step="asr"):
+                return self.recognizer.transcribe(audio_path)
+        except Exception as e:
+            logger.error(f"Erreur lors de la reconnaissance vocale: {e}")
+            return ""
+    
+    def recognize_speech_stream(self, audio_path: str) -> Iterator[Dict[str, Any]]:
         """
-        # Actuellement un placeholder pour la future implémentation
-        logger.info(f"Reconnaissance vocale (simulation) pour: {audio_path}")
-        return "Ceci est une simulation de reconnaissance vocale. Fonctionnalité à venir."
+        Reconnaît la parole dans un fichier audio avec des transcriptions partielles.
+        
+        Args:
+            audio_path: Chemin vers le fichier audio
+            
+        Yields:
+            Transcriptions partielles {"text", "segment", "start", "end", "final"}
+        """
+        logger.info(f"Reconnaissance vocale (flux) pour: {audio_path}")
+        try:
+            yield from self.recognizer.transcribe_stream(audio_path)
+        except Exception as e:
+            logger.error(f"Erreur lors de la reconnaissance vocale: {e}")
+            yield {"text": "", "segment": "", "start": 0.0, "end": 0.0, "final": True}
     
     def text_to_speech(self, text: str, output_path: Optional[str] = None) -> str:
         """
@@ -58,46 +104,91 @@ class SpeechProcessor:
         
         Args:
             text: Texte à convertir
-            output_path: Chemin de sortie pour le fichier audio (optionnel)
+            output_path: Chemin de sortie pour le fichier audio (par défaut un fichier
+                du cache audio, purgé avec lui)
             
         Returns:
             Le chemin vers le fichier audio généré
         """
-        # Actuellement un placeholder pour la future implémentation
-        timestamp = int(time.time())
-        if output_path is None:
-            output_path = str(self.audio_folder / f"response_{timestamp}.mp3")
+        with SPEECH_SECONDS.time(step="tts"):
+            if output_path is None:
+                parts = [result["audio_path"] for result in self.synthesizer.stream(text)]
+                output_path = self.synthesizer.combine(parts)
+            else:
+                self.synthesizer.synthesize(text, output_path)
         
-        logger.info(f"Synthèse vocale (simulation) vers: {output_path}")
+        logger.info(f"Synthèse vocale vers: {output_path}")
+        return output_path
+    
+    def text_to_speech_stream(self, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Convertit du texte en parole phrase par phrase.
         
-        # Simuler la création d'un fichier audio
-        with open(output_path, "w") as f:
-            f.write("# Fichier audio simulé\n")
-            f.write(f"# Texte: {text}\n")
-            f.write(f"# Timestamp: {timestamp}\n")
+        La lecture peut commencer dès la première phrase; les phrases déjà
+        synthétisées sont lues depuis le cache audio.
         
-        return output_path
+        Args:
+            text: Texte à convertir
+            
+        Yields:
+            Un résultat par phrase {"sentence", "audio_path", "cached", "latency"}
+        """
+        yield from self.synthesizer.stream(text)
     
-    def process_voice_command(self, audio_path: str) -> Tuple[str, str]:
+    def process_voice_command(self, 
+                              audio_path: str, 
+                              conversation_id: Optional[str] = None, 
+                              manager=None) -> Tuple[str, str]:
         """
         Traite une commande vocale complète.
         
         Args:
             audio_path: Chemin vers le fichier audio de la commande
+            conversation_id: Identifiant de la conversation (optionnel)
+            manager: Gestionnaire de conversation (par défaut le gestionnaire hybride)
             
         Returns:
             Tuple contenant (texte reconnu, chemin vers la réponse audio)
         """
-        # Reconnaître la parole
-        recognized_text = self.recognize_speech(audio_path)
+        result = {"transcript": "", "audio_paths": []}
+        for event in self.process_voice_command_stream(audio_path, conversation_id, manager):
+            if event["type"] == "done":
+                result = event
         
-        # TODO: Traiter la commande reconnue
-        response_text = f"J'ai compris: '{recognized_text}'. Fonctionnalité à venir."
+        if not result["transcript"]:
+            return "", ""
         
-        # Convertir la réponse en parole
-        response_audio = self.text_to_speech(response_text)
+        # Assembler les phrases synthétisées en un seul fichier (dans le cache audio)
+        return result["transcript"], self.synthesizer.combine(result["audio_paths"])
+    
+    def process_voice_command_stream(self, 
+                                     audio_path: str, 
+                                     conversation_id: Optional[str] = None, 
+                                     manager=None) -> Iterator[Dict[str, Any]]:
+        """
+        Traite une commande vocale en pipeline (reconnaissance, réponse et synthèse se chevauchent).
+        
+        Args:
+            audio_path: Chemin vers le fichier audio de la commande
+            conversation_id: Identifiant de la conversation (optionnel)
+            manager: Gestionnaire de conversation (par défaut le gestionnaire hybride)
+            
+        Yields:
+            Événements du pipeline (voir VoicePipeline.run), dont les latences par étape
+        """
+        if manager is None:
+            # Import ici pour éviter les problèmes de chargement circulaire
+            from valetia.modules.chatbot.hybrid_manager import conversation_manager as manager
         
-        return recognized_text, response_audio
+        pipeline = VoicePipeline(self, manager)
+        for event in pipeline.run(audio_path=audio_path, conversation_id=conversation_id or f"voice_{uuid.uuid4().hex[:8]}"):
+            if event["type"] == "done":
+                latency = event["latency"]
+                SPEECH_SECONDS.observe(latency["asr"], step="asr")
+                if latency["answer"] is not None:
+                    SPEECH_SECONDS.observe(latency["tts_busy"], step="tts")
+                SPEECH_SECONDS.observe(latency["total"], step="command")
+            yield event
 
 
 # Instance singleton pour utilisation dans l'application
@@ -15,7 +15,7 @@ from valetia.utils.logger import get_logger
 # Commenter temporairement pour éviter les problèmes d'importation circulaire
 # from valetia.accessibility import setup_accessibility, create_accessibility_settings
 # Importer le module de gestion des dépendances
-from valetia.deps import setup_periodic_check
+from valetia.deps import get_scan_status, scan_scheduler, setup_periodic_check
 
 logger = get_logger(__name__)
 
@@ -126,10 +126,30 @@ def show_chatbot():
         prompt = st.chat_input("Comment puis-je vous aider sur cette question juridique?")
     
     with col2:
-        # Bouton pour le futur input vocal (fonctionnalité à venir)
-        voice_button = st.button("🎤", help="Commande vocale (à venir)")
-        if voice_button:
-            st.info("La commande vocale sera disponible dans une prochaine version")
+        # Question vocale (enregistrement depuis le navigateur)
+        audio_value = st.audio_input("🎤", help="Poser la question à voix haute") if hasattr(st, "audio_input") else None
+    
+    # Transcription de la question vocale, affichée au fil des segments reconnus
+    if audio_value is not None and not prompt:
+        audio_key = hash(audio_value.getvalue())
+        if st.session_state.get("last_audio_key") != audio_key:
+            st.session_state.last_audio_key = audio_key
+            from valetia.modules.speech.voice import speech_processor
+            
+            transcript_placeholder = st.empty()
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+                tmp_file.write(audio_value.getvalue())
+                audio_path = tmp_file.name
+            try:
+                for partial in speech_processor.recognize_speech_stream(audio_path):
+                    transcript_placeholder.caption(f"🎤 {partial['text']}")
+                    prompt = partial["text"]
+            finally:
+                os.unlink(audio_path)
+                transcript_placeholder.empty()
+            
+            if not prompt:
+                st.warning("Aucune parole n'a été reconnue dans l'enregistrement")
     
     # Traitement de l'entrée textuelle
     if prompt:
@@ -200,7 +220,7 @@ def show_chatbot():
         # Information sur la préparation à la reconnaissance vocale
         st.divider()
         st.markdown("##### 🎤 Commande vocale")
-        st.caption("La commande vocale sera disponible dans une prochaine version. Elle vous permettra d'interagir avec Valetia simplement en parlant.")
+        st.caption("Enregistrez votre question avec le micro: elle est transcrite localement puis envoyée à Valetia.")
         
         # Section sur l'apprentissage
         st.divider()
@@ -221,7 +241,7 @@ def main():
     # Configurer l'accessibilité
     # setup_accessibility()
     
-    # Initialiser la vérification périodique des dépendances
+    # Initialiser la vérification périodique des dépendances (en arrière-plan)
     setup_periodic_check()
     
     # Titre et introduction
@@ -244,6 +264,8 @@ def main():
     # Ajouter les paramètres d'accessibilité dans la barre latérale
     # create_accessibility_settings()
     
+    show_dependency_status()
+    
     # Affichage du module sélectionné
     if module == "Accueil":
         show_home()
@@ -258,6 +280,25 @@ def main():
     elif module == "Succession":
         show_succession()
 
+def show_dependency_status():
+    """Affiche l'état de l'analyse des dépendances dans la barre latérale."""
+    status = get_scan_status()
+    with st.sidebar.expander("🔒 Dépendances", expanded=False):
+        if status.get("state") == "running":
+            st.caption(f"Analyse en cours (étape: {status.get('step')})")
+        elif status.get("state") == "error":
+            st.caption(f"Dernière analyse en erreur: {status.get('error')}")
+        elif status.get("finished_at"):
+            st.caption(f"Dernière analyse: {status['finished_at'][:16].replace('T', ' ')}")
+            if status.get("next_run"):
+                st.caption(f"Prochaine analyse: {status['next_run'][:16].replace('T', ' ')}")
+        else:
+            st.caption("Aucune analyse effectuée pour le moment")
+        
+        if st.button("Analyser maintenant", disabled=status.get("state") == "running"):
+            scan_scheduler.run_now()
+            st.caption("Analyse demandée, elle s'exécute en arrière-plan")
+
 def show_home():
     """Affiche la page d'accueil."""
     st.header("Bienvenue dans Valetia")
@@ -343,6 +384,12 @@ def show_document_analysis():
                             # Analyser le document
                             analysis = analyzer.analyze_document(0)
                             
+                            # Indexer le document pour la recherche sémantique de l'assistant
+                            from valetia.modules.chatbot.retrieval import get_knowledge_retriever
+                            retriever = get_knowledge_retriever()
+                            if retriever is not None:
+                                retriever.index_analyzer(analyzer)
+                            
                             # Afficher les résultats dans des sections pliables
                             st.subheader("📝 Résultats de l'analyse")
                             
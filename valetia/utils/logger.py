@@ -1,68 +1,251 @@
 """
 Module de journalisation pour Valetia.
 Configuration centralisée des logs.
+
+Toute l'application passe par ce module (valetia.logger n'en est qu'un alias).
+Les handlers ne sont installés qu'une seule fois, quel que soit le nombre
+d'appels à get_logger, et les écritures (console et fichier) sont faites par
+un thread dédié: un appel de log se contente de placer l'enregistrement dans
+une file. Le niveau peut être réglé module par module, par exemple avec
+VALETIA_LOG_LEVELS="valetia.deps=WARNING,valetia.core=DEBUG".
 """
+import atexit
 import os
 import sys
+import threading
 from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    from valetia.config.settings import LOGS_DIR, LOG_LEVEL, LOG_FORMAT, LOG_MODULE_LEVELS, LOG_SERIALIZE
+except ImportError:
+    # Fallback pour les tests ou l'utilisation standalone
+    LOGS_DIR = os.path.join(Path(__file__).parent.parent.parent, "logs")
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
+    LOG_MODULE_LEVELS = {}
+    LOG_SERIALIZE = False
+
+# Numéros des niveaux (identiques pour loguru et logging)
+LEVELS = {
+    "TRACE": 5,
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+
+_setup_lock = threading.Lock()
+_configured = False
+_default_level = LEVELS.get(LOG_LEVEL, 20)
+_module_levels: Dict[str, int] = {}
+# Niveau effectif par nom de module, calculé une fois puis réutilisé
+_level_cache: Dict[str, int] = {}
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """
+    Lit une liste de niveaux par module ("module=NIVEAU,module=NIVEAU").
+
+    Args:
+        spec: Spécification, par exemple "valetia.deps=WARNING,valetia.core=DEBUG"
+
+    Returns:
+        Dictionnaire module -> niveau
+    """
+    levels = {}
+    for item in spec.split(","):
+        module, _, level = item.partition("=")
+        if module.strip() and level.strip():
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def set_module_level(module: str, level: str) -> None:
+    """
+    Définit le niveau de log d'un module et de ses sous-modules.
+
+    Args:
+        module: Nom du module (préfixe pointé, "" pour le niveau par défaut)
+        level: Nom du niveau (DEBUG, INFO, WARNING...)
+    """
+    global _default_level
+    if level.upper() not in LEVELS:
+        raise ValueError(f"Niveau de log inconnu: {level}")
+    if module:
+        _module_levels[module] = LEVELS[level.upper()]
+    else:
+        _default_level = LEVELS[level.upper()]
+    _level_cache.clear()
+    _on_levels_changed()
+
+
+def _min_level() -> int:
+    """Niveau le plus bas configuré (tous modules confondus)."""
+    return min([_default_level, *_module_levels.values()])
+
+
+def module_level(name: Optional[str]) -> int:
+    """
+    Niveau effectif d'un module: celui du préfixe le plus long configuré.
+
+    Args:
+        name: Nom du module émetteur
+
+    Returns:
+        Numéro du niveau minimal à journaliser
+    """
+    name = name or ""
+    level = _level_cache.get(name)
+    if level is None:
+        level = _default_level
+        prefix = name
+        while prefix:
+            if prefix in _module_levels:
+                level = _module_levels[prefix]
+                break
+            prefix = prefix.rpartition(".")[0]
+        _level_cache[name] = level
+    return level
+
+
+def _configure_module_levels() -> None:
+    """Charge les niveaux par module (configuration puis variable d'environnement)."""
+    levels = dict(LOG_MODULE_LEVELS)
+    levels.update(parse_module_levels(os.environ.get("VALETIA_LOG_LEVELS", "")))
+    for module, level in levels.items():
+        try:
+            set_module_level(module, level)
+        except ValueError as e:
+            print(f"Configuration des logs ignorée pour {module}: {e}", file=sys.stderr)
+
 
 try:
     from loguru import logger
-    
-    # Import de la configuration
-    try:
-        from valetia.config.settings import LOGS_DIR, LOG_LEVEL, LOG_FORMAT
-    except ImportError:
-        # Fallback pour les tests ou l'utilisation standalone
-        LOGS_DIR = os.path.join(Path(__file__).parent.parent.parent, "logs")
-        LOG_LEVEL = "INFO"
-        LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
-    
-    # Créer le répertoire de logs s'il n'existe pas
-    os.makedirs(LOGS_DIR, exist_ok=True)
-    
-    # Configuration de base du logger
-    logger.remove()  # Supprimer la configuration par défaut
-    
-    # Format console
-    logger.add(
-        sys.stderr,
-        format=LOG_FORMAT,
-        level=LOG_LEVEL,
-        colorize=True,
-    )
-    
-    # Format fichier
-    logger.add(
-        os.path.join(LOGS_DIR, "valetia_{time:YYYY-MM-DD}.log"),
-        format=LOG_FORMAT,
-        level=LOG_LEVEL,
-        rotation="00:00",  # Nouveau fichier chaque jour
-        retention="30 days",  # Garde les logs pendant 30 jours
-        compression="zip",  # Compresse les anciens logs
-    )
-    
+
+    def _on_levels_changed() -> None:
+        """Les handlers loguru relisent les niveaux à chaque message."""
+
+    def _level_filter(record) -> bool:
+        """Filtre des handlers: applique le niveau du module émetteur."""
+        return record["level"].no >= module_level(record["name"])
+
+    def setup_logging() -> bool:
+        """
+        Installe les handlers de log (une seule fois par processus).
+
+        Returns:
+            True si les handlers ont été installés par cet appel
+        """
+        global _configured
+        with _setup_lock:
+            if _configured:
+                return False
+
+            # Créer le répertoire de logs s'il n'existe pas
+            os.makedirs(LOGS_DIR, exist_ok=True)
+            _configure_module_levels()
+
+            # Configuration de base du logger
+            logger.remove()  # Supprimer la configuration par défaut
+
+            # Format console
+            logger.add(
+                sys.stderr,
+                format=LOG_FORMAT,
+                level=0,  # Le filtre applique le niveau de chaque module
+                filter=_level_filter,
+                colorize=True,
+                enqueue=True,
+            )
+
+            # Format fichier
+            logger.add(
+                os.path.join(LOGS_DIR, "valetia_{time:YYYY-MM-DD}.log"),
+                format=LOG_FORMAT,
+                level=0,
+                filter=_level_filter,
+                serialize=LOG_SERIALIZE,
+                rotation="00:00",  # Nouveau fichier chaque jour
+                retention="30 days",  # Garde les logs pendant 30 jours
+                compression="zip",  # Compresse les anciens logs
+                enqueue=True,
+            )
+
+            # Vider la file d'écriture à l'arrêt du processus
+            atexit.register(logger.remove)
+            _configured = True
+            return True
+
     def get_logger(name):
         """
         Retourne un logger configuré pour le module spécifié.
-        
+
         Args:
             name (str): Nom du module (généralement __name__)
-            
+
         Returns:
             object: Instance du logger configurée
         """
+        setup_logging()
         return logger.bind(module=name)
 
 except ImportError:
     # Fallback si loguru n'est pas installé
     import logging
-    
+    import logging.handlers
+    import queue
+
+    _listener = None
+
+    def _on_levels_changed() -> None:
+        """Les messages sous le niveau le plus bas ne sont pas même créés."""
+        if _configured:
+            logging.getLogger().setLevel(_min_level())
+
+    class _ModuleLevelFilter(logging.Filter):
+        """Filtre des handlers: applique le niveau du module émetteur."""
+
+        def filter(self, record):
+            return record.levelno >= module_level(record.name)
+
+    def setup_logging() -> bool:
+        """
+        Installe les handlers de log (une seule fois par processus).
+
+        Returns:
+            True si les handlers ont été installés par cet appel
+        """
+        global _configured, _listener
+        with _setup_lock:
+            if _configured:
+                return False
+
+            _configure_module_levels()
+
+            # Les loggers transmettent tout à une file, vidée par un thread d'écriture
+            log_queue = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            queue_handler.addFilter(_ModuleLevelFilter())
+
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setFormatter(logging.Formatter(
+                '%(asctime)s | %(levelname)s | %(name)s | %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S',
+            ))
+            _listener = logging.handlers.QueueListener(log_queue, console_handler)
+            _listener.start()
+            atexit.register(_listener.stop)
+
+            root = logging.getLogger()
+            root.addHandler(queue_handler)
+            root.setLevel(_min_level())
+            _configured = True
+            return True
+
     def get_logger(name):
         """Fallback logger utilisant le module logging standard."""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s | %(levelname)s | %(name)s | %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S',
-        )
+        setup_logging()
         return logging.getLogger(name)
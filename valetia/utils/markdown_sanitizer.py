@@ -1,22 +1,261 @@
+"""
+Conversion Markdown → HTML sécurisé (markdown2 + bleach).
+
+Le convertisseur Markdown et le nettoyeur bleach sont configurés une fois
+(un exemplaire par thread: ni l'un ni l'autre ne supporte les appels
+concurrents) et les résultats récents sont gardés dans un cache LRU indexé
+par l'empreinte du texte. convert_many répartit un lot de documents sur un
+pool de processus. iter_safe_html rend un document bloc par bloc, pour
+transmettre le HTML au fil du rendu.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
 import markdown2
 import bleach
 
+ALLOWED_TAGS = frozenset(bleach.sanitizer.ALLOWED_TAGS).union({
+    "p", "pre", "table", "thead", "tbody", "tr", "td", "th", "code"
+})
+ALLOWED_ATTRS = {
+    "*": ["class", "style", "align"],
+    "a": ["href", "title", "target"],
+}
+
+# Version des règles de conversion: à modifier avec ALLOWED_TAGS/ALLOWED_ATTRS (invalide les ETag)
+SANITIZER_VERSION = "1"
+
+# Nombre de documents gardés dans le cache
+CACHE_SIZE = 256
+# En dessous de ce nombre de documents à convertir, un lot est traité sans pool de processus
+MIN_BATCH_FOR_POOL = 4
+# Taille visée des blocs rendus séparément par iter_safe_html
+BLOCK_CHARS = 2000
+
+_FENCE = re.compile(r"^\s{0,3}(```|~~~)")
+_LIST_ITEM = re.compile(r"^\s{0,3}([-*+]|\d+[.)])\s")
+# Définitions de liens ou de notes ([id]: url, [^1]: note), visibles de tout le document
+_REFERENCE = re.compile(r"^\s{0,3}\[[^\]]+\]:", re.M)
+# HTML brut en début de ligne (balise ouvrante ou fermante, commentaire): un bloc HTML peut contenir des lignes vides
+_RAW_HTML = re.compile(r"^\s{0,3}<[A-Za-z/!]", re.M)
+
+
+class MarkdownSanitizer:
+    """Convertisseur Markdown → HTML sécurisé, préconfiguré et avec cache."""
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        """
+        Initialise le convertisseur.
+
+        Args:
+            cache_size: Nombre de documents gardés dans le cache (0: pas de cache)
+        """
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(markdown_text: str) -> str:
+        """Empreinte d'un texte Markdown."""
+        return hashlib.sha256(markdown_text.encode("utf-8")).hexdigest()
+
+    def _tools(self):
+        """Convertisseur et nettoyeur du thread courant (créés au premier usage)."""
+        tools = getattr(self._local, "tools", None)
+        if tools is None:
+            cleaner = bleach.sanitizer.Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRS, strip=True)
+            tools = self._local.tools = (markdown2.Markdown(), cleaner)
+        return tools
+
+    def render(self, markdown_text: str) -> str:
+        """Convertit et nettoie un texte, sans passer par le cache."""
+        markdown, cleaner = self._tools()
+        return cleaner.clean(markdown.convert(markdown_text))
+
+    def convert(self, markdown_text: str) -> str:
+        """
+        Convertit un texte Markdown en HTML sécurisé.
+
+        Args:
+            markdown_text: Texte Markdown
+
+        Returns:
+            HTML nettoyé
+        """
+        if not self.cache_size:
+            return self.render(markdown_text)
+
+        key = self.make_key(markdown_text)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+
+        html = self.render(markdown_text)
+        self._put(key, html)
+        return html
+
+    def convert_many(self, texts: Iterable[str], max_workers: Optional[int] = None) -> List[str]:
+        """
+        Convertit un lot de textes Markdown, dans un pool de processus si le lot le justifie.
+
+        Args:
+            texts: Textes Markdown
+            max_workers: Nombre de processus (par défaut le nombre de processeurs)
+
+        Returns:
+            HTML nettoyé de chaque texte, dans l'ordre
+        """
+        texts = list(texts)
+        keys = [self.make_key(text) for text in texts]
+        results: Dict[str, str] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in results or key in missing:
+                continue
+            cached = self._get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing[key] = text
+
+        if len(missing) < MIN_BATCH_FOR_POOL or max_workers == 1:
+            rendered = [self.render(text) for text in missing.values()]
+        else:
+            workers = min(max_workers or os.cpu_count() or 1, len(missing))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                rendered = list(executor.map(_render_in_worker, missing.values(),
+                                             chunksize=max(1, len(missing) // (workers * 4))))
+
+        for key, html in zip(missing, rendered):
+            results[key] = html
+            self._put(key, html)
+
+        return [results[key] for key in keys]
+
+    def clear_cache(self) -> None:
+        """Vide le cache."""
+        with self._lock:
+            self._cache.clear()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            html = self._cache.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def _put(self, key: str, html: str) -> None:
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = html
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def split_markdown_blocks(markdown_text: str, target_chars: int = BLOCK_CHARS) -> List[str]:
+    """
+    Découpe un document Markdown en blocs convertibles séparément.
+
+    Les coupures se font sur les lignes vides, hors blocs de code délimités;
+    les éléments d'une même liste et les lignes indentées restent avec le
+    bloc qui les précède. Un document contenant des définitions de liens
+    (une définition vaut pour tout le document) ou du HTML brut en début de
+    ligne (un bloc HTML peut contenir des lignes vides) est gardé entier.
+
+    Args:
+        markdown_text: Texte Markdown
+        target_chars: Taille visée des blocs (les blocs courts sont regroupés)
+
+    Returns:
+        Blocs de texte Markdown
+    """
+    if _REFERENCE.search(markdown_text) or _RAW_HTML.search(markdown_text):
+        return [markdown_text]
+
+    # Paragraphes séparés par des lignes vides, hors blocs de code délimités
+    paragraphs: List[List[str]] = []
+    current: List[str] = []
+    in_fence = False
+    for line in markdown_text.split("\n"):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            if current:
+                paragraphs.append(current)
+                current = []
+            continue
+        current.append(line)
+    if current:
+        paragraphs.append(current)
+
+    # Rattacher les suites de listes et les lignes indentées au bloc précédent
+    merged: List[List[str]] = []
+    previous_is_list = False
+    for paragraph in paragraphs:
+        first = paragraph[0]
+        is_list = bool(_LIST_ITEM.match(first))
+        if merged and (first[:1] in (" ", "\t") or (is_list and previous_is_list)):
+            merged[-1].extend([""] + paragraph)
+            continue
+        merged.append(paragraph)
+        previous_is_list = is_list
+
+    blocks: List[str] = []
+    group: List[str] = []
+    size = 0
+    for paragraph in merged:
+        text = "\n".join(paragraph)
+        if group and size + len(text) > target_chars:
+            blocks.append("\n\n".join(group))
+            group, size = [], 0
+        group.append(text)
+        size += len(text)
+    if group:
+        blocks.append("\n\n".join(group))
+    return blocks
+
+
+# Instance partagée par le processus
+sanitizer = MarkdownSanitizer()
+
+
+def _render_in_worker(markdown_text: str) -> str:
+    """Conversion dans un processus du pool (avec l'instance du processus)."""
+    return sanitizer.render(markdown_text)
+
+
 def markdown_to_safe_html(markdown_text: str) -> str:
-    raw_html = markdown2.markdown(markdown_text)
-
-    allowed_tags = set(bleach.sanitizer.ALLOWED_TAGS).union({
-        "p", "pre", "table", "thead", "tbody", "tr", "td", "th", "code"
-    })
-    allowed_attrs = {
-        "*": ["class", "style", "align"],
-        "a": ["href", "title", "target"],
-    }
-
-    clean_html = bleach.clean(
-        raw_html,
-        tags=allowed_tags,
-        attributes=allowed_attrs,
-        strip=True
-    )
-
-    return clean_html
+    return sanitizer.convert(markdown_text)
+
+
+def iter_safe_html(markdown_text: str, target_chars: int = BLOCK_CHARS) -> Iterator[str]:
+    """
+    Convertit un document bloc par bloc (chaque bloc passe par le cache).
+
+    Args:
+        markdown_text: Texte Markdown
+        target_chars: Taille visée des blocs
+
+    Yields:
+        HTML nettoyé de chaque bloc
+    """
+    for block in split_markdown_blocks(markdown_text, target_chars):
+        yield sanitizer.convert(block) + "\n"
+
+
+def markdown_to_safe_html_many(texts: Iterable[str], max_workers: Optional[int] = None) -> List[str]:
+    return sanitizer.convert_many(texts, max_workers=max_workers)
@@ -0,0 +1,313 @@
+"""
+Métriques de latence et de volume des composants de Valetia.
+
+Registre léger de compteurs et d'histogrammes, alimenté par des
+chronomètres (gestionnaire de contexte ou décorateur) placés sur les
+chemins chauds: analyse spaCy, extraction PDF, génération locale, appels
+distants, ajouts ChromaDB, écritures du feedback, reconnaissance et
+synthèse vocales. Le registre est exporté au format texte de Prometheus
+par la route /metrics de l'API.
+
+Trois modes, choisis par VALETIA_METRICS:
+- "full": histogrammes complets (compteur, somme, seaux);
+- "light": compteur et somme seulement, sans recherche de seau (production);
+- "off": chronomètres et compteurs sans effet.
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from valetia.config.settings import METRICS_MODE
+except ImportError:
+    # Fallback pour les tests ou l'utilisation standalone
+    METRICS_MODE = os.environ.get("VALETIA_METRICS", "full")
+
+METRICS_MODES = ("full", "light", "off")
+
+# Seaux par défaut (secondes), de la milliseconde à la minute
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    """Base commune des métriques: nom, aide, étiquettes et verrou."""
+
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labels: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        """Valeurs des étiquettes, dans l'ordre déclaré."""
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"Étiquettes attendues pour {self.name}: {self.label_names}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        """Étiquettes au format Prometheus ({a="x",b="y"})."""
+        pairs = list(zip(self.label_names, key))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def family(self) -> Tuple[str, str]:
+        """Nom et type de la famille Prometheus (lignes # HELP et # TYPE)."""
+        return self.name, self.kind
+
+
+class Counter(_Metric):
+    """Compteur monotone (nombre d'appels, d'erreurs, d'octets...)."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Incrémente le compteur.
+
+        Args:
+            amount: Valeur ajoutée
+            **labels: Valeurs des étiquettes déclarées
+        """
+        if self.registry.mode == "off":
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def family(self) -> Tuple[str, str]:
+        """Famille nommée comme ses échantillons (suffixe _total)."""
+        return f"{self.name}_total", self.kind
+
+    def value(self, **labels: str) -> float:
+        """Valeur courante du compteur."""
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        """Lignes Prometheus du compteur."""
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}_total{self._format_labels(key)} {value}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """Distribution de valeurs (durées en secondes le plus souvent)."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Par étiquettes: [compteur, somme, effectifs par seau]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Enregistre une observation.
+
+        Args:
+            value: Valeur observée
+            **labels: Valeurs des étiquettes déclarées
+        """
+        mode = self.registry.mode
+        if mode == "off":
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value) if mode == "full" else None
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0, 0.0, [0] * len(self.buckets)]
+            state[0] += 1
+            state[1] += value
+            if index is not None and index < len(self.buckets):
+                state[2][index] += 1
+
+    def time(self, **labels: str) -> "_Timer":
+        """
+        Chronomètre le bloc et enregistre sa durée (en secondes).
+
+        Args:
+            **labels: Valeurs des étiquettes déclarées
+        """
+        return _Timer(self, labels)
+
+    def timed(self, **labels: str) -> Callable:
+        """Décorateur chronométrant chaque appel de la fonction."""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def family(self) -> Tuple[str, str]:
+        """Histogramme en mode complet; en mode léger (sans seaux), résumé sans quantiles."""
+        return self.name, self.kind if self.registry.mode == "full" else "summary"
+
+    def count(self, **labels: str) -> int:
+        """Nombre d'observations."""
+        state = self._values.get(self._key(labels))
+        return state[0] if state else 0
+
+    def total(self, **labels: str) -> float:
+        """Somme des observations."""
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def render(self) -> List[str]:
+        """Lignes Prometheus de l'histogramme."""
+        with self._lock:
+            values = sorted((key, [state[0], state[1], list(state[2])]) for key, state in self._values.items())
+
+        lines = []
+        full = self.registry.mode == "full"
+        for key, (count, total, bucket_counts) in values:
+            if full:
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class _Timer:
+    """Chronomètre d'un bloc (gestionnaire de contexte sans générateur, pour le coût)."""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self) -> "_Timer":
+        if self.histogram.registry.mode != "off":
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        if self.start is not None:
+            self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Registre des métriques du processus."""
+
+    def __init__(self, mode: str = METRICS_MODE):
+        """
+        Initialise le registre.
+
+        Args:
+            mode: "full", "light" ou "off"
+        """
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.set_mode(mode)
+
+    def set_mode(self, mode: str) -> None:
+        """Change le mode de collecte."""
+        if mode not in METRICS_MODES:
+            raise ValueError(f"Mode de métriques inconnu: {mode} (attendu: {', '.join(METRICS_MODES)})")
+        self.mode = mode
+
+    def _get_or_create(self, cls, name: str, help_text: str, labels: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help_text, labels, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(labels):
+                raise ValueError(f"Métrique {name} déjà déclarée avec un autre type ou d'autres étiquettes")
+            return metric
+
+    def counter(self, name: str, help_text: str = "", labels: Sequence[str] = ()) -> Counter:
+        """
+        Retourne le compteur de ce nom (créé au premier appel).
+
+        Args:
+            name: Nom Prometheus (sans le suffixe _total)
+            help_text: Description
+            labels: Noms des étiquettes
+
+        Returns:
+            Compteur
+        """
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def histogram(self,
+                  name: str,
+                  help_text: str = "",
+                  labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Retourne l'histogramme de ce nom (créé au premier appel).
+
+        Args:
+            name: Nom Prometheus
+            help_text: Description
+            labels: Noms des étiquettes
+            buckets: Bornes supérieures des seaux
+
+        Returns:
+            Histogramme
+        """
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def timer(self, name: str, help_text: str = "", **labels: str):
+        """
+        Chronomètre un bloc dans l'histogramme de ce nom.
+
+        Exemple: with metrics.timer("valetia_pdf_extraction_seconds"): ...
+        """
+        return self.histogram(name, help_text, labels=tuple(labels)).time(**labels)
+
+    def render_prometheus(self) -> str:
+        """
+        Exporte les métriques au format texte de Prometheus (version 0.0.4).
+
+        Returns:
+            Texte de l'export
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+        lines = []
+        for metric in metrics:
+            name, kind = metric.family()
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Supprime toutes les valeurs enregistrées (les métriques restent déclarées)."""
+        with self._lock:
+            for metric in self._metrics.values():
+                with metric._lock:
+                    metric._values.clear()
+
+
+# Registre unique pour le processus
+metrics = MetricsRegistry()
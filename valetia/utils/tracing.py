@@ -0,0 +1,370 @@
+"""
+Traces par requête et profileur par échantillonnage.
+
+Un tour de conversation ouvre une trace (span racine) dont les étapes
+(recherche d'exemples, construction du prompt, génération, persistance,
+analyse de document...) sont des spans enfants. Le span courant est porté
+par une variable de contexte: il suit les appels sans être passé en
+paramètre. À la fin du span racine, la trace est ajoutée au fichier
+TRACES_FILE (une ligne JSON par trace, au format OTLP/JSON d'OpenTelemetry).
+
+Le profileur, activé par VALETIA_PROFILE_SLOWEST=N, échantillonne la pile
+du thread de chaque requête tracée et conserve les données de flame graph
+(format « folded », une pile par ligne suivie de son nombre d'échantillons)
+des N requêtes les plus lentes.
+
+Les deux fonctions sont désactivées par défaut: span() ne coûte alors qu'un
+test et retourne un span vide.
+"""
+
+import functools
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from valetia.utils.logger import get_logger
+
+try:
+    from valetia.config.settings import (
+        TRACING_ENABLED,
+        TRACES_FILE,
+        PROFILE_SLOWEST,
+        PROFILE_INTERVAL,
+        PROFILES_DIR,
+    )
+except ImportError:
+    # Fallback pour les tests ou l'utilisation standalone
+    _LOGS_DIR = Path(__file__).parent.parent.parent / "logs"
+    TRACING_ENABLED = os.environ.get("VALETIA_TRACING", "0") == "1"
+    TRACES_FILE = str(_LOGS_DIR / "traces.jsonl")
+    PROFILE_SLOWEST = int(os.environ.get("VALETIA_PROFILE_SLOWEST", "0"))
+    PROFILE_INTERVAL = 0.005
+    PROFILES_DIR = str(_LOGS_DIR / "profiles")
+
+logger = get_logger(__name__)
+
+SERVICE_NAME = "valetia"
+
+# Codes de statut OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("valetia_current_span", default=None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Valeur d'attribut au format OTLP/JSON."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """Étape chronométrée d'une requête."""
+
+    __slots__ = ("tracer", "name", "attributes", "trace_id", "span_id", "parent",
+                 "start_ns", "end_ns", "status", "trace_spans", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any], parent: Optional["Span"]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        # Spans terminés de la trace, partagés par tous les spans de la requête
+        self.trace_spans: List["Span"] = parent.trace_spans if parent is not None else []
+        self.start_ns = 0
+        self.end_ns = 0
+        self.status: Tuple[int, str] = (STATUS_OK, "")
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Ajoute un attribut au span."""
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """Durée du span en secondes."""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        if self.parent is None:
+            self.tracer._on_trace_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.status = (STATUS_ERROR, f"{exc_type.__name__}: {exc}")
+        _current_span.reset(self._token)
+        self.trace_spans.append(self)
+        if self.parent is None:
+            self.tracer._on_trace_end(self)
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Span au format OTLP/JSON."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status[0]},
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        if self.status[1]:
+            span["status"]["message"] = self.status[1]
+        return span
+
+
+class _NoopSpan:
+    """Span vide utilisé quand les traces et le profileur sont désactivés."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class SamplingProfiler:
+    """
+    Échantillonne la pile des threads des requêtes en cours et garde
+    les données de flame graph des requêtes les plus lentes.
+    """
+
+    def __init__(self, slowest: int, interval: float = PROFILE_INTERVAL, directory: str = PROFILES_DIR):
+        """
+        Initialise le profileur.
+
+        Args:
+            slowest: Nombre de requêtes les plus lentes conservées
+            interval: Intervalle d'échantillonnage en secondes
+            directory: Dossier des fichiers .folded et de l'index
+        """
+        self.slowest = slowest
+        self.interval = interval
+        self.directory = Path(directory)
+        self._active: Dict[int, Counter] = {}
+        # Tas des requêtes conservées: (durée, trace_id, nom)
+        self._kept: List[Tuple[float, str, str]] = []
+        self._lock = threading.Lock()
+        self._has_work = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Commence l'échantillonnage du thread courant."""
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="valetia-profiler", daemon=True)
+                self._thread.start()
+        self._has_work.set()
+
+    def stop(self, root: Span) -> Optional[Path]:
+        """
+        Arrête l'échantillonnage du thread courant et conserve le profil s'il
+        fait partie des plus lents.
+
+        Args:
+            root: Span racine de la requête
+
+        Returns:
+            Fichier du profil conservé, ou None
+        """
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+            if not self._active:
+                self._has_work.clear()
+            if not samples:
+                return None
+
+            entry = (root.duration, root.trace_id, root.name)
+            if len(self._kept) < self.slowest:
+                heapq.heappush(self._kept, entry)
+                evicted = None
+            elif entry[0] > self._kept[0][0]:
+                evicted = heapq.heapreplace(self._kept, entry)
+            else:
+                return None
+            kept = sorted(self._kept, reverse=True)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{root.trace_id}.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        if evicted is not None:
+            (self.directory / f"{evicted[1]}.folded").unlink(missing_ok=True)
+
+        index = [{"trace_id": trace_id, "name": name, "duration": duration, "file": f"{trace_id}.folded"}
+                 for duration, trace_id, name in kept]
+        with open(self.directory / "index.json", "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+
+        logger.info(f"Profil conservé pour {root.name} ({root.duration:.3f}s): {path}")
+        return path
+
+    def _run(self) -> None:
+        """Boucle d'échantillonnage."""
+        while True:
+            self._has_work.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame) -> str:
+        """Pile d'appels au format folded (de la racine vers la feuille)."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+class Tracer:
+    """Crée les spans et exporte les traces terminées."""
+
+    def __init__(self,
+                 enabled: bool = TRACING_ENABLED,
+                 export_path: str = TRACES_FILE,
+                 profile_slowest: int = PROFILE_SLOWEST):
+        """
+        Initialise le traceur.
+
+        Args:
+            enabled: Exporter les traces dans export_path
+            export_path: Fichier JSONL des traces
+            profile_slowest: Nombre de requêtes les plus lentes profilées (0: profileur désactivé)
+        """
+        self._export_lock = threading.Lock()
+        self.configure(enabled, export_path, profile_slowest)
+
+    def configure(self,
+                  enabled: Optional[bool] = None,
+                  export_path: Optional[str] = None,
+                  profile_slowest: Optional[int] = None,
+                  profiles_dir: str = PROFILES_DIR) -> None:
+        """Modifie la configuration (les paramètres omis sont inchangés)."""
+        if enabled is not None:
+            self.enabled = enabled
+        if export_path is not None:
+            self.export_path = Path(export_path)
+        if profile_slowest is not None:
+            self.profiler = SamplingProfiler(profile_slowest, directory=profiles_dir) if profile_slowest > 0 else None
+
+    @property
+    def active(self) -> bool:
+        """Indique si les spans doivent être enregistrés."""
+        return self.enabled or self.profiler is not None
+
+    def span(self, name: str, **attributes: Any):
+        """
+        Ouvre un span (enfant du span courant, ou racine d'une nouvelle trace).
+
+        Exemple: with span("chatbot.generate", backend="local"): ...
+
+        Args:
+            name: Nom de l'étape
+            **attributes: Attributs du span
+
+        Returns:
+            Gestionnaire de contexte du span
+        """
+        if not self.active:
+            return _NOOP_SPAN
+        return Span(self, name, attributes, _current_span.get())
+
+    def traced(self, name: Optional[str] = None, **attributes: Any) -> Callable:
+        """Décorateur ouvrant un span autour de chaque appel de la fonction."""
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **attributes):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _on_trace_start(self, root: Span) -> None:
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def _on_trace_end(self, root: Span) -> None:
+        if self.profiler is not None:
+            try:
+                self.profiler.stop(root)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enregistrement du profil: {e}")
+        if self.enabled:
+            try:
+                self.export(root.trace_spans)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'export de la trace: {e}")
+
+    def export(self, spans: List[Span]) -> None:
+        """
+        Ajoute une trace au fichier d'export (une ligne OTLP/JSON).
+
+        Args:
+            spans: Spans de la trace
+        """
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "valetia.utils.tracing"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+        line = json.dumps(payload, ensure_ascii=False)
+        with self._export_lock:
+            self.export_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def current_span() -> Optional[Span]:
+    """Span en cours dans le contexte courant (None hors d'une trace)."""
+    return _current_span.get()
+
+
+# Instance unique pour le processus
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced